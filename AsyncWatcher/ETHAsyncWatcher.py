@@ -1,34 +1,77 @@
+"""
+区块头监听：优先用 WebSocket 订阅 newHeads，断线时退回 HTTP 轮询并按指数退避重连。
+漏掉的区块会补齐、重复的去掉、重组会从分叉点重新输出（见 dex_common.head_watcher）。
+
+    python AsyncWatcher/ETHAsyncWatcher.py
+    python AsyncWatcher/ETHAsyncWatcher.py --ws ws://127.0.0.1:8546 --http http://127.0.0.1:8545 --ingest
+
+--ingest 时每批新区块投递一次 ingest_sync_logs 任务（它按自己的游标增量处理 Sync 日志，
+队列里积压的多个区块合并成一次投递）。
+"""
+import argparse
 import asyncio
-import web3
-from web3 import *
+import logging
+import os
+import sys
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Defi_Monitor.settings')
 
+import django  # noqa: E402
 
+django.setup()
 
+from dex_common.head_watcher import HeadWatcher  # noqa: E402
 
 URL = "https://eth-mainnet.g.alchemy.com/v2/JEJmfRm0uQhy2nfe-Ff0-"
-w3 = web3.AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(URL))
+WS_URL = os.environ.get('ETH_WS_URL', URL.replace('https://', 'wss://'))
+HTTP_URL = os.environ.get('ETH_HTTP_URL', URL)
+INGEST_TASK = 'dex_common.tasks.ingest_sync_logs'
+
+
+async def print_heads(watcher, ingest):
+    if ingest:
+        from Defi_Monitor.celery import app
+    while True:
+        heads = [await watcher.queue.get()]
+        # 把已经排队的区块一起取出，合并成一次任务投递
+        while not watcher.queue.empty():
+            heads.append(watcher.queue.get_nowait())
+        for head in heads:
+            flag = " ⚠️重组" if head.reorg else ""
+            print(f"区块 {head.number} {head.hash[:12]}… 来源 {head.source}{flag}")
+        if ingest:
+            await asyncio.to_thread(app.send_task, INGEST_TASK)
+            print(f"已投递 {INGEST_TASK}（{len(heads)} 个新区块）")
+
 
-async def fetch_block_and_print_tx_count():
+async def main_loop(args):
+    watcher = HeadWatcher(ws_url=args.ws or None, http_url=args.http or None,
+                          poll_interval=args.poll_interval, queue_size=args.queue_size)
+    print(f"开始监听区块 (WebSocket: {watcher.ws_url}, HTTP: {watcher.http_url})")
+    task = asyncio.create_task(watcher.run())
     try:
-        latest_block_number = await w3.eth.get_block_number()
-        block = await w3.eth.get_block(latest_block_number)
-        tx_count = len(block["transactions"])
-        print(f"最新区块号: {latest_block_number}, 交易数量: {tx_count}")
+        await print_heads(watcher, args.ingest)
+    finally:
+        task.cancel()
+        print(f"统计: {dict(watcher.stats)}")
 
-    except Exception as e:
-        print(e)
-        print("❌出错了！！！")
 
-async def main_loop():
-    if not await w3.is_connected():
-        print("没有连接到ETH！！！")
-        return
-    else: print("成功连接！！！")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='newHeads 区块监听（WebSocket 优先，HTTP 轮询兜底）')
+    parser.add_argument('--ws', default=WS_URL, help='WebSocket 节点地址，传空字符串只用轮询')
+    parser.add_argument('--http', default=HTTP_URL, help='HTTP 节点地址（轮询兜底），传空字符串不用轮询')
+    parser.add_argument('--poll-interval', type=float, default=3.0)
+    parser.add_argument('--queue-size', type=int, default=256)
+    parser.add_argument('--ingest', action='store_true', help='每批新区块投递 ingest_sync_logs 任务')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main_loop(args))
+    except KeyboardInterrupt:
+        print("已停止")
 
-    while True:
-        await fetch_block_and_print_tx_count()
-        await asyncio.sleep(3)
 
 if __name__ == "__main__":
-    asyncio.run(main_loop())
\ No newline at end of file
+    main()
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Camelot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pair_address', models.CharField(max_length=50, unique=True)),
+                ('pair_name', models.CharField(max_length=100)),
+                ('token0_name', models.CharField(max_length=50)),
+                ('token1_name', models.CharField(max_length=50)),
+                ('token0_reserve', models.DecimalField(decimal_places=0, max_digits=40)),
+                ('token1_reserve', models.DecimalField(decimal_places=0, max_digits=40)),
+                ('token1FeePercent', models.DecimalField(decimal_places=10, default=0, max_digits=40)),
+                ('token0FeePercent', models.DecimalField(decimal_places=10, default=0, max_digits=40)),
+                ('token0_decimals', models.IntegerField()),
+                ('token1_decimals', models.IntegerField()),
+                ('block_timestamp_last', models.BigIntegerField(default=0)),
+                ('exchange_rate', models.JSONField(blank=True, null=True)),
+                ('token0_address', models.CharField(default='None', max_length=50)),
+                ('token1_address', models.CharField(default='None', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'camelot',
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+import math
+
+from django.db import migrations, models
+
+BACKFILL_BATCH = 2000
+PRICE_FIELDS = ['price0_in_1', 'price1_in_0', 'liquidity']
+
+
+def backfill_prices(apps, schema_editor):
+    """Fill the numeric price columns from the stored reserves (not from the JSON strings)."""
+    model = apps.get_model('Camelot_v2', 'Camelot')
+    rows = model.objects.only('token0_reserve', 'token1_reserve', 'token0_decimals', 'token1_decimals')
+    batch = []
+    for obj in rows.iterator(chunk_size=BACKFILL_BATCH):
+        batch.append(obj)
+        if len(batch) >= BACKFILL_BATCH:
+            _write_prices(model, batch)
+            batch = []
+    if batch:
+        _write_prices(model, batch)
+
+
+def _prices(r0, r1, d0, d1):
+    # Frozen copy of dex_common.pricing.batch_numeric_prices as of this migration
+    liquidity = math.sqrt((r0 * r1) / 10 ** (d0 + d1))
+    if not r0 or not r1:
+        return None, None, liquidity
+    a = r1 * 10 ** d0
+    b = r0 * 10 ** d1
+    return a / b, b / a, liquidity
+
+
+def _write_prices(model, objs):
+    for obj in objs:
+        values = _prices(int(obj.token0_reserve), int(obj.token1_reserve), obj.token0_decimals, obj.token1_decimals)
+        for field, value in zip(PRICE_FIELDS, values):
+            setattr(obj, field, value)
+    model.objects.bulk_update(objs, PRICE_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Camelot_v2', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camelot',
+            name='liquidity',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='camelot',
+            name='price0_in_1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='camelot',
+            name='price1_in_0',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        # Backfill before the indexes exist so the UPDATEs do not maintain them
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='camelot',
+            index=models.Index(fields=['price0_in_1'], name='camelot_price0_in_1'),
+        ),
+        migrations.AddIndex(
+            model_name='camelot',
+            index=models.Index(fields=['price1_in_0'], name='camelot_price1_in_0'),
+        ),
+        migrations.AddIndex(
+            model_name='camelot',
+            index=models.Index(fields=['liquidity'], name='camelot_liquidity'),
+        ),
+    ]
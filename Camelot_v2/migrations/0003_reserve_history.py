@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Camelot_v2', '0002_price_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CamelotPriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pair_id', models.IntegerField()),
+                ('interval', models.IntegerField()),
+                ('bucket_start', models.IntegerField()),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('samples', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'camelot_price_bar',
+                'constraints': [models.UniqueConstraint(fields=('pair_id', 'interval', 'bucket_start'), name='camelot_bar_pair_interval')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CamelotReserveSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('pair_id', models.IntegerField()),
+                ('block_number', models.BigIntegerField()),
+                ('ts', models.IntegerField()),
+                ('reserves', models.BinaryField(max_length=28)),
+            ],
+            options={
+                'db_table': 'camelot_reserve_snapshot',
+                'indexes': [models.Index(fields=['pair_id', 'ts'], name='camelot_snap_pair_ts'), models.Index(fields=['ts'], name='camelot_snap_ts')],
+            },
+        ),
+    ]
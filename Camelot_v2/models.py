@@ -1,5 +1,7 @@
 from django.db import models
 
+from dex_common.models import PriceBar, ReserveSnapshot
+
 # Create your models here.
 
 class Camelot(models.Model):
@@ -15,11 +17,38 @@ class Camelot(models.Model):
     token0_decimals = models.IntegerField()
     token1_decimals = models.IntegerField()
     block_timestamp_last = models.BigIntegerField(default=0)
+    # 展示用缓存；筛选/排序请用下面的数值列
     exchange_rate = models.JSONField(null=True, blank=True)
+    price0_in_1 = models.FloatField(null=True, blank=True)
+    price1_in_0 = models.FloatField(null=True, blank=True)
+    # sqrt(reserve0 * reserve1)，按 decimals 归一化
+    liquidity = models.FloatField(null=True, blank=True)
     token0_address = models.CharField(max_length=50,default='None')  # 新增字段
     token1_address = models.CharField(max_length=50, default='None')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = 'camelot'
\ No newline at end of file
+        db_table = 'camelot'
+        indexes = [
+            models.Index(fields=['price0_in_1'], name='camelot_price0_in_1'),
+            models.Index(fields=['price1_in_0'], name='camelot_price1_in_0'),
+            models.Index(fields=['liquidity'], name='camelot_liquidity'),
+        ]
+
+
+class CamelotReserveSnapshot(ReserveSnapshot):
+    class Meta:
+        db_table = 'camelot_reserve_snapshot'
+        indexes = [
+            models.Index(fields=['pair_id', 'ts'], name='camelot_snap_pair_ts'),
+            models.Index(fields=['ts'], name='camelot_snap_ts'),
+        ]
+
+
+class CamelotPriceBar(PriceBar):
+    class Meta:
+        db_table = 'camelot_price_bar'
+        constraints = [
+            models.UniqueConstraint(fields=['pair_id', 'interval', 'bucket_start'], name='camelot_bar_pair_interval'),
+        ]
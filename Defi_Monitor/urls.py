@@ -17,6 +17,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
+from dex_common import views as dex_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', dex_views.metrics, name='metrics'),
 ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SushiSwap_v2', '0003_reserve_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sushiswapv2',
+            name='token0_address',
+            field=models.CharField(default='None', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='sushiswapv2',
+            name='token1_address',
+            field=models.CharField(default='None', max_length=50),
+        ),
+    ]
@@ -1,6 +1,8 @@
 # models.py
 from django.db import models
 
+from dex_common.models import PriceBar, ReserveSnapshot
+
 class SushiSwapV2(models.Model):
     pair_address = models.CharField(max_length=50, unique=True)
     pair_name = models.CharField(max_length=100)
@@ -12,9 +14,38 @@ class SushiSwapV2(models.Model):
     token0_decimals = models.IntegerField()
     token1_decimals = models.IntegerField()
     block_timestamp_last = models.BigIntegerField()
+    # 展示用缓存；筛选/排序请用下面的数值列
     exchange_rate = models.JSONField(null=True, blank=True)
+    price0_in_1 = models.FloatField(null=True, blank=True)
+    price1_in_0 = models.FloatField(null=True, blank=True)
+    # sqrt(reserve0 * reserve1)，按 decimals 归一化
+    liquidity = models.FloatField(null=True, blank=True)
+    token0_address = models.CharField(max_length=50, default='None')
+    token1_address = models.CharField(max_length=50, default='None')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = 'sushiswap_v2'
\ No newline at end of file
+        db_table = 'sushiswap_v2'
+        indexes = [
+            models.Index(fields=['price0_in_1'], name='sushiswap_v2_price0_in_1'),
+            models.Index(fields=['price1_in_0'], name='sushiswap_v2_price1_in_0'),
+            models.Index(fields=['liquidity'], name='sushiswap_v2_liquidity'),
+        ]
+
+
+class SushiSwapV2ReserveSnapshot(ReserveSnapshot):
+    class Meta:
+        db_table = 'sushiswap_v2_reserve_snapshot'
+        indexes = [
+            models.Index(fields=['pair_id', 'ts'], name='sushiswap_v2_snap_pair_ts'),
+            models.Index(fields=['ts'], name='sushiswap_v2_snap_ts'),
+        ]
+
+
+class SushiSwapV2PriceBar(PriceBar):
+    class Meta:
+        db_table = 'sushiswap_v2_price_bar'
+        constraints = [
+            models.UniqueConstraint(fields=['pair_id', 'interval', 'bucket_start'], name='sushiswap_v2_bar_pair_interval'),
+        ]
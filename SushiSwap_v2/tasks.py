@@ -6,21 +6,38 @@ from __future__ import annotations
 
 import os
 import json
+import asyncio
 import logging
-from decimal import Decimal, getcontext
+import time
 from typing import Optional, Dict, Any, List, Tuple
 
 from celery import shared_task
 from django.conf import settings
-from django.db import transaction
 
-from web3 import Web3
-from web3.contract import Contract
+from web3 import AsyncWeb3, Web3
+from web3.contract import AsyncContract, Contract
 from web3.exceptions import BadFunctionCallOutput
 
-from .models import SushiSwapV2
+from dex_common.async_pipeline import (
+    DEFAULT_CONCURRENCY, AsyncTokenMetaResolver, async_safe_call, async_try_call, close_async_web3,
+    get_async_web3, run_pair_pipeline,
+)
+from dex_common.crawl import start_crawl
+from dex_common.discovery import discover_pairs
+from dex_common.engine import V2Dex, V2SyncEngine
+from dex_common.history import record_snapshots
+from dex_common.metrics import task_breakdown
+from dex_common.multicall import (
+    DEFAULT_CHUNK_SIZE, CallExecutor, aggregate3, call_each, is_call_failure,
+)
+from dex_common.pricing import compute_exchange_rate, with_prices  # noqa: F401
+from dex_common.providers import provider_pool
+from dex_common.rpc_batch import DEFAULT_BATCH_SIZE, batch_calls
+from dex_common.token_cache import token_store
+from dex_common.writer import bulk_upsert_pairs
+
+from .models import SushiSwapV2, SushiSwapV2ReserveSnapshot
 
-getcontext().prec = 50
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(name)s: %(message)s')
@@ -35,6 +52,20 @@ if not RPC_URL:
     logger.warning('RPC_URL not found in settings/env; using placeholder (will fail if real call made).')
     RPC_URL = 'https://arb-mainnet.g.alchemy.com/v2/TsCQbiVLIu2jxaD4RL5jN'
 
+# Calls per Multicall3 aggregate3 request (keep under provider gas / response caps)
+MULTICALL_CHUNK_SIZE = getattr(settings, 'MULTICALL_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+# Requests per JSON-RPC batch array in rpc_batch mode
+RPC_BATCH_SIZE = getattr(settings, 'RPC_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+SYNC_MODES = ('serial', 'multicall', 'rpc_batch')
+# Max pair fetches in flight for sync_pairs_batch_async
+ASYNC_SYNC_CONCURRENCY = getattr(settings, 'ASYNC_SYNC_CONCURRENCY', DEFAULT_CONCURRENCY)
+# Upper bound of blocks scanned for PairCreated by one discover_new_pairs run
+PAIR_DISCOVERY_MAX_BLOCKS = getattr(settings, 'PAIR_DISCOVERY_MAX_BLOCKS', 50000)
+# Also write the exchange_rate display JSON next to the numeric price columns
+PAIR_PRICE_DISPLAY = getattr(settings, 'PAIR_PRICE_DISPLAY', True)
+# Append a reserve snapshot for every pair whose reserves changed
+RESERVE_HISTORY_ENABLED = getattr(settings, 'RESERVE_HISTORY_ENABLED', True)
+
 # ---------------------------------------------------------------------------
 # Minimal ABIs
 # ---------------------------------------------------------------------------
@@ -59,25 +90,21 @@ ERC20_ABI = [
     {"name": "decimals", "outputs": [{"type": "uint8", "name": ""}], "inputs": [], "stateMutability": "view", "type": "function"},
 ]
 
-# Token metadata cache (in-process per worker)
-_TOKEN_META: Dict[str, Dict[str, Any]] = {}
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
 def get_w3() -> Web3:
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
-    if not w3.is_connected():  # type: ignore[attr-defined]
-        raise RuntimeError(f'Cannot connect to RPC: {RPC_URL}')
-    return w3
+    # Pooled per worker process; connectivity is only probed after a connection error
+    return provider_pool.web3(RPC_URL, RPC_BATCH_SIZE)
 
 
 def get_factory(w3: Web3) -> Contract:
-    code = w3.eth.get_code(FACTORY_ADDRESS)
-    if len(code) == 0:
+    # eth_getCode runs once per process, not once per task
+    if not provider_pool.has_code(w3, FACTORY_ADDRESS):
         raise RuntimeError('Factory address has no code on this network.')
-    return w3.eth.contract(address=FACTORY_ADDRESS, abi=FACTORY_ABI)
+    return provider_pool.contract(w3, FACTORY_ADDRESS, FACTORY_ABI)
 
 
 def safe_call(fn, default=None):
@@ -89,15 +116,9 @@ def safe_call(fn, default=None):
 
 
 def fetch_token_meta(w3: Web3, address: str) -> Dict[str, Any]:
+    """Token symbol/decimals via the shared token store (LRU, token_meta table, then chain)."""
     address = Web3.to_checksum_address(address)
-    if address in _TOKEN_META:
-        return _TOKEN_META[address]
-    c = w3.eth.contract(address=address, abi=ERC20_ABI)
-    symbol = safe_call(lambda: c.functions.symbol().call(), 'UNKNOWN') or 'UNKNOWN'
-    decimals = safe_call(lambda: c.functions.decimals().call(), 18) or 18
-    meta = {'symbol': symbol, 'decimals': int(decimals)}
-    _TOKEN_META[address] = meta
-    return meta
+    return token_store.get_many(w3, [address], executor=call_each)[address]
 
 
 def fetch_pair_by_index(w3: Web3, factory: Contract, index: int) -> Optional[Dict[str, Any]]:
@@ -124,6 +145,12 @@ def fetch_pair_by_index(w3: Web3, factory: Contract, index: int) -> Optional[Dic
         return None
     meta0 = fetch_token_meta(w3, token0)
     meta1 = fetch_token_meta(w3, token1)
+    return build_pair_data(pair_addr, (reserve0, reserve1, ts), token0, token1, pair_symbol, meta0, meta1)
+
+
+def build_pair_data(pair_addr: str, reserves: Tuple[int, int, int], token0: str, token1: str, pair_symbol: str,
+                    meta0: Dict[str, Any], meta1: Dict[str, Any]) -> Dict[str, Any]:
+    reserve0, reserve1, ts = reserves
     # Determine pair_name preference: if pair_symbol generic, build from tokens
     generic_symbols = {'', 'SLP', 'UNI-V2'}
     if pair_symbol in generic_symbols:
@@ -133,6 +160,8 @@ def fetch_pair_by_index(w3: Web3, factory: Contract, index: int) -> Optional[Dic
     return {
         'pair_address': pair_addr,
         'pair_name': pair_name,
+        'token0_address': token0,
+        'token1_address': token1,
         'token0_name': meta0['symbol'],
         'token1_name': meta1['symbol'],
         'token0_reserve': int(reserve0),
@@ -143,67 +172,118 @@ def fetch_pair_by_index(w3: Web3, factory: Contract, index: int) -> Optional[Dic
     }
 
 
-def compute_exchange_rate(token0_reserve: int, token1_reserve: int, d0: int, d1: int) -> Optional[Dict[str, Any]]:
-    if token0_reserve == 0 or token1_reserve == 0:
+def fetch_pairs_batched(w3: Web3, indices: List[int], chunk_size: int = MULTICALL_CHUNK_SIZE,
+                        executor: CallExecutor = aggregate3) -> List[Dict[str, Any]]:
+    """Fetch many pairs in three batched rounds: allPairs, pair reads and token metadata.
+
+    Pairs already in the pair registry skip discovery and only read getReserves.
+    ``executor`` is multicall.aggregate3 (one eth_call per chunk) or rpc_batch.batch_calls
+    (one JSON-RPC batch array per chunk, for providers without Multicall3).
+    """
+    return V2SyncEngine([DEX], chunk_size, executor).fetch_rows(w3, [(DEX, indices)])[DEX.name]
+
+
+def rows_from_snapshots(w3: Web3, snapshots: List[Dict[str, Any]], chunk_size: int = MULTICALL_CHUNK_SIZE,
+                        executor: CallExecutor = aggregate3) -> List[Dict[str, Any]]:
+    """Turn pair snapshots into model rows, resolving token metadata in one batched round."""
+    return V2SyncEngine([DEX], chunk_size, executor).rows_from_snapshots(w3, [DEX], {DEX.name: snapshots})[DEX.name]
+
+
+async def async_fetch_pair_by_index(w3: AsyncWeb3, factory: AsyncContract, index: int,
+                                    tokens: AsyncTokenMetaResolver) -> Optional[Dict[str, Any]]:
+    ok, pair_addr = await async_try_call(factory.functions.allPairs(index).call())
+    if not ok:
+        logger.warning('allPairs(%s) reverted', index)
+        return None
+    pair_addr = Web3.to_checksum_address(pair_addr)
+    if len(await w3.eth.get_code(pair_addr)) == 0:
+        logger.warning('Pair %s has no code (skip)', pair_addr)
         return None
-    adj0 = Decimal(token0_reserve) / (Decimal(10) ** d0)
-    adj1 = Decimal(token1_reserve) / (Decimal(10) ** d1)
-    if adj0 == 0 or adj1 == 0:
+    pair_c = w3.eth.contract(address=pair_addr, abi=PAIR_ABI)
+    try:
+        (reserve0, reserve1, ts), token0, token1, pair_symbol = await asyncio.gather(
+            pair_c.functions.getReserves().call(),
+            pair_c.functions.token0().call(),
+            pair_c.functions.token1().call(),
+            async_safe_call(pair_c.functions.symbol().call(), ''),
+        )
+    except Exception as e:
+        if not is_call_failure(e):
+            raise
+        logger.warning('Pair %s call revert: %s', pair_addr, e)
         return None
-    price0_in_1 = adj1 / adj0
-    price1_in_0 = adj0 / adj1
-    def fmt(x: Decimal) -> str:
-        return f"{x:.8f}".rstrip('0').rstrip('.') or '0'
-    return {
-        'numeric': {
-            'price_token0_in_token1': fmt(price0_in_1),
-            'price_token1_in_token0': fmt(price1_in_0)
-        },
-        'display': {
-            '1 token0': f"{fmt(price0_in_1)} token1",
-            '1 token1': f"{fmt(price1_in_0)} token0"
-        }
-    }
+    meta0, meta1 = await asyncio.gather(tokens.get(token0), tokens.get(token1))
+    return build_pair_data(pair_addr, (reserve0, reserve1, ts), token0, token1, pair_symbol or '', meta0, meta1)
+
+
+
+# Fields compared against the stored row; a pair is only written when one differs
+# (token addresses included so rows stored before they were tracked get filled once)
+RESERVE_FIELDS = ['token0_reserve', 'token1_reserve', 'token0_address', 'token1_address']
+UPSERT_FIELDS = [
+    'pair_name', 'token0_name', 'token1_name', 'token0_reserve', 'token1_reserve',
+    'token0_decimals', 'token1_decimals', 'block_timestamp_last', 'exchange_rate',
+    'token0_address', 'token1_address', 'price0_in_1', 'price1_in_0', 'liquidity', 'updated_at',
+]
 
 
 def store_pair(data: Dict[str, Any]) -> Tuple[SushiSwapV2, bool]:
-    # Prepare exchange_rate JSON
-    ex = compute_exchange_rate(
-        data['token0_reserve'], data['token1_reserve'], data['token0_decimals'], data['token1_decimals']
+    counts = store_pairs([data])
+    return SushiSwapV2.objects.get(pair_address=data['pair_address']), counts['created'] == 1
+
+
+def store_pairs(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Upsert a batch of pair dicts in one statement; unchanged reserves are not written."""
+    return bulk_upsert_pairs(
+        SushiSwapV2, rows, RESERVE_FIELDS, UPSERT_FIELDS, prepare_many=_with_prices,
+        after_write=_record_history if RESERVE_HISTORY_ENABLED else None,
     )
-    with transaction.atomic():
-        obj, created = SushiSwapV2.objects.select_for_update().get_or_create(
-            pair_address=data['pair_address'],
-            defaults={**data, 'exchange_rate': ex}
-        )
-        if not created:
-            changed = False
-            for field in [
-                'pair_name', 'token0_name', 'token1_name', 'token0_reserve', 'token1_reserve',
-                'token0_decimals', 'token1_decimals', 'block_timestamp_last'
-            ]:
-                if getattr(obj, field) != data[field]:
-                    setattr(obj, field, data[field])
-                    changed = True
-            if ex != obj.exchange_rate:
-                obj.exchange_rate = ex
-                changed = True
-            if changed:
-                obj.save()
-        return obj, created
+
+
+def _with_prices(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return with_prices(rows, display=PAIR_PRICE_DISPLAY)
+
+
+def _record_history(rows: List[Dict[str, Any]]) -> None:
+    # Polled reads are not pinned to a block: block_number 0, write time as ts (as for Camelot,
+    # whose getReserves has no blockTimestampLast, so bars of both venues share one clock)
+    now = int(time.time())
+    record_snapshots(SushiSwapV2ReserveSnapshot, SushiSwapV2, [
+        (r['pair_address'], r['token0_reserve'], r['token1_reserve'], 0, now)
+        for r in rows
+    ])
+
+
+# Configuration for dex_common.engine; dex_common.tasks.sync_v2_dexes batches it with the other DEXes
+DEX = V2Dex(
+    name='sushiswap_v2',
+    factory=FACTORY_ADDRESS,
+    factory_abi=FACTORY_ABI,
+    pair_abi=PAIR_ABI,
+    build_row=build_pair_data,
+    store_rows=store_pairs,
+    symbol_fallback='',
+)
+
 
 # ---------------------------------------------------------------------------
 # Celery Tasks
 # ---------------------------------------------------------------------------
 
 @shared_task
-def sync_pairs_batch(start_index: int = 0, limit: int = 20) -> Dict[str, Any]:
+def sync_pairs_batch(start_index: int = 0, limit: int = 20, mode: str = 'serial',
+                     chunk_size: Optional[int] = None) -> Dict[str, Any]:
     """Sync a batch of pairs from the SushiSwap V2 factory.
     Args:
         start_index: starting pair index
         limit: number of pairs to process
+        mode: 'serial' (one eth_call per read), 'multicall' (reads batched via Multicall3)
+            or 'rpc_batch' (reads sent as JSON-RPC batch arrays)
+        chunk_size: calls per aggregate3 request / JSON-RPC batch
     Returns summary dict
     """
+    if mode not in SYNC_MODES:
+        return {'ok': False, 'error': f'Unknown sync mode: {mode}'}
     w3 = get_w3()
     factory = get_factory(w3)
     try:
@@ -213,40 +293,94 @@ def sync_pairs_batch(start_index: int = 0, limit: int = 20) -> Dict[str, Any]:
         return {'ok': False, 'error': str(e)}
 
     end = min(start_index + limit, total)
-    processed = 0
-    created = 0
-    updated = 0
     skipped = 0
-    addresses: List[str] = []
-
-    for idx in range(start_index, end):
-        pdata = fetch_pair_by_index(w3, factory, idx)
-        if not pdata:
-            skipped += 1
-            continue
-        obj, was_created = store_pair(pdata)
-        addresses.append(obj.pair_address)
-        processed += 1
-        if was_created:
-            created += 1
-        else:
-            updated += 1
+
+    if mode == 'multicall':
+        pairs = fetch_pairs_batched(w3, list(range(start_index, end)), chunk_size or MULTICALL_CHUNK_SIZE)
+        skipped = (end - start_index) - len(pairs)
+    elif mode == 'rpc_batch':
+        pairs = fetch_pairs_batched(w3, list(range(start_index, end)), chunk_size or RPC_BATCH_SIZE, batch_calls)
+        skipped = (end - start_index) - len(pairs)
+    else:
+        pairs = []
+        for idx in range(start_index, end):
+            pdata = fetch_pair_by_index(w3, factory, idx)
+            if not pdata:
+                skipped += 1
+                continue
+            pairs.append(pdata)
+
+    counts = store_pairs(pairs)
     summary = {
         'ok': True,
         'factory': FACTORY_ADDRESS,
+        'mode': mode,
         'total_pairs': total,
         'range': [start_index, end],
         'attempted': end - start_index,
-        'processed': processed,
-        'created': created,
-        'updated': updated,
+        'processed': len(pairs),
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'unchanged': counts['unchanged'],
         'skipped': skipped,
-        'addresses': addresses,
+        'addresses': [p['pair_address'] for p in pairs],
+        'metrics': task_breakdown(),
     }
     logger.info('Batch sync summary %s', summary)
     return summary
 
 
+async def _sync_pairs_async(start_index: int, limit: int, concurrency: int) -> Dict[str, Any]:
+    w3 = get_async_web3(RPC_URL)
+    try:
+        factory = w3.eth.contract(address=FACTORY_ADDRESS, abi=FACTORY_ABI)
+        try:
+            total = await factory.functions.allPairsLength().call()
+        except Exception as e:
+            logger.error('Cannot read allPairsLength: %s', e)
+            return {'ok': False, 'error': str(e)}
+        end = min(start_index + limit, total)
+        tokens = AsyncTokenMetaResolver(w3, ERC20_ABI, token_store)
+        stats = await run_pair_pipeline(
+            range(start_index, end),
+            lambda idx: async_fetch_pair_by_index(w3, factory, idx, tokens),
+            store_pairs,
+            concurrency,
+        )
+    finally:
+        await close_async_web3(w3)
+    summary = {
+        'ok': True,
+        'factory': FACTORY_ADDRESS,
+        'mode': 'async',
+        'concurrency': concurrency,
+        'total_pairs': total,
+        'range': [start_index, end],
+        'attempted': end - start_index,
+        'processed': stats['processed'],
+        'created': stats.get('created', 0),
+        'updated': stats.get('updated', 0),
+        'unchanged': stats.get('unchanged', 0),
+        'skipped': stats['skipped'],
+        'addresses': stats['addresses'],
+        'metrics': task_breakdown(),
+    }
+    logger.info('Async batch sync summary %s', summary)
+    return summary
+
+
+@shared_task
+def sync_pairs_batch_async(start_index: int = 0, limit: int = 100, concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """Sync a batch of pairs with an AsyncWeb3 fan-out.
+    Args:
+        start_index: starting pair index
+        limit: number of pairs to process
+        concurrency: max pairs in flight (defaults to ASYNC_SYNC_CONCURRENCY)
+    Returns summary dict
+    """
+    return asyncio.run(_sync_pairs_async(start_index, limit, concurrency or ASYNC_SYNC_CONCURRENCY))
+
+
 @shared_task
 def sync_single_pair(index: int) -> Optional[str]:
     """Sync a single pair by its factory index. Returns pair address or None."""
@@ -263,3 +397,52 @@ def sync_single_pair(index: int) -> Optional[str]:
 def sync_first_n_pairs(n: int = 50) -> Dict[str, Any]:
     """Convenience wrapper to sync first n pairs from index 0."""
     return sync_pairs_batch(start_index=0, limit=n)
+
+
+@shared_task
+def sync_all_pairs(mode: str = 'multicall', shard_size: Optional[int] = None) -> Dict[str, Any]:
+    """Crawl the whole factory as a chord of sync_pairs_batch shards spread over the workers.
+    Args:
+        mode: sync_pairs_batch mode used by every shard
+        shard_size: pairs per shard; by default derived from the previous crawl's per-pair time
+    Returns dispatch summary; the merged report is the chord result
+    """
+    if mode not in SYNC_MODES:
+        return {'ok': False, 'error': f'Unknown sync mode: {mode}'}
+    w3 = get_w3()
+    try:
+        total = get_factory(w3).functions.allPairsLength().call()
+    except Exception as e:
+        logger.error('Cannot read allPairsLength: %s', e)
+        return {'ok': False, 'error': str(e)}
+    return start_crawl(sync_pairs_batch.name, FACTORY_ADDRESS, total, mode, shard_size)
+
+
+@shared_task
+def discover_new_pairs(from_block: Optional[int] = None, max_blocks: Optional[int] = None) -> Dict[str, Any]:
+    """Register pairs from factory PairCreated logs since the last checkpoint and store them.
+    Args:
+        from_block: override the stored checkpoint (first run defaults to the current head)
+        max_blocks: cap on blocks scanned this run
+    Returns summary dict
+    """
+    w3 = get_w3()
+    scan = discover_pairs(
+        w3, FACTORY_ADDRESS, PAIR_ABI, from_block, max_blocks or PAIR_DISCOVERY_MAX_BLOCKS,
+        chunk_size=MULTICALL_CHUNK_SIZE,
+    )
+    pairs = rows_from_snapshots(w3, scan['snapshots'])
+    counts = store_pairs(pairs)
+    return {
+        'ok': True,
+        'factory': FACTORY_ADDRESS,
+        'from_block': scan['from_block'],
+        'to_block': scan['to_block'],
+        'events': scan['events'],
+        'processed': len(pairs),
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'unchanged': counts['unchanged'],
+        'skipped': scan['events'] - len(pairs),
+        'addresses': [p['pair_address'] for p in pairs],
+    }
@@ -0,0 +1,144 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 币安按 IP 统计请求权重，超限返回 429，持续超限返回 418 封禁；这里取保守的每分钟权重上限
+BINANCE_WEIGHT_PER_MINUTE = getattr(settings, 'BINANCE_WEIGHT_PER_MINUTE', 1200)
+# 每个 host 的长连接数，应不小于并发线程数
+BINANCE_POOL_SIZE = getattr(settings, 'BINANCE_POOL_SIZE', 16)
+BINANCE_MAX_RETRIES = getattr(settings, 'BINANCE_MAX_RETRIES', 3)
+BINANCE_RETRY_BACKOFF = getattr(settings, 'BINANCE_RETRY_BACKOFF', 0.5)
+REQUEST_TIMEOUT = 10
+# 这些状态码值得重试（限流 / 服务端错误）
+RETRY_STATUS = (418, 429, 500, 502, 503, 504)
+
+
+class BinanceAPIError(Exception):
+    '''
+    接口返回了业务错误（code 不是 000000），重试没有意义。
+    '''
+
+
+class TokenBucket:
+    '''
+    线程安全的令牌桶限速器。
+    容量和补充速率都按请求权重计算；acquire 在令牌不足时阻塞等待。
+    '''
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def acquire(self, weight=1):
+        weight = min(float(weight), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                wait = max(self._blocked_until - now, (weight - self._tokens) / self.refill_per_second)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        '''
+        服务端要求退避（Retry-After）时，所有线程一起暂停并清空令牌。
+        '''
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+weight_limiter = TokenBucket(BINANCE_WEIGHT_PER_MINUTE, BINANCE_WEIGHT_PER_MINUTE / 60.0)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    '''
+    进程内共享的 requests.Session（连接池复用 TCP/TLS 连接，多线程共用）。
+    '''
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=BINANCE_POOL_SIZE, pool_maxsize=BINANCE_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def unwrap(api_data):
+    '''
+    检查币安 bapi 的业务返回码，成功时返回 data 字段。
+    '''
+    if api_data.get("code") == "000000" and api_data.get("success") is True:
+        return api_data.get('data')
+    raise BinanceAPIError(f"API业务返回异常: code={api_data.get('code')} message={api_data.get('message')}")
+
+
+def _retry_after(response):
+    '''
+    Retry-After 的秒数；HTTP 日期等无法解析的值按 1 秒处理。
+    '''
+    try:
+        return max(float(response.headers.get('Retry-After') or 1), 0.0)
+    except ValueError:
+        return 1.0
+
+
+def request(url, params=None, weight=1, headers=None, stream=False,
+            max_retries=BINANCE_MAX_RETRIES, backoff=BINANCE_RETRY_BACKOFF):
+    '''
+    限速 + 重试的 GET 请求，返回 Response（304 原样返回，其他 4xx 抛 HTTPError）。
+    网络错误和 RETRY_STATUS 中的状态码按指数退避（带抖动）重试；429/418 会按 Retry-After 暂停所有线程。
+    '''
+    error = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(backoff * (2 ** (attempt - 1)) * (1 + random.random()))
+        weight_limiter.acquire(weight)
+        try:
+            response = get_session().get(url, params=params, headers=headers, stream=stream, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            error = e
+            continue
+        if response.status_code in RETRY_STATUS:
+            if response.status_code in (418, 429):
+                retry_after = _retry_after(response)
+                logger.warning(f"触发币安限流({response.status_code})，暂停 {retry_after} 秒")
+                weight_limiter.pause(retry_after)
+            error = requests.exceptions.HTTPError(f"{response.status_code} for {response.url}", response=response)
+            response.close()
+            continue
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+    raise error
+
+
+def get_json(url, params=None, weight=1, max_retries=BINANCE_MAX_RETRIES, backoff=BINANCE_RETRY_BACKOFF):
+    '''
+    限速 + 重试的 GET 请求，返回 data 字段；业务错误直接抛出 BinanceAPIError，不重试。
+    '''
+    response = request(url, params, weight, max_retries=max_retries, backoff=backoff)
+    return unwrap(response.json())
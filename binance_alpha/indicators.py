@@ -0,0 +1,157 @@
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, router
+
+from binance_alpha.models import AlphaATR
+
+logger = logging.getLogger(__name__)
+
+# Wilder ATR 的平滑周期
+ATR_PERIOD = getattr(settings, 'ATR_PERIOD', 14)
+
+# K 线数组下标：[openTime, open, high, low, close, volume, closeTime, ...]
+K_OPEN_TIME, K_HIGH, K_LOW, K_CLOSE, K_CLOSE_TIME = 0, 2, 3, 4, 6
+
+
+def closed_klines(klines, last_open_time, now_ms=None):
+    '''
+    过滤出开盘时间晚于 last_open_time 且已经收盘的 K 线（按开盘时间升序）。
+    最后一根通常还在走，不能计入 ATR。
+    '''
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    rows = []
+    for k in klines or []:
+        open_time = int(k[K_OPEN_TIME])
+        if open_time <= last_open_time:
+            continue
+        if len(k) > K_CLOSE_TIME and int(k[K_CLOSE_TIME]) >= now_ms:
+            continue
+        rows.append(k)
+    rows.sort(key=lambda k: int(k[K_OPEN_TIME]))
+    return rows
+
+
+class ATRPEngine:
+    '''
+    多个代币的 Wilder ATR 状态，用 NumPy 数组保存，一次更新所有代币。
+    预热期（前 period 个 TR）取简单平均，之后 ATR = (ATR * (period - 1) + TR) / period。
+    '''
+
+    def __init__(self, symbols, interval='5m', period=ATR_PERIOD):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.period = period
+        n = len(self.symbols)
+        self.prev_close = np.full(n, np.nan)
+        self.atr = np.zeros(n)
+        self.samples = np.zeros(n, dtype=np.int64)
+        self.last_open_time = np.zeros(n, dtype=np.int64)
+        self.atrp = np.full(n, np.nan)
+
+    @classmethod
+    def from_db(cls, symbols, interval='5m', period=ATR_PERIOD):
+        '''
+        从 alpha_atr 表恢复状态；周期变了的代币从头预热。
+        '''
+        engine = cls(symbols, interval, period)
+        index = {s: i for i, s in enumerate(engine.symbols)}
+        rows = AlphaATR.objects.filter(tokenId__in=engine.symbols, interval=interval)
+        for row in rows:
+            if row.period != period:
+                continue
+            i = index[row.tokenId]
+            engine.prev_close[i] = np.nan if row.prev_close is None else row.prev_close
+            engine.atr[i] = row.atr
+            engine.samples[i] = row.samples
+            engine.last_open_time[i] = row.last_open_time
+            engine.atrp[i] = np.nan if row.atrp is None else row.atrp
+        return engine
+
+    def update(self, data_dict, now_ms=None):
+        '''
+        计入 {symbol: klines} 里的新 K 线，返回本次有更新的代币下标。
+        第 k 步同时处理所有代币的第 k 根新 K 线，每根 K 线 O(1)。
+        '''
+        index = {s: i for i, s in enumerate(self.symbols)}
+        pending = {}
+        for symbol, klines in data_dict.items():
+            i = index.get(symbol)
+            if i is None:
+                continue
+            rows = closed_klines(klines, int(self.last_open_time[i]), now_ms)
+            if rows:
+                pending[i] = np.array([[float(k[K_HIGH]), float(k[K_LOW]), float(k[K_CLOSE]), int(k[K_OPEN_TIME])]
+                                       for k in rows])
+        if not pending:
+            return np.array([], dtype=np.int64)
+
+        steps = max(len(rows) for rows in pending.values())
+        n = len(self.symbols)
+        high = np.full((steps, n), np.nan)
+        low = np.full((steps, n), np.nan)
+        close = np.full((steps, n), np.nan)
+        open_time = np.zeros((steps, n), dtype=np.int64)
+        for i, rows in pending.items():
+            high[:len(rows), i] = rows[:, 0]
+            low[:len(rows), i] = rows[:, 1]
+            close[:len(rows), i] = rows[:, 2]
+            open_time[:len(rows), i] = rows[:, 3]
+
+        period = self.period
+        for k in range(steps):
+            mask = ~np.isnan(close[k])
+            h, l, c, pc = high[k, mask], low[k, mask], close[k, mask], self.prev_close[mask]
+            # 没有上一根收盘价时 TR 取 high - low
+            tr = np.where(np.isnan(pc), h - l,
+                          np.maximum(h - l, np.maximum(np.abs(h - pc), np.abs(l - pc))))
+            atr, seen = self.atr[mask], self.samples[mask]
+            warm = seen < period
+            atr = np.where(warm, (atr * seen + tr) / (seen + 1), (atr * (period - 1) + tr) / period)
+            seen = seen + 1
+            self.atr[mask] = atr
+            self.samples[mask] = seen
+            self.prev_close[mask] = c
+            self.last_open_time[mask] = open_time[k, mask]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.atrp[mask] = np.where((seen >= period) & (c > 0), atr / c * 100, np.nan)
+        return np.array(sorted(pending), dtype=np.int64)
+
+    def results(self, indices=None):
+        '''
+        {symbol: ATRP}，预热未完成的代币为 None。
+        '''
+        indices = range(len(self.symbols)) if indices is None else indices
+        return {
+            self.symbols[i]: None if np.isnan(self.atrp[i]) else float(self.atrp[i])
+            for i in indices
+        }
+
+    def save(self, indices):
+        '''
+        把这些代币的状态和 ATRP 批量 upsert 到 alpha_atr 表。
+        '''
+        objs = [
+            AlphaATR(
+                tokenId=self.symbols[i],
+                interval=self.interval,
+                period=self.period,
+                prev_close=None if np.isnan(self.prev_close[i]) else float(self.prev_close[i]),
+                atr=float(self.atr[i]),
+                samples=int(self.samples[i]),
+                last_open_time=int(self.last_open_time[i]),
+                atrp=None if np.isnan(self.atrp[i]) else float(self.atrp[i]),
+            )
+            for i in indices
+        ]
+        connection = connections[router.db_for_write(AlphaATR)]
+        unique_fields = ['tokenId', 'interval'] if connection.features.supports_update_conflicts_with_target else None
+        AlphaATR.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['period', 'prev_close', 'atr', 'samples', 'last_open_time', 'atrp', 'updated_at'],
+        )
+        return len(objs)
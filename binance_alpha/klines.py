@@ -0,0 +1,75 @@
+import logging
+
+from django.db import connections, router
+from django.db.models import Max
+
+from binance_alpha.models import AlphaKline
+
+logger = logging.getLogger(__name__)
+
+# K 线周期对应的毫秒数
+INTERVAL_MS = {
+    '1m': 60_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '1h': 3_600_000,
+    '4h': 14_400_000,
+    '1d': 86_400_000,
+}
+STORE_BATCH_SIZE = 1000
+
+UPDATE_FIELDS = ['close_time', 'open', 'high', 'low', 'close', 'volume']
+
+
+def last_open_times(symbols, interval):
+    '''
+    每个代币库里最后一根 K 线的开盘时间（毫秒），没有数据的代币不在结果里。
+    '''
+    rows = (AlphaKline.objects.filter(tokenId__in=list(symbols), interval=interval)
+            .values('tokenId').annotate(last=Max('open_time')))
+    return {r['tokenId']: r['last'] for r in rows}
+
+
+def store_klines(data_dict, interval):
+    '''
+    批量 upsert {symbol: klines}；同一根 K 线再次写入时覆盖（上次写入时可能还没收盘）。
+    '''
+    objs = [
+        AlphaKline(
+            tokenId=symbol, interval=interval, open_time=int(k[0]), open=float(k[1]), high=float(k[2]),
+            low=float(k[3]), close=float(k[4]), volume=float(k[5]), close_time=int(k[6]),
+        )
+        for symbol, klines in data_dict.items() for k in klines
+    ]
+    if not objs:
+        return 0
+    connection = connections[router.db_for_write(AlphaKline)]
+    unique_fields = (['tokenId', 'interval', 'open_time']
+                     if connection.features.supports_update_conflicts_with_target else None)
+    AlphaKline.objects.bulk_create(
+        objs, batch_size=STORE_BATCH_SIZE, update_conflicts=True, unique_fields=unique_fields, update_fields=UPDATE_FIELDS,
+    )
+    return len(objs)
+
+
+def load_klines(after, interval):
+    '''
+    读取 {symbol: 开盘时间下限} 之后的 K 线，返回 {symbol: klines}（与接口相同的列表格式，按时间升序）。
+    '''
+    if not after:
+        return {}
+    # 没有状态的代币（下限 0）单独一组读全量，其余代币一次查询取最早的下限，再按各自的下限过滤
+    fresh = [symbol for symbol, open_time in after.items() if not open_time]
+    known = [symbol for symbol, open_time in after.items() if open_time]
+    data_dict = {symbol: [] for symbol in after}
+    for symbols in (fresh, known):
+        if not symbols:
+            continue
+        rows = (AlphaKline.objects.filter(tokenId__in=symbols, interval=interval,
+                                          open_time__gt=min(after[symbol] for symbol in symbols))
+                .order_by('tokenId', 'open_time')
+                .values_list('tokenId', 'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time'))
+        for symbol, *kline in rows.iterator(chunk_size=STORE_BATCH_SIZE):
+            if kline[0] > after[symbol]:
+                data_dict[symbol].append(kline)
+    return data_dict
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('binance_alpha', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlphaATR',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tokenId', models.CharField(max_length=50)),
+                ('interval', models.CharField(max_length=10)),
+                ('period', models.IntegerField()),
+                ('prev_close', models.FloatField(null=True)),
+                ('atr', models.FloatField(default=0)),
+                ('samples', models.IntegerField(default=0)),
+                ('last_open_time', models.BigIntegerField(default=0)),
+                ('atrp', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'alpha_atr',
+                'constraints': [models.UniqueConstraint(fields=('tokenId', 'interval'), name='alpha_atr_token_interval')],
+            },
+        ),
+    ]
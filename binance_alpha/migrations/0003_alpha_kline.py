@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('binance_alpha', '0002_alpha_atr'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlphaKline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tokenId', models.CharField(max_length=50)),
+                ('interval', models.CharField(max_length=10)),
+                ('open_time', models.BigIntegerField()),
+                ('close_time', models.BigIntegerField()),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('volume', models.FloatField()),
+            ],
+            options={
+                'db_table': 'alpha_kline',
+                'constraints': [models.UniqueConstraint(fields=('tokenId', 'interval', 'open_time'), name='alpha_kline_token_interval_time')],
+            },
+        ),
+    ]
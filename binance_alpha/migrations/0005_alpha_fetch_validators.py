@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('binance_alpha', '0004_alpha_sync_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alphasyncstate',
+            name='body_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='alphasyncstate',
+            name='etag',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='alphasyncstate',
+            name='last_modified',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
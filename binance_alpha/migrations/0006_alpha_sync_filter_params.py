@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('binance_alpha', '0005_alpha_fetch_validators'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alphasyncstate',
+            name='filter_params',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+    ]
@@ -20,4 +20,72 @@ class alpha(models.Model):
     class Meta:
         db_table = "alpha"
         verbose_name = "alpha"
-        verbose_name_plural = "alpha"
\ No newline at end of file
+        verbose_name_plural = "alpha"
+
+
+class AlphaATR(models.Model):
+    '''
+    每个代币的 Wilder ATR 状态和最新 ATRP。
+    状态（上一根收盘价、ATR、已计入的 K 线数）随每根新 K 线 O(1) 更新并持久化，重启后不用重新预热。
+    '''
+    tokenId = models.CharField(max_length=50)
+    interval = models.CharField(max_length=10)
+    period = models.IntegerField()
+    prev_close = models.FloatField(null=True)
+    atr = models.FloatField(default=0)
+    # 已计入的 TR 个数；小于 period 时仍在预热，atrp 为空
+    samples = models.IntegerField(default=0)
+    # 最后一根已计入的 K 线开盘时间（毫秒），用来跳过重复的 K 线
+    last_open_time = models.BigIntegerField(default=0)
+    # ATR / 收盘价 * 100
+    atrp = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tokenId} {self.interval} ATRP={self.atrp}"
+
+    class Meta:
+        db_table = "alpha_atr"
+        constraints = [
+            models.UniqueConstraint(fields=['tokenId', 'interval'], name='alpha_atr_token_interval'),
+        ]
+
+
+class AlphaKline(models.Model):
+    '''
+    本地 K 线库，(tokenId, interval, open_time) 唯一；价格和成交量用浮点数存，省空间。
+    '''
+    tokenId = models.CharField(max_length=50)
+    interval = models.CharField(max_length=10)
+    # 开盘 / 收盘时间（毫秒）
+    open_time = models.BigIntegerField()
+    close_time = models.BigIntegerField()
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.FloatField()
+
+    class Meta:
+        db_table = "alpha_kline"
+        constraints = [
+            models.UniqueConstraint(fields=['tokenId', 'interval', 'open_time'], name='alpha_kline_token_interval_time'),
+        ]
+
+
+class AlphaSyncState(models.Model):
+    '''
+    同步任务的上次状态，按 name 区分；payload_hash 相同时跳过写库。
+    etag / last_modified 用于条件请求；接口不支持时用响应体哈希 body_hash 判断列表是否变化。
+    filter_params 记录这些校验值对应的筛选参数，参数变了校验值就作废。
+    '''
+    name = models.CharField(max_length=50, unique=True)
+    payload_hash = models.CharField(max_length=64, blank=True, default='')
+    etag = models.CharField(max_length=200, blank=True, default='')
+    last_modified = models.CharField(max_length=100, blank=True, default='')
+    body_hash = models.CharField(max_length=64, blank=True, default='')
+    filter_params = models.CharField(max_length=50, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "alpha_sync_state"
@@ -1,12 +1,24 @@
+import hashlib
+import heapq
+import json
 import logging.config
 import logging
 import requests
+from django.conf import settings
 from django.db import transaction
 
 from Defi_Monitor.settings import LOGGING
-from binance_alpha.models import alpha
+from binance_alpha.client import BinanceAPIError, request
+from binance_alpha.models import AlphaSyncState, alpha
 from celery import shared_task
 
+try:
+    import ijson
+    PARSE_ERRORS = (ValueError, ijson.JSONError)
+except ImportError:  # 没装 ijson 时退回整体解析
+    ijson = None
+    PARSE_ERRORS = (ValueError,)
+
 
 
 logging.config.dictConfig(LOGGING)
@@ -14,36 +26,12 @@ logger = logging.getLogger(__name__)
 
 
 REQUEST_URL_TOKEN = "https://www.binance.com/bapi/defi/v1/public/wallet-direct/buw/wallet/cex/alpha/all/token/list"
-REQUEST_TIMEOUT = 10
-
-
-def get_binance_alpha_token_list():
-    '''
-    调用币安API，获取所有可用的Binance Alpha代币列表。
-    返回 data 列表；若失败返回 None。
-    '''
-    try:
-        response = requests.request("GET", REQUEST_URL_TOKEN, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        api_data = response.json()
-
-        if api_data.get("code") == "000000" and api_data.get("success") is True:
-            data = api_data.get('data') or []
-            logger.info("成功获取到数据！！！")
-            logger.info(f"总共有{len(data)} 个alpha代币")
-            return data
-        else:
-            # 业务错误也进行日志记录
-            logger.error(f"API业务返回异常: code={api_data.get('code')} message={api_data.get('message')}")
-            return None
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP错误: {e}")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"请求错误: {e}")
-    except ValueError as e:
-        # JSON 解析失败
-        logger.error(f"解析JSON失败: {e}")
-    return None
+# 只保留 mulPoint 为该值的代币，按 24h 交易量取前 N 个（None 表示全部保留）
+ALPHA_MUL_POINT = getattr(settings, 'ALPHA_MUL_POINT', 4)
+ALPHA_TOP_N = getattr(settings, 'ALPHA_TOP_N', 10)
+SYNC_STATE_NAME = "alpha_token_list"
+# 差异同步时比较/更新的字段
+TOKEN_FIELDS = ['name', 'symbol', 'mulPoint', 'price', 'percentChange24h', 'volume24h', 'liquidity']
 
 
 def _to_number(val, default=0):
@@ -57,24 +45,199 @@ def _to_number(val, default=0):
         return default
 
 
-def get_4xPoint_token():
+class _HashingReader:
+    '''
+    边读边算 sha256 的文件对象，供流式解析使用。
+    '''
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        self.digest.update(chunk)
+        return chunk
+
+
+def _iter_items(reader, meta):
     '''
-    获取积分为4的代币列表
+    流式解析 {"code", "success", "data": [...]}：逐个产出 data 里的代币，顶层字段写入 meta。
     '''
-    token_list = get_binance_alpha_token_list()
-    if not token_list:
-        logger.error("未能获取到代币列表，无法继续处理。")
+    if ijson is None:
+        api_data = json.loads(reader.read())
+        meta.update({k: api_data.get(k) for k in ('code', 'success', 'message')})
+        yield from api_data.get('data') or []
+        return
+    builder = None
+    for prefix, event, value in ijson.parse(reader):
+        if prefix == 'data.item' and event == 'start_map':
+            builder = ijson.ObjectBuilder()
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == 'data.item' and event == 'end_map':
+                yield builder.value
+                builder = None
+        elif prefix in ('code', 'success', 'message'):
+            meta[prefix] = value
+
+
+def select_top_tokens(items, mul_point=ALPHA_MUL_POINT, top_n=ALPHA_TOP_N):
+    '''
+    过滤 mulPoint，并用大小为 top_n 的小顶堆按 volume24h 取前 top_n 个（不排序整个列表）。
+    返回 (按交易量降序的代币, 总数, 符合 mulPoint 的个数)。
+    '''
+    heap = []
+    kept = []
+    total = matched = 0
+    for seq, token in enumerate(items):
+        total += 1
+        if _to_number(token.get("mulPoint")) != mul_point:
+            continue
+        matched += 1
+        # seq 保证交易量相同时先出现的排在前面
+        entry = (_to_number(token.get('volume24h')), -seq, token)
+        if not top_n:
+            kept.append(entry)
+        elif len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    ranked = sorted(kept or heap, key=lambda e: e[:2], reverse=True)
+    return [e[2] for e in ranked], total, matched
+
+
+def fetch_alpha_tokens(mul_point=ALPHA_MUL_POINT, top_n=ALPHA_TOP_N, state=None):
+    '''
+    流式获取代币列表并只保留需要的代币。
+    传入上次的同步状态时发送 If-None-Match / If-Modified-Since；接口不支持条件请求时比较响应体哈希。
+    上次的筛选参数（mulPoint、前 N 个）与本次不同时不发校验值，304 不会跳过改了配置后的同步。
+    返回 {'modified', 'tokens', 'total', 'validators'}；失败返回 None。
+    '''
+    filter_params = f"{mul_point}:{top_n}"
+    if state is not None and state.filter_params != filter_params:
+        state = None
+    headers = {}
+    if state is not None and state.etag:
+        headers['If-None-Match'] = state.etag
+    if state is not None and state.last_modified:
+        headers['If-Modified-Since'] = state.last_modified
+    try:
+        response = request(REQUEST_URL_TOKEN, headers=headers, stream=True)
+        with response:
+            if response.status_code == 304:
+                logger.info("代币列表未变化（304），跳过解析。")
+                return {'modified': False, 'tokens': [], 'total': None, 'validators': {}}
+            response.raw.decode_content = True
+            reader = _HashingReader(response.raw)
+            # 筛选参数也计入哈希：改了配置时即使响应体相同也要重新同步
+            reader.digest.update(f"{filter_params}\n".encode())
+            meta = {}
+            tokens, total, matched = select_top_tokens(_iter_items(reader, meta), mul_point, top_n)
+            if meta.get('code') != "000000" or meta.get('success') is not True:
+                raise BinanceAPIError(f"API业务返回异常: code={meta.get('code')} message={meta.get('message')}")
+            validators = {
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+                'body_hash': reader.digest.hexdigest(),
+                'filter_params': filter_params,
+            }
+    except requests.exceptions.RequestException as e:
+        logger.error(f"请求错误: {e}")
         return None
+    except BinanceAPIError as e:
+        logger.error(str(e))
+        return None
+    except PARSE_ERRORS as e:
+        logger.error(f"解析JSON失败: {e}")
+        return None
+
+    logger.info(f"总共有{total} 个alpha代币，积分为{mul_point}的 {matched} 个，保留前 {len(tokens)} 个。")
+    modified = state is None or not state.body_hash or state.body_hash != validators['body_hash']
+    if not modified:
+        logger.info("代币列表内容与上次相同（响应体哈希一致）。")
+    return {'modified': modified, 'tokens': tokens, 'total': total, 'validators': validators}
 
-    # 过滤出 mulPoint 为 4 的代币
-    filter_4x_tokens = [token for token in token_list if _to_number(token.get("mulPoint")) == 4]
-    logger.info(f"筛选出积分为4的代币，共计 {len(filter_4x_tokens)} 个。")
-    # 按照 交易量降序排序，转换为数字更稳健
-    sorted_tokens = sorted(filter_4x_tokens, key=lambda x: _to_number(x.get('volume24h')), reverse=True)
-    top10_tokens = sorted_tokens[:10]
-    logger.info("获取到积分为4的前10个代币。")
 
-    return top10_tokens
+def _text(val):
+    return str(val) if val is not None else ''
+
+
+def normalize_token(token):
+    '''
+    把接口返回的代币转换为 alpha 表的字段值。
+    '''
+    try:
+        mul_point = int(float(token.get('mulPoint') or 0))
+    except (TypeError, ValueError):
+        mul_point = 0
+    return {
+        'tokenId': token.get('alphaId'),
+        'chainName': (token.get('chainName') or '').strip(),
+        'contractAddress': (token.get('contractAddress') or '').lower().strip(),
+        'name': token.get('name'),
+        'symbol': token.get('symbol'),
+        'mulPoint': mul_point,
+        'price': _text(token.get('price')),
+        'percentChange24h': _text(token.get('percentChange24h')),
+        'volume24h': _text(token.get('volume24h')),
+        'liquidity': _text(token.get('liquidity')),
+    }
+
+
+def _token_key(row):
+    return row['tokenId'], row['chainName'], row['contractAddress']
+
+
+def payload_hash(rows):
+    '''
+    规范化后数据的内容哈希（与顺序无关）。
+    '''
+    encoded = json.dumps(sorted(rows, key=lambda r: json.dumps(r, sort_keys=True)), sort_keys=True)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def sync_tokens(rows):
+    '''
+    把规范化后的代币与 alpha 表做差异同步，返回 {'created', 'updated', 'deleted', 'unchanged', 'skipped'}。
+    '''
+    latest = {}
+    for row in rows:
+        latest[_token_key(row)] = row
+    digest = payload_hash(list(latest.values()))
+    state = AlphaSyncState.objects.filter(name=SYNC_STATE_NAME).first()
+    if state is not None and state.payload_hash == digest:
+        logger.info("代币数据与上次相同，跳过写库。")
+        return {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': len(latest), 'skipped': True}
+
+    with transaction.atomic():
+        existing = {_token_key(r): r for r in alpha.objects.values('id', 'tokenId', 'chainName', 'contractAddress', *TOKEN_FIELDS)}
+        to_create = [alpha(**row) for key, row in latest.items() if key not in existing]
+        to_update = []
+        for key, row in latest.items():
+            current = existing.get(key)
+            if current is not None and any(current[f] != row[f] for f in TOKEN_FIELDS):
+                to_update.append(alpha(id=current['id'], **row))
+        stale_ids = [r['id'] for key, r in existing.items() if key not in latest]
+
+        if to_create:
+            alpha.objects.bulk_create(to_create)
+        if to_update:
+            alpha.objects.bulk_update(to_update, TOKEN_FIELDS)
+        if stale_ids:
+            alpha.objects.filter(id__in=stale_ids).delete()
+        AlphaSyncState.objects.update_or_create(name=SYNC_STATE_NAME, defaults={'payload_hash': digest})
+
+    summary = {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(stale_ids),
+        'unchanged': len(latest) - len(to_create) - len(to_update),
+        'skipped': False,
+    }
+    logger.info(f"代币信息同步完成：新增 {summary['created']} 条，更新 {summary['updated']} 条，"
+                f"删除 {summary['deleted']} 条，未变 {summary['unchanged']} 条。")
+    return summary
 
 
 @shared_task(
@@ -89,49 +252,17 @@ def get_4xPoint_token():
 def save_token_info(self):
     '''
     保存代币信息到数据库（Celery 任务）。
-    成功返回保存/更新的记录数；失败时抛出异常以触发自动重试。
+    和库里现有数据做差异同步：一个事务内批量新增、批量更新、一次删除，表不会出现空窗期；
+    数据与上次完全相同时直接跳过。返回各类变更的条数；失败时抛出异常以触发自动重试。
     '''
-    token_info = get_4xPoint_token()
-    if not token_info:
+    state = AlphaSyncState.objects.filter(name=SYNC_STATE_NAME).first()
+    result = fetch_alpha_tokens(state=state)
+    if result is not None and not result['modified']:
+        return {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': None, 'skipped': True}
+    if not result or not result['tokens']:
         # 抛异常以触发自动重试
         raise RuntimeError("未能获取到代币信息，触发重试。")
-
-    saved = 0
-    delete, _ = alpha.objects.all().delete()
-    logger.info(f"开始删除数据库中旧数据, 共删除 {delete} 条记录。")
-    for token in token_info:
-        try:
-            # 规范化字段值
-            token_id = token.get('alphaId')
-            chain_name = (token.get('chainName') or '').strip()
-            contract_addr = (token.get('contractAddress') or '').lower().strip()
-            try:
-                mul_point = int(float(token.get('mulPoint') or 0))
-            except (TypeError, ValueError):
-                mul_point = 0
-
-            with transaction.atomic():
-
-                obj, created = alpha.objects.update_or_create(
-                tokenId=token_id,
-                chainName=chain_name,
-                contractAddress=contract_addr,
-                defaults={
-                    'name': token.get('name'),
-                    'symbol': token.get('symbol'),
-                    'mulPoint': mul_point,
-                    'price': str(token.get('price')) if token.get('price') is not None else '',
-                    'percentChange24h': str(token.get('percentChange24h')) if token.get('percentChange24h') is not None else '',
-                    'volume24h': str(token.get('volume24h')) if token.get('volume24h') is not None else '',
-                    'liquidity': str(token.get('liquidity')) if token.get('liquidity') is not None else '',
-                },
-            )
-            saved += 1
-            if created:
-                logger.info(f"创建新代币记录: {obj.symbol}")
-            else:
-                logger.info(f"更新代币记录: {obj.symbol}")
-        except Exception as e:
-            logger.error(f"保存代币信息失败，错误信息：{e}")
-
-
+    summary = sync_tokens([normalize_token(token) for token in result['tokens']])
+    # 写库成功后才记录条件请求的校验值，失败的同步不会被 304 掩盖
+    AlphaSyncState.objects.update_or_create(name=SYNC_STATE_NAME, defaults=result['validators'])
+    return summary
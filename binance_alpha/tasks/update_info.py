@@ -1,69 +1,122 @@
 import logging
 import logging.config
-from http.client import responses
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from Defi_Monitor.settings import LOGGING
-import requests
 from celery import shared_task
+from django.conf import settings
+
+from binance_alpha.client import get_json
+from binance_alpha.indicators import ATRPEngine
+from binance_alpha.klines import INTERVAL_MS, last_open_times, load_klines, store_klines
 from binance_alpha.models import alpha
 
 logging.config.dictConfig(LOGGING)
 
 URL_KLINE = "https://www.binance.com/bapi/defi/v1/public/alpha-trade/klines"
 logger = logging.getLogger(__name__)
+# 请求参数模板（只读），每次请求复制一份再填 symbol，线程之间互不影响
 REQUEST_PARAMS = {
-    "symbol": "",
     "interval": "5m",
     "limit": 5
 }
+# 单次 K 线请求的权重（limit <= 100 时币安计 2）
+KLINE_REQUEST_WEIGHT = getattr(settings, 'KLINE_REQUEST_WEIGHT', 2)
+# 并发拉取 K 线的线程数
+KLINE_FETCH_WORKERS = getattr(settings, 'KLINE_FETCH_WORKERS', 8)
+# 补缺口时每页最多取多少根
+KLINE_PAGE_LIMIT = getattr(settings, 'KLINE_PAGE_LIMIT', 500)
+# 库里没有数据的代币先取多少根（够 ATR 预热）
+KLINE_BOOTSTRAP_LIMIT = getattr(settings, 'KLINE_BOOTSTRAP_LIMIT', 100)
+# 停机太久时最多往回补多少根（默认 7 天的 5 分钟线）
+KLINE_MAX_BACKFILL = getattr(settings, 'KLINE_MAX_BACKFILL', 2016)
 
 
 def get_tokenId():
     return list(alpha.objects.values_list("tokenId", flat=True))
 
 
-def get_5min_info():
+def fetch_klines(symbol, **params):
+    '''
+    获取单个代币的 K 线（限速、失败自动重试）
+    '''
+    request_params = {**REQUEST_PARAMS, **params, "symbol": symbol + "USDT"}
+    return get_json(URL_KLINE, request_params, weight=KLINE_REQUEST_WEIGHT) or []
+
+
+def fetch_missing_klines(symbol, last_open_time=None, now_ms=None):
+    '''
+    只取库里缺的 K 线：从最后一根已存的开盘时间开始（那根可能当时还没收盘，顺便刷新），
+    用 startTime/limit 分页补齐停机造成的缺口；库里没有数据时取最近 KLINE_BOOTSTRAP_LIMIT 根。
+    '''
+    if not last_open_time:
+        return fetch_klines(symbol, limit=KLINE_BOOTSTRAP_LIMIT)
+    step = INTERVAL_MS[REQUEST_PARAMS["interval"]]
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    start = max(last_open_time, now_ms - now_ms % step - (KLINE_MAX_BACKFILL - 1) * step)
+    klines = []
+    while start <= now_ms:
+        # 只请求缺少的根数，不多拿
+        limit = min(KLINE_PAGE_LIMIT, (now_ms - start) // step + 1)
+        page = fetch_klines(symbol, startTime=start, limit=limit)
+        klines.extend(page)
+        if len(page) < limit:
+            break
+        start = int(page[-1][0]) + step
+    return klines
+
+
+def _fan_out(fetch, jobs, workers=KLINE_FETCH_WORKERS):
     '''
-    获取5分钟的K线数据
+    用线程池并发执行 fetch(symbol, *args)，jobs 为 {symbol: args}。
+    单个代币失败不影响其他代币，返回 (成功的 {symbol: 结果}, 失败的 {symbol: 错误信息})。
     '''
     data_dict = {}
+    failed = {}
+    if not jobs:
+        return data_dict, failed
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(fetch, symbol, *args): symbol for symbol, args in jobs.items()}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                data_dict[symbol] = future.result()
+            except Exception as e:
+                failed[symbol] = str(e)
+                logger.error(f"获取K线失败 symbol={symbol}: {e}")
+    return data_dict, failed
+
+
+def get_5min_info():
+    '''
+    并发补齐所有代币缺少的5分钟K线并写入本地 K 线库，返回本次拿到的 {tokenId: klines}（失败的代币不在其中）
+    '''
     symbols = get_tokenId()
-    try:
-        for symbol in symbols:
-            REQUEST_PARAMS["symbol"] = symbol + "USDT"
-            response = requests.get(URL_KLINE, params=REQUEST_PARAMS, timeout=10)
-            response.raise_for_status()
-            api_data = response.json()
-            if api_data.get("code") == "000000" and api_data.get("success") is True:
-                data = api_data.get('data') or []
-                data_dict[symbol] = api_data.get('data')
-                logger.info(f"成功获取到数据！！！ symbol={symbol} data={data}")
-            else:
-                # 业务错误也进行日志记录
-                logger.error(f"API业务返回异常: code={api_data.get('code')} message={api_data.get('message')}")
-
-    except Exception as e:
-        logger.error(f"出现错误🙅{e}")
-
-
-def compute_ATRP(symbol : str):
+    interval = REQUEST_PARAMS["interval"]
+    last = last_open_times(symbols, interval)
+    data_dict, failed = _fan_out(fetch_missing_klines, {symbol: (last.get(symbol),) for symbol in symbols})
+    stored = store_klines(data_dict, interval)
+    logger.info(f"K线获取完成：成功 {len(data_dict)} 个，失败 {len(failed)} 个，写入 {stored} 根")
+    return data_dict
+
+
+def compute_ATRP(data_dict=None):
     '''
-    计算 ATRP 指标
+    用新的 K 线增量更新所有代币的 ATRP（Wilder ATR / 收盘价 * 100），结果写入 alpha_atr 表。
+    不传 data_dict 时从本地 K 线库读取每个代币上次计算之后的 K 线。
+    返回本次有新 K 线的代币的 {symbol: ATRP}，预热未完成的为 None。
     '''
-    ATR_PRE = 0.0
-    data = DATA_DICT[symbol]
-    for i in range(1, len(data)):
-        current_high = float(data[i][2])
-        current_low = float(data[i][3])
-        current_close_price = float(data[i][4])
-        TR_i = max((current_high - current_low),
-                   abs(current_high - data[i-1][4]),
-                   abs(current_low - data[i-1][4])
-                    )
-        ATR_C = (ATR_PRE * (len(SYMBOLS) - 1) + TR_i) / len(SYMBOLS)
-        ATR_PCT = (ATR_C / current_close_price) * 100
-        ATR_PRE = ATR_C
-        logger.info(f"ATR_PCT={ATR_PCT}")
+    interval = REQUEST_PARAMS["interval"]
+    symbols = list(data_dict) if data_dict is not None else get_tokenId()
+    engine = ATRPEngine.from_db(symbols, interval)
+    if data_dict is None:
+        data_dict = load_klines(dict(zip(engine.symbols, engine.last_open_time.tolist())), interval)
+    updated = engine.update(data_dict)
+    engine.save(updated)
+    results = engine.results(updated)
+    logger.info(f"ATRP 更新完成：{len(results)} 个代币 {results}")
+    return results
 
 
 @shared_task
@@ -71,11 +124,14 @@ def get_5min_info_task():
     '''
     异步获取5分钟的K线数据
     '''
-    get_5min_info()
+    data_dict = get_5min_info()
+    return {'ok': True, 'symbols': len(data_dict)}
 
 @shared_task
-def compute_ATRP_task(symbol: str):
+def compute_ATRP_task():
     '''
-    异步计算 ATRP 指标
+    异步获取最新K线并增量计算 ATRP 指标
     '''
-    compute_ATRP(symbol)
+    get_5min_info()
+    results = compute_ATRP()
+    return {'ok': True, 'updated': len(results)}
@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+import time
+from decimal import Decimal, localcontext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dex_common.pricing import batch_exchange_rates, batch_prices  # noqa: E402
+
+N = 50000
+
+
+# 旧的逐对 Decimal 实现（Camelot 用默认精度 28，SushiSwap 用 50）
+def compute_exchange_rate(token0_reserve, token1_reserve, d0, d1):
+    if token0_reserve == 0 or token1_reserve == 0:
+        return None
+    adj0 = Decimal(token0_reserve) / (Decimal(10) ** d0)
+    adj1 = Decimal(token1_reserve) / (Decimal(10) ** d1)
+    if adj0 == 0 or adj1 == 0:
+        return None
+    price0_in_1 = adj1 / adj0
+    price1_in_0 = adj0 / adj1
+
+    def fmt(x):
+        return f"{x:.8f}".rstrip('0').rstrip('.') or '0'
+    return {
+        'numeric': {
+            'price_token0_in_token1': fmt(price0_in_1),
+            'price_token1_in_token0': fmt(price1_in_0)
+        },
+        'display': {
+            '1 token0': f"{fmt(price0_in_1)} token1",
+            '1 token1': f"{fmt(price1_in_0)} token0"
+        }
+    }
+
+
+def make_pairs(n, seed=7):
+    rng = random.Random(seed)
+    r0, r1, d0, d1 = [], [], [], []
+    for i in range(n):
+        # 覆盖空池、尘埃池和 uint112 上限附近的大池
+        if i % 997 == 0:
+            r0.append(0)
+        else:
+            r0.append(rng.randint(1, 2 ** 112 - 1) if i % 5 == 0 else rng.randint(10 ** 3, 10 ** 27))
+        r1.append(rng.randint(1, 2 ** 112 - 1) if i % 7 == 0 else rng.randint(10 ** 3, 10 ** 27))
+        d0.append(rng.choice([6, 8, 18, 18]))
+        d1.append(rng.choice([6, 8, 18, 18]))
+    return r0, r1, d0, d1
+
+
+def main():
+    r0, r1, d0, d1 = make_pairs(N)
+
+    start_time = time.perf_counter()
+    batch = batch_exchange_rates(r0, r1, d0, d1)
+    batch_time = time.perf_counter() - start_time
+    print(f"--- 批量整数定点: {N} 对, {batch_time:.4f} 秒 ---")
+
+    # 储备量或价格（定点整数）的最大位数；超过 Decimal 精度时旧实现会先舍入，结果本来就不精确
+    digits = [
+        max(len(str(a)), len(str(b)), *(len(str(x)) for x in (p or ())))
+        for a, b, p in zip(r0, r1, batch_prices(r0, r1, d0, d1))
+    ]
+
+    ok = True
+    for prec in (28, 50):
+        with localcontext() as ctx:
+            ctx.prec = prec
+            start_time = time.perf_counter()
+            legacy = [compute_exchange_rate(*p) for p in zip(r0, r1, d0, d1)]
+            legacy_time = time.perf_counter() - start_time
+        mismatches = [i for i, (a, b) in enumerate(zip(legacy, batch)) if a != b]
+        beyond = sum(1 for i in mismatches if digits[i] > prec)
+        ok = ok and len(mismatches) == beyond
+        print(f"--- 逐对 Decimal (prec={prec}): {legacy_time:.4f} 秒, 加速 {legacy_time / batch_time:.2f}x, "
+              f"不一致 {len(mismatches)} 对 (其中 {beyond} 对位数超过 prec) ---")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+离线 pair 同步基准测试。
+
+启动本地假 Arbitrum 节点（dex_common.devnode，可配置延迟 / 抖动 / 错误率 / pair 数），
+在 Django 测试库（按 DATABASES 配置创建的 SQLite 或 Postgres 测试库，不碰正式数据）上
+运行 Camelot_v2 / SushiSwap_v2 的 sync_pairs_batch 各模式和 sync_pairs_batch_async，
+统计 pairs/sec、每对 RPC 调用数 / HTTP 请求数 / DB 查询数、任务耗时 p50/p99，
+结果写成 JSON，用 --baseline 和其他提交的结果对比。
+
+    python compare/sync_benchmark.py --pairs 200 --repeat 10 --latency-ms 20 --output before.json
+    python compare/sync_benchmark.py --pairs 200 --repeat 10 --latency-ms 20 --baseline before.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Defi_Monitor.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+
+import Camelot_v2.tasks as camelot_tasks  # noqa: E402
+import SushiSwap_v2.tasks as sushiswap_tasks  # noqa: E402
+from dex_common.devnode import DevNodeServer, FakeChain  # noqa: E402
+from dex_common.models import PairRegistry, TokenMeta  # noqa: E402
+from dex_common.token_cache import token_store  # noqa: E402
+
+VENUES = {
+    'camelot': camelot_tasks,
+    'sushiswap': sushiswap_tasks,
+}
+MODES = ('serial', 'multicall', 'rpc_batch', 'async')
+# 这些指标变大算退化，pairs_per_sec 变小算退化
+LOWER_IS_BETTER = ('rpc_calls_per_pair', 'http_requests_per_pair', 'db_queries_per_pair', 'p50_ms', 'p99_ms')
+
+
+class QueryCounter:
+    '''
+    统计所有线程、所有数据库连接上执行的 SQL 条数（async 模式的写库在别的线程里）。
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        for conn in connections.all():
+            conn.execute_wrappers.append(self)
+        connection_created.connect(self._on_connection, weak=False)
+
+    def _on_connection(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def percentile(values, pct):
+    '''
+    最近秩法百分位数。
+    '''
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def reset_state(module):
+    '''
+    清空该 DEX 的 pair 表、快照和共享的 registry / token 缓存，模拟冷启动。
+    '''
+    store_model = module.SushiSwapV2 if module is sushiswap_tasks else module.Camelot
+    snapshot_model = (module.SushiSwapV2ReserveSnapshot if module is sushiswap_tasks
+                      else module.CamelotReserveSnapshot)
+    for model in (store_model, snapshot_model, PairRegistry, TokenMeta):
+        model.objects.all().delete()
+    token_store.clear()
+
+
+def run_once(module, mode, pairs, chunk_size, concurrency):
+    if mode == 'async':
+        return module.sync_pairs_batch_async(start_index=0, limit=pairs, concurrency=concurrency)
+    return module.sync_pairs_batch(start_index=0, limit=pairs, mode=mode, chunk_size=chunk_size)
+
+
+def bench_case(server, queries, venue, mode, state, args):
+    module = VENUES[venue]
+    reset_state(module)
+    if state == 'warm':
+        # 预热一次（registry、token_meta、连接池），不计时
+        run_once(module, mode, args.pairs, args.chunk_size, args.concurrency)
+
+    latencies, processed, failures = [], 0, 0
+    rpc_calls = http_requests = errors = db_queries = 0
+    for _ in range(args.repeat):
+        if state == 'cold':
+            reset_state(module)
+        if args.swaps:
+            server.chain.mine(1, args.swaps)
+        server.reset_stats()
+        before = queries.count
+        began = time.perf_counter()
+        try:
+            summary = run_once(module, mode, args.pairs, args.chunk_size, args.concurrency)
+        except Exception as e:  # noqa
+            logging.getLogger(__name__).warning('%s/%s 运行失败: %s', venue, mode, e)
+            summary = {'ok': False}
+        latencies.append((time.perf_counter() - began) * 1000)
+        stats = server.stats()
+        rpc_calls += stats.get('calls', 0)
+        http_requests += stats.get('requests', 0)
+        errors += stats.get('errors', 0)
+        db_queries += queries.count - before
+        if summary.get('ok'):
+            processed += summary.get('processed', 0)
+        else:
+            failures += 1
+
+    elapsed = sum(latencies) / 1000
+    per_pair = max(processed, 1)
+    return {
+        'venue': venue,
+        'mode': mode,
+        'state': state,
+        'runs': args.repeat,
+        'failures': failures,
+        'pairs_processed': processed,
+        'pairs_per_sec': round(processed / elapsed, 2) if elapsed else None,
+        'rpc_calls_per_pair': round(rpc_calls / per_pair, 3),
+        'http_requests_per_pair': round(http_requests / per_pair, 3),
+        'db_queries_per_pair': round(db_queries / per_pair, 3),
+        'injected_errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(elapsed * 1000 / len(latencies), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    '''
+    和基准结果逐项对比，打印变化，返回超过阈值的退化项。
+    '''
+    old = {(r['venue'], r['mode'], r['state']): r for r in baseline.get('results', [])}
+    regressions = []
+    print(f"--- 对比基准 {baseline.get('meta', {}).get('commit')} (阈值 {threshold:.0%}) ---")
+    for r in results:
+        key = (r['venue'], r['mode'], r['state'])
+        b = old.get(key)
+        if b is None:
+            continue
+        changes = []
+        for metric in ('pairs_per_sec',) + LOWER_IS_BETTER:
+            new_value, old_value = r.get(metric), b.get(metric)
+            if not new_value or not old_value:
+                continue
+            delta = new_value / old_value - 1
+            worse = -delta if metric == 'pairs_per_sec' else delta
+            if worse > threshold:
+                regressions.append((key, metric, old_value, new_value))
+            changes.append(f"{metric} {old_value} -> {new_value} ({delta:+.1%})")
+        print(f"{'/'.join(key)}: " + ', '.join(changes))
+    return regressions
+
+
+def print_table(results):
+    header = f"{'case':<30}{'pairs/s':>10}{'rpc/pair':>10}{'http/pair':>11}{'sql/pair':>10}{'p50 ms':>10}{'p99 ms':>10}{'fail':>6}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        case = f"{r['venue']}/{r['mode']}/{r['state']}"
+        print(f"{case:<30}{r['pairs_per_sec'] or 0:>10}{r['rpc_calls_per_pair']:>10}{r['http_requests_per_pair']:>11}"
+              f"{r['db_queries_per_pair']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}{r['failures']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线 pair 同步基准测试（假 JSON-RPC 节点 + 测试库）')
+    parser.add_argument('--pairs', type=int, default=100, help='每个 factory 的 pair 数，也是每次同步的 pair 数')
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--repeat', type=int, default=5, help='每个用例计时的运行次数')
+    parser.add_argument('--swaps', type=int, default=10, help='每次运行前挖一个块，包含这么多笔 swap')
+    parser.add_argument('--venues', nargs='+', choices=sorted(VENUES), default=sorted(VENUES))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--states', nargs='+', choices=('cold', 'warm'), default=['cold', 'warm'],
+                        help='cold: 每次运行前清空 registry / token 缓存；warm: 预热后重复运行')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--output', default=None, help='结果 JSON 路径')
+    parser.add_argument('--baseline', default=None, help='对比的基准结果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.1, help='超过该比例的退化以非零状态退出')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    chain = FakeChain(pairs=args.pairs, seed=args.seed, tokens=args.tokens)
+    server = DevNodeServer(chain, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                           error_rate=args.error_rate, seed=args.seed)
+    for module in VENUES.values():
+        module.RPC_URL = server.url
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    queries = QueryCounter()
+    queries.install()
+    results = []
+    try:
+        with server:
+            print(f"--- devnode {server.url}: {args.pairs} pairs/factory, 延迟 {args.latency_ms}ms, "
+                  f"抖动 {args.jitter_ms}ms, 错误率 {args.error_rate}, 数据库 {connection.vendor} ---")
+            for state in args.states:
+                for venue in args.venues:
+                    for mode in args.modes:
+                        result = bench_case(server, queries, venue, mode, state, args)
+                        results.append(result)
+                        print(f"{venue}/{mode}/{state}: {result['pairs_per_sec']} pairs/s, p50 {result['p50_ms']}ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print_table(results)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'verbose')},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"--- 结果已写入 {args.output} ---")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        differing = [k for k, v in report['meta']['args'].items()
+                     if k in baseline.get('meta', {}).get('args', {}) and baseline['meta']['args'][k] != v]
+        if differing:
+            print(f"注意: 基准的参数不同 ({', '.join(differing)})，对比结果仅供参考")
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, old_value, new_value in regressions:
+            print(f"退化: {'/'.join(key)} {metric} {old_value} -> {new_value}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class DexCommonConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'dex_common'
+
+    def ready(self):
+        # Connects the worker_process_init handlers (token cache warm-up, provider pool)
+        # and the task_prerun/task_postrun metrics hooks
+        from dex_common import metrics, providers, token_cache  # noqa: F401
+        metrics.install_db_instrumentation()
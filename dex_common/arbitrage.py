@@ -0,0 +1,124 @@
+# Cross-DEX arbitrage scanner
+# Pools from every venue table are indexed in memory by their sorted (token0, token1)
+# addresses (dex_common.pools). A sync batch only re-evaluates the token pairs it
+# touched: for every two pools of different venues the fee-adjusted round-trip spread
+# is checked, and the optimal input comes from the closed form for two chained
+# constant-product swaps.
+
+import logging
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from dex_common.pools import FEE_DENOMINATOR, PoolIndex, TokenKey, amount_out, side
+
+logger = logging.getLogger(__name__)
+
+# Minimum fee-adjusted round-trip spread (0.001 = 0.1%) reported as an opportunity
+ARB_MIN_SPREAD = getattr(settings, 'ARB_MIN_SPREAD', 0.001)
+
+
+def optimal_input(reserve_in_a: int, reserve_out_a: int, fee_a: int,
+                  reserve_in_b: int, reserve_out_b: int, fee_b: int) -> float:
+    """Profit-maximising input for a swap on pool A followed by the reverse swap on pool B.
+
+    The two swaps compose into one virtual constant-product pool (Ea, Eb); profit
+    gamma_a*Eb*x/(Ea + gamma_a*x) - x peaks at x = (sqrt(gamma_a*Ea*Eb) - Ea) / gamma_a.
+    """
+    gamma_a = (FEE_DENOMINATOR - fee_a) / FEE_DENOMINATOR
+    gamma_b = (FEE_DENOMINATOR - fee_b) / FEE_DENOMINATOR
+    denominator = reserve_in_b + gamma_b * reserve_out_a
+    ea = reserve_in_a * reserve_in_b / denominator
+    eb = gamma_b * reserve_out_a * reserve_out_b / denominator
+    return (math.sqrt(gamma_a * ea * eb) - ea) / gamma_a
+
+
+class ArbitrageScanner:
+    """Cross-venue spreads over a PoolIndex, re-evaluated per touched token pair."""
+
+    def __init__(self, index: PoolIndex, min_spread: float = ARB_MIN_SPREAD):
+        self.index = index
+        self.min_spread = min_spread
+
+    def scan_pairs(self, addresses: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Re-read the touched pairs and their cross-venue counterparts, then evaluate them.
+
+        ``addresses`` are pair addresses changed by a sync batch; None evaluates everything.
+        Reserves are read back from the tables, so the index stays correct when other
+        worker processes wrote some of the counterparts.
+        """
+        began = time.perf_counter()
+        index = self.index
+        if not index.loaded or addresses is None:
+            index.load()
+            token_keys = set(index.by_tokens)
+        else:
+            addresses = set(addresses)
+            counterparts = {key[1] for tk in index.token_keys(addresses) for key in index.by_tokens[tk]}
+            index.refresh(addresses | counterparts)
+            token_keys = index.token_keys(addresses)
+        opportunities = self.evaluate(token_keys)
+        for opp in opportunities:
+            logger.info('Arbitrage %s -> %s: buy on %s %s, sell on %s %s, spread %.4f%%, in %s, profit %s',
+                        opp['token_in'], opp['token_out'], opp['buy_venue'], opp['buy_pair'],
+                        opp['sell_venue'], opp['sell_pair'], opp['spread'] * 100,
+                        opp['amount_in_units'], opp['profit_units'])
+        return {
+            'token_pairs': len(token_keys),
+            'opportunities': opportunities,
+            'elapsed_ms': round((time.perf_counter() - began) * 1000, 3),
+        }
+
+    def evaluate(self, token_keys: Iterable[TokenKey]) -> List[Dict[str, Any]]:
+        """Opportunities above ``min_spread`` for the given token pairs, best spread first."""
+        found: List[Dict[str, Any]] = []
+        for tk in token_keys:
+            pools = [self.index.pools[k] for k in sorted(self.index.by_tokens.get(tk, ()))]
+            for i, a in enumerate(pools):
+                for b in pools[i + 1:]:
+                    if a['venue'] == b['venue'] or a['pair_address'] == b['pair_address']:
+                        continue
+                    for buy, sell in ((a, b), (b, a)):
+                        opp = self._opportunity(tk, buy, sell)
+                        if opp is not None:
+                            found.append(opp)
+        found.sort(key=lambda o: o['spread'], reverse=True)
+        return found
+
+    def _opportunity(self, tk: TokenKey, buy: Dict[str, Any], sell: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # token_in -> token_out on ``buy``, then token_out -> token_in on ``sell``
+        token_in, token_out = tk
+        in_a, out_a, fee_a, decimals_in = side(buy, token_in)
+        in_b, out_b, fee_b, _ = side(sell, token_out)
+        if not (in_a and out_a and in_b and out_b):
+            return None
+        gross = (FEE_DENOMINATOR - fee_a) * (FEE_DENOMINATOR - fee_b) * out_a * out_b
+        spread = gross / (FEE_DENOMINATOR * FEE_DENOMINATOR * in_a * in_b) - 1
+        if spread <= self.min_spread:
+            return None
+        size = int(optimal_input(in_a, out_a, fee_a, in_b, out_b, fee_b))
+        if size <= 0:
+            return None
+        # Exact integer simulation of both swaps at the chosen size
+        middle = amount_out(size, in_a, out_a, fee_a)
+        final = amount_out(middle, in_b, out_b, fee_b)
+        profit = final - size
+        if profit <= 0:
+            return None
+        unit = 10 ** decimals_in
+        return {
+            'token_in': token_in,
+            'token_out': token_out,
+            'buy_venue': buy['venue'],
+            'buy_pair': buy['pair_address'],
+            'sell_venue': sell['venue'],
+            'sell_pair': sell['pair_address'],
+            'spread': spread,
+            'amount_in': size,
+            'amount_out': final,
+            'profit': profit,
+            'amount_in_units': size / unit,
+            'profit_units': profit / unit,
+        }
@@ -0,0 +1,183 @@
+# AsyncWeb3 pipeline for pair syncs
+# Fans out fetch coroutines under a semaphore and streams results into a DB writer,
+# so a batch costs roughly (pairs / concurrency) round-trip chains instead of one per pair.
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from web3 import AsyncWeb3, Web3
+
+from dex_common.metrics import instrument_web3
+from dex_common.multicall import is_call_failure
+from dex_common.token_cache import TokenMetaStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 16
+# Rows handed to the DB writer at once
+DEFAULT_FLUSH_SIZE = 50
+
+
+async def async_safe_call(awaitable: Awaitable[Any], default: Any = None) -> Any:
+    try:
+        return await awaitable
+    except Exception as e:  # noqa
+        logger.debug('async_safe_call fallback: %s', e)
+        return default
+
+
+async def async_try_call(awaitable: Awaitable[Any]) -> Tuple[bool, Any]:
+    """(True, value), or (False, None) when the call reverted; request errors propagate."""
+    try:
+        return True, await awaitable
+    except Exception as e:
+        if not is_call_failure(e):
+            raise
+        return False, None
+
+
+def get_async_web3(rpc_url: str) -> AsyncWeb3:
+    return instrument_web3(AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url)))
+
+
+async def close_async_web3(w3: AsyncWeb3) -> None:
+    disconnect = getattr(w3.provider, 'disconnect', None)
+    if disconnect is not None:
+        await disconnect()
+
+
+class AsyncTokenMetaResolver:
+    """symbol/decimals lookups that coalesce concurrent requests for the same token.
+
+    The first caller for an address checks the token_meta table and, if needed,
+    performs the reads; callers arriving while it is in flight await the same future.
+    Results land in the shared TokenMetaStore, so later batches skip the RPC entirely.
+    """
+
+    def __init__(self, w3: AsyncWeb3, erc20_abi: List[Dict[str, Any]], store: TokenMetaStore):
+        self.w3 = w3
+        self.erc20_abi = erc20_abi
+        self.store = store
+        self._inflight: Dict[str, 'asyncio.Future[Dict[str, Any]]'] = {}
+
+    async def _fetch(self, address: str) -> Dict[str, Any]:
+        await sync_to_async(self.store.load, thread_sensitive=True)([address])
+        if address in self.store:
+            return self.store[address]
+        c = self.w3.eth.contract(address=address, abi=self.erc20_abi)
+        (ok_symbol, symbol), (ok_decimals, decimals) = await asyncio.gather(
+            async_try_call(c.functions.symbol().call()),
+            async_try_call(c.functions.decimals().call()),
+        )
+        meta = {
+            'symbol': (symbol if ok_symbol else None) or 'UNKNOWN',
+            'decimals': int(decimals) if ok_decimals and decimals is not None else 18,
+            'symbol_failed': not ok_symbol,
+        }
+        if not ok_decimals:
+            # Fallback for this batch only, see TokenMetaStore.get_many
+            logger.warning('decimals() failed for token %s, using 18 without caching', address)
+            return {'symbol': meta['symbol'], 'decimals': meta['decimals']}
+        await sync_to_async(self.store.save, thread_sensitive=True)({address: meta})
+        self.store[address] = meta
+        return self.store[address]
+
+    async def get(self, address: str) -> Dict[str, Any]:
+        address = Web3.to_checksum_address(address)
+        if address in self.store:
+            return self.store[address]
+        pending = self._inflight.get(address)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future: 'asyncio.Future[Dict[str, Any]]' = asyncio.get_running_loop().create_future()
+        self._inflight[address] = future
+        try:
+            meta = await self._fetch(address)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a lone failure does not log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(address, None)
+        future.set_result(meta)
+        return meta
+
+
+async def run_pair_pipeline(indices: Iterable[int],
+                            fetch_one: Callable[[int], Awaitable[Optional[Dict[str, Any]]]],
+                            store_many: Callable[[List[Dict[str, Any]]], Dict[str, int]],
+                            concurrency: int = DEFAULT_CONCURRENCY,
+                            flush_size: int = DEFAULT_FLUSH_SIZE) -> Dict[str, Any]:
+    """Fetch pairs concurrently and stream them into ``store_many``.
+
+    Args:
+        indices: factory indices to fetch
+        fetch_one: coroutine returning the pair dict or None (skipped). A reverted call
+            skips the pair; any other error (transport, provider) cancels the remaining
+            fetches and is raised, so the task fails and is retried like the other paths
+        store_many: sync DB writer, called with up to ``flush_size`` rows; returns counters
+            such as {'created': n, 'updated': m} which are summed into the result
+        concurrency: max fetches in flight
+    Returns dict with processed/skipped/addresses plus the summed writer counters
+    """
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+    queue: 'asyncio.Queue[Optional[Dict[str, Any]]]' = asyncio.Queue(maxsize=max(1, int(concurrency)) * 2)
+    store = sync_to_async(store_many, thread_sensitive=True)
+    stats: Dict[str, Any] = {'processed': 0, 'skipped': 0, 'addresses': []}
+
+    async def fetch(index: int) -> None:
+        async with semaphore:
+            try:
+                row = await fetch_one(index)
+            except Exception as e:
+                if not is_call_failure(e):
+                    raise
+                logger.warning('Pair index %s reverted: %s', index, e)
+                row = None
+        if row is None:
+            stats['skipped'] += 1
+            return
+        await queue.put(row)
+
+    async def flush(rows: List[Dict[str, Any]]) -> None:
+        counts = await store(rows)
+        for key, value in (counts or {}).items():
+            stats[key] = stats.get(key, 0) + value
+        stats['processed'] += len(rows)
+        stats['addresses'].extend(r['pair_address'] for r in rows)
+
+    async def writer() -> None:
+        rows: List[Dict[str, Any]] = []
+        error: Optional[BaseException] = None
+        while True:
+            row = await queue.get()
+            if row is None:
+                break
+            if error is not None:
+                continue  # keep draining so fetchers never block on a dead writer
+            rows.append(row)
+            if len(rows) >= flush_size:
+                try:
+                    await flush(rows)
+                except Exception as e:
+                    error = e
+                rows = []
+        if error is not None:
+            raise error
+        if rows:
+            await flush(rows)
+
+    writer_task = asyncio.create_task(writer())
+    fetches = [asyncio.create_task(fetch(i)) for i in indices]
+    try:
+        await asyncio.gather(*fetches)
+    finally:
+        for task in fetches:
+            task.cancel()
+        await asyncio.gather(*fetches, return_exceptions=True)
+        await queue.put(None)
+        await writer_task
+    return stats
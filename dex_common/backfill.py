@@ -0,0 +1,214 @@
+# Concurrent historical block backfill
+# Fetches a block range with a sliding window of concurrent requests, optionally paced
+# to the provider's rate cap, and hands blocks to the consumer strictly in block order.
+# Each block's parentHash is checked against the block emitted before it; on a mismatch
+# (a reorg near the head) the in-flight window is discarded, the consumer is told to
+# roll back to the fork point and the range is re-fetched from there. Progress is saved
+# to a ChainCursor every few blocks so an interrupted run resumes where it stopped.
+
+import asyncio
+import logging
+import random
+from collections import Counter
+from contextlib import aclosing
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from web3 import AsyncWeb3, Web3
+
+from dex_common.cursors import get_cursor, save_cursor
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CONCURRENCY = getattr(settings, 'BACKFILL_CONCURRENCY', 16)
+# Blocks fetched ahead of the oldest unemitted one (bounds memory behind a slow block)
+BACKFILL_WINDOW = getattr(settings, 'BACKFILL_WINDOW', 256)
+BACKFILL_CHECKPOINT_EVERY = getattr(settings, 'BACKFILL_CHECKPOINT_EVERY', 100)
+# Hashes kept to locate a fork point, and the deepest reorg rolled back
+BACKFILL_REORG_DEPTH = getattr(settings, 'BACKFILL_REORG_DEPTH', 64)
+BACKFILL_MAX_RETRIES = getattr(settings, 'BACKFILL_MAX_RETRIES', 5)
+
+
+class ReorgTooDeep(Exception):
+    """The fork point lies beyond the hashes kept for reorg detection."""
+
+
+class _ParentMismatch(Exception):
+    def __init__(self, number: int):
+        super().__init__(number)
+        self.number = number
+
+
+class AsyncRateLimiter:
+    """Spaces request starts to at most ``rate`` per second across all coroutines."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class BlockBackfill:
+    """Ordered, resumable, reorg-aware fetch of blocks [start, end].
+
+    ``on_block(block)`` is awaited once per block in ascending order;
+    ``on_rollback(height)`` is awaited before blocks from ``height`` on are re-emitted
+    after a reorg, so the consumer can drop what it stored for them. With ``cursor``
+    set, a saved checkpoint overrides ``start``.
+    """
+
+    def __init__(self, w3: AsyncWeb3, start: int, end: int,
+                 on_block: Callable[[Any], Awaitable[Any]],
+                 on_rollback: Optional[Callable[[int], Awaitable[Any]]] = None,
+                 concurrency: int = BACKFILL_CONCURRENCY, window: int = BACKFILL_WINDOW,
+                 rate_limit: Optional[float] = None, cursor: Optional[str] = None,
+                 checkpoint_every: int = BACKFILL_CHECKPOINT_EVERY, reorg_depth: int = BACKFILL_REORG_DEPTH,
+                 full_transactions: bool = False, max_retries: int = BACKFILL_MAX_RETRIES):
+        self.w3 = w3
+        self.start = start
+        self.end = end
+        self.on_block = on_block
+        self.on_rollback = on_rollback
+        self.concurrency = concurrency
+        self.window = max(window, concurrency)
+        self.limiter = AsyncRateLimiter(rate_limit) if rate_limit else None
+        self.cursor = cursor
+        self.checkpoint_every = checkpoint_every
+        self.reorg_depth = reorg_depth
+        self.full_transactions = full_transactions
+        self.max_retries = max_retries
+        # height -> hash of recently emitted blocks
+        self.hashes: Dict[int, str] = {}
+        self.stats: Counter = Counter()
+
+    async def run(self) -> Dict[str, Any]:
+        next_emit = await self._resume()
+        first = next_emit
+        since_checkpoint = 0
+        while next_emit <= self.end:
+            try:
+                async with aclosing(self._ordered(next_emit)) as blocks:
+                    async for block in blocks:
+                        self._verify(block)
+                        await self.on_block(block)
+                        self._remember(block)
+                        next_emit = int(block['number']) + 1
+                        self.stats['blocks'] += 1
+                        since_checkpoint += 1
+                        if since_checkpoint >= self.checkpoint_every:
+                            await self._checkpoint()
+                            since_checkpoint = 0
+            except _ParentMismatch as mismatch:
+                next_emit = await self._rollback(mismatch.number)
+                since_checkpoint = 0
+        await self._checkpoint()
+        return {'ok': True, 'from_block': first, 'to_block': self.end, **self.stats}
+
+    async def _ordered(self, first: int):
+        """Blocks first..end in order, fetched up to ``concurrency`` at a time."""
+        pending: Dict[int, 'asyncio.Task[Any]'] = {}
+        ready: Dict[int, Any] = {}
+        next_fetch = next_emit = first
+        try:
+            while next_emit <= self.end:
+                while (next_fetch <= self.end and len(pending) < self.concurrency
+                       and next_fetch < next_emit + self.window):
+                    pending[next_fetch] = asyncio.create_task(self._fetch(next_fetch))
+                    next_fetch += 1
+                done, _ = await asyncio.wait(pending.values(), return_when=asyncio.FIRST_COMPLETED)
+                for number in [n for n, task in pending.items() if task in done]:
+                    ready[number] = pending.pop(number).result()
+                while next_emit in ready:
+                    yield ready.pop(next_emit)
+                    next_emit += 1
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+    async def _fetch(self, number: int) -> Any:
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            try:
+                block = await self.w3.eth.get_block(number, self.full_transactions)
+                self.stats['requests'] += 1
+                return block
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa
+                self.stats['errors'] += 1
+                if attempt == self.max_retries:
+                    raise
+                logger.debug('get_block(%s) failed (%s), retrying', number, e)
+                await asyncio.sleep(0.2 * (2 ** attempt) * (1 + random.random()))
+
+    def _verify(self, block: Any) -> None:
+        number = int(block['number'])
+        parent = self.hashes.get(number - 1)
+        if parent is not None and Web3.to_hex(block['parentHash']) != parent:
+            raise _ParentMismatch(number)
+
+    def _remember(self, block: Any) -> None:
+        number = int(block['number'])
+        self.hashes[number] = Web3.to_hex(block['hash'])
+        self.hashes.pop(number - self.reorg_depth, None)
+
+    async def _rollback(self, number: int) -> int:
+        """Find the fork below ``number``, roll the consumer back to it and return it."""
+        height = number - 1
+        while height in self.hashes:
+            block = await self.w3.eth.get_block(height)
+            self.stats['requests'] += 1
+            if Web3.to_hex(block['hash']) == self.hashes[height]:
+                break
+            height -= 1
+        else:
+            raise ReorgTooDeep(f'no common ancestor within {self.reorg_depth} blocks below {number}')
+        fork = height + 1
+        logger.warning('Reorg detected at block %s: rolling back to %s', number, fork)
+        self.stats['reorgs'] += 1
+        self.stats['rolled_back'] += number - fork
+        for stale in [h for h in self.hashes if h >= fork]:
+            del self.hashes[stale]
+        if self.on_rollback is not None:
+            await self.on_rollback(fork)
+        await self._checkpoint()
+        return fork
+
+    async def _resume(self) -> int:
+        if self.cursor is None:
+            return self.start
+        saved = await sync_to_async(get_cursor, thread_sensitive=True)(self.cursor)
+        if saved is None or saved.block_number < self.start:
+            return self.start
+        if saved.block_hash:
+            block = await self.w3.eth.get_block(saved.block_number)
+            if Web3.to_hex(block['hash']) != saved.block_hash:
+                # Only the checkpoint hash survived the restart: rewind the whole reorg depth
+                fork = max(self.start, saved.block_number - self.reorg_depth + 1)
+                logger.warning('Checkpoint %s of %s was reorged out, resuming from %s',
+                               saved.block_number, self.cursor, fork)
+                self.stats['reorgs'] += 1
+                if self.on_rollback is not None:
+                    await self.on_rollback(fork)
+                return fork
+            self.hashes[saved.block_number] = saved.block_hash
+        logger.info('Resuming %s after block %s', self.cursor, saved.block_number)
+        return saved.block_number + 1
+
+    async def _checkpoint(self) -> None:
+        if self.cursor is None or not self.hashes:
+            return
+        last = max(self.hashes)
+        await sync_to_async(save_cursor, thread_sensitive=True)(self.cursor, last, self.hashes[last])
+
@@ -0,0 +1,133 @@
+# Sharded full-factory crawl
+# The orchestrator reads allPairsLength once, cuts [0, total) into shards sized from the
+# per-pair time of the previous crawl and runs them as a Celery chord:
+#   chord(crawl_shard x N) -> merge_crawl
+# merge_crawl re-dispatches only the failed shards and finally writes one report.
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from celery import chord, group, signature
+from django.conf import settings
+
+from dex_common.models import CrawlStat
+
+logger = logging.getLogger(__name__)
+
+# Target worker-seconds per shard
+CRAWL_SHARD_SECONDS = getattr(settings, 'CRAWL_SHARD_SECONDS', 20)
+CRAWL_MIN_SHARD = getattr(settings, 'CRAWL_MIN_SHARD', 50)
+CRAWL_MAX_SHARD = getattr(settings, 'CRAWL_MAX_SHARD', 5000)
+# Per-pair time assumed before any crawl has been measured
+CRAWL_DEFAULT_PAIR_SECONDS = getattr(settings, 'CRAWL_DEFAULT_PAIR_SECONDS', 0.01)
+# Dispatch rounds for a shard (first run included) before it is reported as failed
+CRAWL_MAX_ATTEMPTS = getattr(settings, 'CRAWL_MAX_ATTEMPTS', 3)
+
+COUNT_FIELDS = ('attempted', 'processed', 'created', 'updated', 'unchanged', 'skipped')
+
+
+def stat_name(factory: str, mode: str) -> str:
+    return f'{factory}:{mode}'
+
+
+def observed_pair_seconds(name: str) -> Optional[float]:
+    stat = CrawlStat.objects.filter(name=name).first()
+    return stat.per_pair_seconds if stat and stat.per_pair_seconds > 0 else None
+
+
+def plan_shards(start: int, end: int, shard_size: int) -> List[Tuple[int, int]]:
+    """(start_index, limit) pairs covering [start, end)."""
+    shard_size = max(1, shard_size)
+    return [(i, min(shard_size, end - i)) for i in range(start, end, shard_size)]
+
+
+def shard_size_for(per_pair_seconds: Optional[float], target_seconds: float = CRAWL_SHARD_SECONDS,
+                   min_size: int = CRAWL_MIN_SHARD, max_size: int = CRAWL_MAX_SHARD) -> int:
+    per_pair = per_pair_seconds or CRAWL_DEFAULT_PAIR_SECONDS
+    return max(min_size, min(max_size, int(target_seconds / per_pair)))
+
+
+def start_crawl(task_name: str, factory: str, total: int, mode: str = 'multicall',
+                shard_size: Optional[int] = None, max_attempts: int = CRAWL_MAX_ATTEMPTS) -> Dict[str, Any]:
+    """Dispatch the chord for a full crawl of ``total`` pairs through ``task_name``.
+
+    ``task_name`` is a registered sync task taking (start_index, limit, mode), such as
+    Camelot_v2.tasks.sync_pairs_batch. Returns the dispatch summary; the merged
+    report is the chord result and is also stored as a CrawlStat row.
+    """
+    name = stat_name(factory, mode)
+    per_pair = observed_pair_seconds(name)
+    size = shard_size or shard_size_for(per_pair)
+    shards = plan_shards(0, total, size)
+    crawl = {
+        'task': task_name,
+        'factory': factory,
+        'mode': mode,
+        'total_pairs': total,
+        'started_at': time.time(),
+        'attempt': 1,
+        'max_attempts': max_attempts,
+        'done': [],
+        'failed': [],
+    }
+    logger.info('Crawl %s: %s pairs in %s shards of %s (observed %s s/pair)',
+                name, total, len(shards), size, per_pair)
+    if not shards:
+        report = merge_report(crawl)
+        return {'ok': True, 'total_pairs': total, 'shards': 0, 'shard_size': size, 'report': report}
+    result = dispatch_shards(crawl, shards)
+    return {'ok': True, 'total_pairs': total, 'shards': len(shards), 'shard_size': size, 'chord_id': result.id}
+
+
+def dispatch_shards(crawl: Dict[str, Any], shards: List[Tuple[int, int]]) -> Any:
+    header = group(
+        signature('dex_common.tasks.crawl_shard', args=(crawl['task'], start, limit, crawl['mode']))
+        for start, limit in shards
+    )
+    return chord(header)(signature('dex_common.tasks.merge_crawl', kwargs={'crawl': crawl}))
+
+
+def run_shard(task: Any, start_index: int, limit: int, mode: str) -> Dict[str, Any]:
+    """Run one shard in-process and return its summary with timing; never raises."""
+    began = time.perf_counter()
+    try:
+        summary = task(start_index=start_index, limit=limit, mode=mode)
+    except Exception as e:
+        logger.warning('Crawl shard %s+%s failed: %s', start_index, limit, e)
+        summary = {'ok': False, 'error': str(e)}
+    summary = {k: v for k, v in (summary or {}).items() if k != 'addresses'}
+    summary.update(start_index=start_index, limit=limit, elapsed=time.perf_counter() - began)
+    return summary
+
+
+def merge_report(crawl: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold shard summaries into one report and record the per-pair time."""
+    done, failed = crawl['done'], crawl['failed']
+    report: Dict[str, Any] = {
+        'ok': not failed,
+        'factory': crawl['factory'],
+        'mode': crawl['mode'],
+        'total_pairs': crawl['total_pairs'],
+        'shards': len(done) + len(failed),
+        'attempts': crawl['attempt'],
+        'failed_shards': [[s['start_index'], s['limit'], s.get('error')] for s in failed],
+    }
+    for field in COUNT_FIELDS:
+        report[field] = sum(s.get(field, 0) for s in done)
+    wall = time.time() - crawl['started_at']
+    busy = sum(s['elapsed'] for s in done)
+    report['wall_seconds'] = round(wall, 3)
+    report['pairs_per_second'] = round(report['processed'] / wall, 2) if wall > 0 else None
+    report['per_pair_seconds'] = busy / report['processed'] if report['processed'] else None
+    if report['per_pair_seconds']:
+        CrawlStat.objects.update_or_create(
+            name=stat_name(crawl['factory'], crawl['mode']),
+            defaults={
+                'pairs': report['processed'],
+                'shards': report['shards'],
+                'per_pair_seconds': report['per_pair_seconds'],
+                'wall_seconds': wall,
+            },
+        )
+    return report
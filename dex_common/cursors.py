@@ -0,0 +1,15 @@
+# Block cursors for the log-ingestion jobs
+
+from typing import Optional
+
+from dex_common.models import ChainCursor
+
+
+def get_cursor(name: str) -> Optional[ChainCursor]:
+    return ChainCursor.objects.filter(name=name).first()
+
+
+def save_cursor(name: str, block_number: int, block_hash: str = '') -> None:
+    ChainCursor.objects.update_or_create(
+        name=name, defaults={'block_number': block_number, 'block_hash': block_hash}
+    )
@@ -0,0 +1,615 @@
+# Local stand-in JSON-RPC node for offline testing of the pair-sync tasks.
+#
+# Serves a deterministic fake chain with a Camelot-style and a SushiSwap-style V2
+# factory, their pairs, ERC20 tokens and Multicall3. Single requests and JSON-RPC
+# batch arrays are both supported. FakeChain.mine() produces blocks with Sync logs,
+# FakeChain.create_pairs() deploys pairs with PairCreated logs and FakeChain.reorg()
+# replaces recent blocks. DevNodeServer can add per-request latency/jitter, answer a
+# share of requests with HTTP 429, refuse batches above a size and return batch
+# responses out of order, and counts the requests and calls it served.
+# DevNodeWebSocket serves the same chain over WebSocket, with eth_subscribe('newHeads')
+# pushing a header for every mined block.
+#
+#   python -m dex_common.devnode --pairs 200 --port 8545 --latency-ms 50 --error-rate 0.01
+#   python -m dex_common.devnode --ws-port 8546 --block-time 2
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from eth_abi import decode, encode
+from eth_utils import keccak, to_checksum_address
+
+logger = logging.getLogger(__name__)
+
+CAMELOT_FACTORY = to_checksum_address('0x6EcCab422D763aC031210895C81787E87B43A652')
+SUSHISWAP_FACTORY = to_checksum_address('0xc35DADB65012eC5796536bD9864eD8773aBc74C4')
+MULTICALL3 = to_checksum_address('0xcA11bde05977b3631167028862bE2a173976CA11')
+CHAIN_ID = 42161
+GENESIS_BLOCK = 1_000_000
+GENESIS_TIMESTAMP = 1_700_000_000
+SYNC_TOPIC = '0x' + keccak(text='Sync(uint112,uint112)').hex()
+PAIR_CREATED_TOPIC = '0x' + keccak(text='PairCreated(address,address,address,uint256)').hex()
+FAKE_CODE = '0x6080604052'
+
+TOKEN_SPECS = [
+    ('WETH', 18), ('USDC', 6), ('USDT', 6), ('ARB', 18), ('WBTC', 8),
+    ('DAI', 18), ('GMX', 18), ('MAGIC', 18), ('GRAIL', 18), ('LINK', 18),
+]
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _selector(signature: str) -> bytes:
+    return keccak(text=signature)[:4]
+
+
+def _address(*parts: Any) -> str:
+    return to_checksum_address(keccak(text=':'.join(str(p) for p in parts))[-20:])
+
+
+class FakeChain:
+    """Deterministic chain state. Same seed and pair count give the same answers."""
+
+    def __init__(self, pairs: int = 100, seed: int = 42, tokens: int = 40):
+        rng = random.Random(seed)
+        self.rng = random.Random(seed + 1)
+        self.seed = seed
+        self.block_number = GENESIS_BLOCK
+        # Bumped for re-mined heights so reorged blocks get new hashes
+        self.block_salt: Dict[int, int] = {}
+        self.logs: List[Dict[str, Any]] = []
+        # block -> pair state before each swap in it, so reorg() can roll reserves back
+        self.undo: Dict[int, List[Tuple[str, int, int, int]]] = {}
+        # eth_getLogs results above this are refused like hosted providers do
+        self.max_logs_per_query = 10000
+        self.tokens: Dict[str, Dict[str, Any]] = {}
+        self.token_addresses: List[str] = []
+        for i in range(tokens):
+            symbol, decimals = TOKEN_SPECS[i] if i < len(TOKEN_SPECS) else (f'TKN{i}', rng.choice([6, 8, 18, 18]))
+            addr = _address('token', seed, i)
+            # Every 13th long-tail token has a reverting symbol() to exercise the fallbacks
+            self.tokens[addr] = {'symbol': None if i >= len(TOKEN_SPECS) and i % 13 == 0 else symbol,
+                                 'decimals': decimals}
+            self.token_addresses.append(addr)
+
+        self.factories: Dict[str, Dict[str, Any]] = {}
+        self.pairs: Dict[str, Dict[str, Any]] = {}
+        for factory, flavor in ((CAMELOT_FACTORY, 'camelot'), (SUSHISWAP_FACTORY, 'uniswap')):
+            self.factories[factory] = {'flavor': flavor, 'pairs': []}
+            for _ in range(pairs):
+                self._new_pair(factory, rng)
+        self.lock = threading.Lock()
+        # Called with the header of every new block (while the chain lock is held)
+        self.head_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def _new_pair(self, factory: str, rng: random.Random) -> str:
+        pair_list = self.factories[factory]['pairs']
+        flavor = self.factories[factory]['flavor']
+        index = len(pair_list)
+        t0, t1 = sorted(rng.sample(self.token_addresses, 2), key=lambda a: a.lower())
+        addr = _address('pair', factory, index)
+        self.pairs[addr] = {
+            'flavor': flavor,
+            'index': index,
+            'token0': t0,
+            'token1': t1,
+            'reserve0': rng.randint(10 ** 6, 10 ** 30),
+            'reserve1': rng.randint(10 ** 6, 10 ** 30),
+            'fee0': rng.choice([100, 300, 500]),
+            'fee1': rng.choice([100, 300, 500]),
+            'ts': 1_700_000_000 + index,
+            'symbol': 'CMLT-LP' if flavor == 'camelot' else 'SLP',
+        }
+        pair_list.append(addr)
+        return addr
+
+    # -- blocks and logs -------------------------------------------------------
+    def block_hash(self, number: int) -> str:
+        return '0x' + keccak(text=f'block:{self.seed}:{number}:{self.block_salt.get(number, 0)}').hex()
+
+    def block(self, number: int) -> Optional[Dict[str, Any]]:
+        if number < 0 or number > self.block_number:
+            return None
+        tx_count = sum(1 for log in self.logs if log['blockNumber'] == hex(number))
+        return {
+            'number': hex(number),
+            'hash': self.block_hash(number),
+            'parentHash': self.block_hash(number - 1),
+            'timestamp': hex(GENESIS_TIMESTAMP + number - GENESIS_BLOCK),
+            'gasLimit': hex(32_000_000),
+            'gasUsed': hex(21_000 * tx_count),
+            'miner': '0x' + '00' * 20,
+            'transactions': ['0x' + keccak(text=f'tx:{number}:{i}').hex() for i in range(tx_count)],
+        }
+
+    def header(self, number: int) -> Optional[Dict[str, Any]]:
+        """Block without its transaction list, as pushed by newHeads subscriptions."""
+        block = self.block(number)
+        if block is not None:
+            del block['transactions']
+        return block
+
+    def _notify_head(self, number: int) -> None:
+        if self.head_listeners:
+            header = self.header(number)
+            for listener in self.head_listeners:
+                listener(header)
+
+    def mine(self, blocks: int = 1, swaps_per_block: int = 5) -> None:
+        """Append blocks; each swap moves one pair's reserves and emits Sync."""
+        with self.lock:
+            pair_addresses = list(self.pairs)
+            for _ in range(blocks):
+                self.block_number += 1
+                number = self.block_number
+                undo = self.undo.setdefault(number, [])
+                for log_index in range(swaps_per_block):
+                    addr = self.rng.choice(pair_addresses)
+                    pair = self.pairs[addr]
+                    undo.append((addr, pair['reserve0'], pair['reserve1'], pair['ts']))
+                    pair['reserve0'] = max(1, pair['reserve0'] + self.rng.randint(-pair['reserve0'] // 100, pair['reserve0'] // 100))
+                    pair['reserve1'] = max(1, pair['reserve1'] + self.rng.randint(-pair['reserve1'] // 100, pair['reserve1'] // 100))
+                    pair['ts'] = GENESIS_TIMESTAMP + number - GENESIS_BLOCK
+                    self.logs.append({
+                        'address': addr,
+                        'topics': [SYNC_TOPIC],
+                        'data': '0x' + encode(['uint112', 'uint112'], [pair['reserve0'], pair['reserve1']]).hex(),
+                        'blockNumber': hex(number),
+                        'blockHash': self.block_hash(number),
+                        'transactionHash': '0x' + keccak(text=f'tx:{number}:{log_index}').hex(),
+                        'transactionIndex': hex(log_index),
+                        'logIndex': hex(log_index),
+                        'removed': False,
+                    })
+                self._notify_head(number)
+
+    def create_pairs(self, factory: str, count: int = 1) -> List[str]:
+        """Deploy ``count`` pairs on ``factory`` in a new block, emitting PairCreated for each."""
+        with self.lock:
+            self.block_number += 1
+            number = self.block_number
+            created = []
+            for log_index in range(count):
+                addr = self._new_pair(factory, self.rng)
+                pair = self.pairs[addr]
+                created.append(addr)
+                self.logs.append({
+                    'address': factory,
+                    'topics': [PAIR_CREATED_TOPIC,
+                               '0x' + encode(['address'], [pair['token0']]).hex(),
+                               '0x' + encode(['address'], [pair['token1']]).hex()],
+                    'data': '0x' + encode(['address', 'uint256'], [addr, pair['index'] + 1]).hex(),
+                    'blockNumber': hex(number),
+                    'blockHash': self.block_hash(number),
+                    'transactionHash': '0x' + keccak(text=f'tx:{number}:{log_index}').hex(),
+                    'transactionIndex': hex(log_index),
+                    'logIndex': hex(log_index),
+                    'removed': False,
+                })
+            self._notify_head(number)
+            return created
+
+    def reorg(self, depth: int, swaps_per_block: int = 5) -> None:
+        """Replace the last ``depth`` blocks with new ones (new hashes, new Sync logs)."""
+        with self.lock:
+            first = self.block_number - depth + 1
+            self.logs = [log for log in self.logs if int(log['blockNumber'], 16) < first]
+            for number in range(self.block_number, first - 1, -1):
+                for addr, reserve0, reserve1, ts in reversed(self.undo.pop(number, [])):
+                    self.pairs[addr].update(reserve0=reserve0, reserve1=reserve1, ts=ts)
+                self.block_salt[number] = self.block_salt.get(number, 0) + 1
+            self.block_number = first - 1
+        self.mine(depth, swaps_per_block)
+
+    def get_logs(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        from_block = self._block_param(params.get('fromBlock', 'latest'))
+        to_block = self._block_param(params.get('toBlock', 'latest'))
+        addresses = params.get('address')
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        wanted = {to_checksum_address(a) for a in addresses} if addresses else None
+        topic0 = (params.get('topics') or [None])[0]
+        topic0 = [topic0] if isinstance(topic0, str) else topic0
+        result = []
+        for log in self.logs:
+            number = int(log['blockNumber'], 16)
+            if number < from_block or number > to_block:
+                continue
+            if wanted is not None and log['address'] not in wanted:
+                continue
+            if topic0 and log['topics'][0] not in topic0:
+                continue
+            result.append(log)
+            if len(result) > self.max_logs_per_query:
+                raise RPCError(-32005, f'query returned more than {self.max_logs_per_query} results')
+        return result
+
+    def _block_param(self, value: Any) -> int:
+        if value in ('latest', 'pending', 'safe', 'finalized', None):
+            return self.block_number
+        if value == 'earliest':
+            return 0
+        return int(value, 16) if isinstance(value, str) else int(value)
+
+    # -- state -------------------------------------------------------------
+    def has_code(self, address: str) -> bool:
+        return address == MULTICALL3 or address in self.factories or address in self.pairs or address in self.tokens
+
+    def call(self, to: str, data: bytes) -> bytes:
+        """Execute a view call; raises RPCError(3) on revert."""
+        if not self.has_code(to):
+            return b''
+        selector, args = data[:4], data[4:]
+        if to == MULTICALL3 and selector == _selector('aggregate3((address,bool,bytes)[])'):
+            (calls,) = decode(['(address,bool,bytes)[]'], args)
+            results = []
+            for target, allow_failure, call_data in calls:
+                try:
+                    results.append((True, self.call(to_checksum_address(target), call_data)))
+                except RPCError:
+                    if not allow_failure:
+                        raise
+                    results.append((False, b''))
+            return encode(['(bool,bytes)[]'], [results])
+        if to in self.factories:
+            pairs = self.factories[to]['pairs']
+            if selector == _selector('allPairsLength()'):
+                return encode(['uint256'], [len(pairs)])
+            if selector == _selector('allPairs(uint256)'):
+                (index,) = decode(['uint256'], args)
+                if index >= len(pairs):
+                    raise RPCError(3, 'execution reverted')
+                return encode(['address'], [pairs[index]])
+        if to in self.pairs:
+            pair = self.pairs[to]
+            if selector == _selector('getReserves()'):
+                if pair['flavor'] == 'camelot':
+                    return encode(['uint112', 'uint112', 'uint16', 'uint16'],
+                                  [pair['reserve0'], pair['reserve1'], pair['fee0'], pair['fee1']])
+                return encode(['uint112', 'uint112', 'uint32'], [pair['reserve0'], pair['reserve1'], pair['ts']])
+            if selector == _selector('token0()'):
+                return encode(['address'], [pair['token0']])
+            if selector == _selector('token1()'):
+                return encode(['address'], [pair['token1']])
+            if selector in (_selector('symbol()'), _selector('name()')):
+                return encode(['string'], [pair['symbol']])
+        if to in self.tokens:
+            token = self.tokens[to]
+            if selector in (_selector('symbol()'), _selector('name()')):
+                if token['symbol'] is None:
+                    raise RPCError(3, 'execution reverted')
+                return encode(['string'], [token['symbol']])
+            if selector == _selector('decimals()'):
+                return encode(['uint8'], [token['decimals']])
+        raise RPCError(3, 'execution reverted')
+
+    # -- JSON-RPC ------------------------------------------------------------
+    def handle(self, method: str, params: List[Any]) -> Any:
+        if method == 'web3_clientVersion':
+            return 'defi-monitor-devnode/0.1'
+        if method == 'eth_chainId':
+            return hex(CHAIN_ID)
+        if method == 'net_version':
+            return str(CHAIN_ID)
+        if method == 'eth_blockNumber':
+            return hex(self.block_number)
+        if method == 'eth_getBlockByNumber':
+            return self.block(self._block_param(params[0]))
+        if method == 'eth_getBlockByHash':
+            matches = [n for n in range(max(0, self.block_number - 10000), self.block_number + 1)
+                       if self.block_hash(n) == params[0]]
+            return self.block(matches[0]) if matches else None
+        if method == 'eth_getLogs':
+            return self.get_logs(params[0] if params else {})
+        if method == 'eth_getCode':
+            return FAKE_CODE if self.has_code(to_checksum_address(params[0])) else '0x'
+        if method == 'eth_call':
+            tx = params[0]
+            data = tx.get('data') or tx.get('input') or '0x'
+            return '0x' + self.call(to_checksum_address(tx['to']), bytes.fromhex(data[2:])).hex()
+        raise RPCError(-32601, f'Method {method} not found')
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        response: Dict[str, Any] = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            with self.lock:
+                response['result'] = self.handle(request.get('method', ''), request.get('params') or [])
+        except RPCError as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+        except Exception as e:  # noqa
+            response['error'] = {'code': -32602, 'message': f'invalid params: {e}'}
+        return response
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'DevNodeServer'
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'null')
+        except ValueError:
+            body = None
+        if not self.server.admit(body):
+            self.send_response(429)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if isinstance(body, list):
+            result: Any = self.server.handle_batch(body)
+        elif isinstance(body, dict):
+            result = self.server.chain.handle_request(body)
+        else:
+            result = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+        payload = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug(format, *args)
+
+
+class DevNodeServer(ThreadingHTTPServer):
+    """HTTP JSON-RPC server around a FakeChain. Use as a context manager in scripts."""
+
+    daemon_threads = True
+
+    def __init__(self, chain: Optional[FakeChain] = None, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 max_batch_size: Optional[int] = None, shuffle_batches: bool = False):
+        super().__init__((host, port), _Handler)
+        self.chain = chain or FakeChain()
+        # Seconds added to every request: latency plus uniform(0, jitter)
+        self.latency = latency
+        self.jitter = jitter
+        # Share of HTTP requests refused with 429 before they are served
+        self.error_rate = error_rate
+        # Larger batches get one "batch too large" error object (1: batching unsupported)
+        self.max_batch_size = max_batch_size
+        # Answer batch elements in random order, as JSON-RPC allows
+        self.shuffle_batches = shuffle_batches
+        self._rng = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self._stats: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+
+    def admit(self, body: Any) -> bool:
+        """Count the request, sleep the simulated latency and decide whether to fail it."""
+        calls = body if isinstance(body, list) else [body]
+        with self._stats_lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+            self._stats['requests'] += 1
+            if failed:
+                self._stats['errors'] += 1
+            else:
+                self._stats['calls'] += len(calls)
+                for call in calls:
+                    if isinstance(call, dict):
+                        self._stats['method:' + str(call.get('method'))] += 1
+        if delay > 0:
+            time.sleep(delay)
+        return not failed
+
+    def handle_batch(self, body: List[Any]) -> Any:
+        if self.max_batch_size is not None and len(body) > self.max_batch_size:
+            with self._stats_lock:
+                self._stats['refused_batches'] += 1
+            message = 'batch requests not supported' if self.max_batch_size <= 1 else \
+                f'batch too large: {len(body)} > {self.max_batch_size}'
+            return {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': message}}
+        result = [self.chain.handle_request(r) for r in body]
+        if self.shuffle_batches:
+            with self._stats_lock:
+                self._rng.shuffle(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """HTTP requests, JSON-RPC calls (batch elements counted singly), injected errors and per-method calls."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'DevNodeServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='devnode', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'DevNodeServer':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+class DevNodeWebSocket:
+    """JSON-RPC over WebSocket around a FakeChain, on its own event-loop thread.
+
+    Supports eth_subscribe('newHeads') / eth_unsubscribe; other methods go to the chain.
+    ``muted`` drops head notifications (lost messages) and ``drop_connections`` closes
+    every client, so watchers can be tested for gap backfill and reconnects.
+    """
+
+    def __init__(self, chain: Optional[FakeChain] = None, host: str = '127.0.0.1', port: int = 0):
+        self.chain = chain or FakeChain()
+        self.host = host
+        self.port = port
+        self.muted = False
+        self._ids = itertools.count(1)
+        # connection -> (outgoing queue, newHeads subscription ids)
+        self._clients: Dict[Any, Tuple['asyncio.Queue[str]', Set[str]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Any = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f'ws://{self.host}:{self.port}'
+
+    def start(self) -> 'DevNodeWebSocket':
+        self._thread = threading.Thread(target=self._run, name='devnode-ws', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        self.chain.head_listeners.append(self._on_head)
+        return self
+
+    def stop(self) -> None:
+        if self._on_head in self.chain.head_listeners:
+            self.chain.head_listeners.remove(self._on_head)
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._thread.join(timeout=5)
+
+    def drop_connections(self) -> None:
+        """Close every client connection (the server keeps accepting new ones)."""
+        for connection in list(self._clients):
+            asyncio.run_coroutine_threadsafe(connection.close(), self._loop)
+
+    def __enter__(self) -> 'DevNodeWebSocket':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        from websockets.asyncio.server import serve
+
+        async def main() -> None:
+            self._loop = asyncio.get_running_loop()
+            async with serve(self._handle, self.host, self.port) as server:
+                self._server = server
+                self.port = server.sockets[0].getsockname()[1]
+                self._ready.set()
+                await server.wait_closed()
+
+        asyncio.run(main())
+
+    def _on_head(self, header: Dict[str, Any]) -> None:
+        # Chain thread: hand the header to the server loop
+        if not self.muted and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._broadcast, header)
+
+    def _broadcast(self, header: Dict[str, Any]) -> None:
+        for queue, subscriptions in self._clients.values():
+            for sub_id in subscriptions:
+                queue.put_nowait(json.dumps({
+                    'jsonrpc': '2.0', 'method': 'eth_subscription',
+                    'params': {'subscription': sub_id, 'result': header},
+                }))
+
+    async def _handle(self, connection: Any) -> None:
+        queue: 'asyncio.Queue[str]' = asyncio.Queue()
+        subscriptions: Set[str] = set()
+        self._clients[connection] = (queue, subscriptions)
+        sender = asyncio.create_task(self._send_loop(connection, queue))
+        try:
+            async for message in connection:
+                try:
+                    body = json.loads(message)
+                except ValueError:
+                    body = None
+                if isinstance(body, list):
+                    result: Any = [self._answer(r, subscriptions) for r in body]
+                elif isinstance(body, dict):
+                    result = self._answer(body, subscriptions)
+                else:
+                    result = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+                queue.put_nowait(json.dumps(result))
+        except Exception as e:  # noqa
+            logger.debug('devnode ws connection closed: %s', e)
+        finally:
+            self._clients.pop(connection, None)
+            sender.cancel()
+
+    async def _send_loop(self, connection: Any, queue: 'asyncio.Queue[str]') -> None:
+        # One writer per connection keeps replies and notifications in order
+        while True:
+            await connection.send(await queue.get())
+
+    def _answer(self, request: Dict[str, Any], subscriptions: Set[str]) -> Dict[str, Any]:
+        method = request.get('method')
+        params = request.get('params') or []
+        if method == 'eth_subscribe':
+            if params[:1] != ['newHeads']:
+                return {'jsonrpc': '2.0', 'id': request.get('id'),
+                        'error': {'code': -32602, 'message': f'unsupported subscription {params[:1]}'}}
+            sub_id = hex(next(self._ids))
+            subscriptions.add(sub_id)
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': sub_id}
+        if method == 'eth_unsubscribe':
+            found = bool(params) and params[0] in subscriptions
+            subscriptions.discard(params[0] if params else None)
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': found}
+        return self.chain.handle_request(request)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Fake Arbitrum JSON-RPC node for offline pair-sync runs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--pairs', type=int, default=100, help='pairs per factory')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='delay added to every HTTP request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='extra uniform random delay per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with HTTP 429')
+    parser.add_argument('--ws-port', type=int, default=None, help='also serve JSON-RPC + newHeads over WebSocket')
+    parser.add_argument('--block-time', type=float, default=0.0, help='mine a block every N seconds (0: never)')
+    args = parser.parse_args(argv)
+    chain = FakeChain(pairs=args.pairs, seed=args.seed)
+    server = DevNodeServer(chain, args.host, args.port,
+                           latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                           error_rate=args.error_rate, seed=args.seed)
+    print(f'devnode listening on {server.url} ({args.pairs} pairs per factory)')
+    ws = None
+    if args.ws_port is not None:
+        ws = DevNodeWebSocket(chain, args.host, args.ws_port).start()
+        print(f'devnode websocket on {ws.url}')
+    stop = threading.Event()
+    if args.block_time > 0:
+        def produce() -> None:
+            while not stop.wait(args.block_time):
+                chain.mine(1)
+        threading.Thread(target=produce, name='devnode-miner', daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        if ws is not None:
+            ws.stop()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
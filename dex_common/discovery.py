@@ -0,0 +1,108 @@
+# Incremental pair discovery from factory PairCreated logs
+# PairCreated(token0 indexed, token1 indexed, pair, allPairsLength) already carries the
+# immutable pair facts, so a scan from the last checkpoint block costs one getReserves +
+# symbol read per new pair instead of walking allPairs(i) from a caller-chosen index.
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from web3 import Web3
+
+from dex_common.cursors import get_cursor, save_cursor
+from dex_common.multicall import DEFAULT_CHUNK_SIZE, CallExecutor, abi_function, aggregate3, build_call
+from dex_common.registry import load_registry, register_pairs
+from dex_common.sync_events import DEFAULT_BLOCK_SPAN, get_logs_adaptive
+
+logger = logging.getLogger(__name__)
+
+PAIR_CREATED_TOPIC = Web3.to_hex(Web3.keccak(text='PairCreated(address,address,address,uint256)'))
+# Blocks re-scanned on every run; PairCreated handling is idempotent, so this only costs a log query
+DEFAULT_REORG_WINDOW = 64
+
+
+def decode_pair_created(w3: Web3, log: Dict[str, Any]) -> Dict[str, Any]:
+    """Pair facts from a PairCreated log. The trailing uint is allPairs.length after the push."""
+    topics = log['topics']
+    pair_address, length = w3.codec.decode(['address', 'uint256'], bytes(log['data']))
+    return {
+        'index': length - 1,
+        'pair_address': Web3.to_checksum_address(pair_address),
+        'token0': Web3.to_checksum_address(bytes(topics[1])[-20:]),
+        'token1': Web3.to_checksum_address(bytes(topics[2])[-20:]),
+    }
+
+
+def fetch_created_pairs(w3: Web3, factory_address: str, from_block: int, to_block: int,
+                        max_span: int = DEFAULT_BLOCK_SPAN) -> List[Dict[str, Any]]:
+    """Decoded PairCreated events of ``factory_address`` in [from_block, to_block], by index."""
+    logs = get_logs_adaptive(w3, from_block, to_block, [PAIR_CREATED_TOPIC], [factory_address], max_span)
+    created: Dict[int, Dict[str, Any]] = {}
+    for log in logs:
+        if log.get('removed'):
+            continue
+        event = decode_pair_created(w3, log)
+        created[event['index']] = event
+    return [created[i] for i in sorted(created)]
+
+
+def snapshot_created_pairs(w3: Web3, pair_abi: List[Dict[str, Any]], created: List[Dict[str, Any]],
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           executor: Optional[CallExecutor] = None) -> List[Dict[str, Any]]:
+    """getReserves and symbol for new pairs in one batched round, as engine pair snapshots."""
+    executor = executor or aggregate3
+    fn_abis = [abi_function(pair_abi, 'getReserves'), abi_function(pair_abi, 'symbol')]
+    calls = [build_call(w3, event['pair_address'], fn_abi) for event in created for fn_abi in fn_abis]
+    results = executor(w3, calls, chunk_size)
+    snapshots: List[Dict[str, Any]] = []
+    for n, event in enumerate(created):
+        (ok_res, reserves), (ok_sym, symbol) = results[2 * n:2 * n + 2]
+        if not ok_res:
+            logger.warning('getReserves failed for new pair %s (index %s)', event['pair_address'], event['index'])
+            continue
+        snapshots.append({**event, 'reserves': reserves, 'symbol': symbol if ok_sym else None})
+    return snapshots
+
+
+def discover_pairs(w3: Web3, factory_address: str, pair_abi: List[Dict[str, Any]],
+                   from_block: Optional[int] = None, max_blocks: int = 50000,
+                   reorg_window: int = DEFAULT_REORG_WINDOW, max_span: int = DEFAULT_BLOCK_SPAN,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   executor: Optional[CallExecutor] = None) -> Dict[str, Any]:
+    """Register pairs created since the factory's checkpoint and snapshot their reserves.
+
+    The checkpoint is a ChainCursor named ``pair_created:<factory>``; the first run starts
+    at the current head unless ``from_block`` is given. Events for indices already in the
+    registry are skipped when they match it; when a reorg replaced the event (different
+    pair address or tokens at that index) the registry entry is overwritten. Returns a
+    dict with the block range, the number of new or replaced pairs (``events``), their
+    ``snapshots`` (already written to the pair registry) and the ``replaced`` addresses.
+    """
+    cursor_name = f'pair_created:{factory_address}'
+    head = w3.eth.block_number
+    if from_block is None:
+        cursor = get_cursor(cursor_name)
+        from_block = head if cursor is None else max(0, cursor.block_number + 1 - reorg_window)
+    to_block = min(head, from_block + max_blocks - 1)
+    if to_block < from_block:
+        return {'from_block': from_block, 'to_block': to_block, 'events': 0, 'snapshots': [], 'replaced': []}
+
+    created = fetch_created_pairs(w3, factory_address, from_block, to_block, max_span)
+    # Events from the re-scanned window are usually registered already
+    known = load_registry(factory_address, [event['index'] for event in created])
+    replaced = [
+        event for event in created
+        if event['index'] in known
+        and (known[event['index']].pair_address, known[event['index']].token0, known[event['index']].token1)
+        != (event['pair_address'], event['token0'], event['token1'])
+    ]
+    for event in replaced:
+        logger.warning('PairCreated for index %s of %s changed after a reorg: %s -> %s',
+                       event['index'], factory_address, known[event['index']].pair_address, event['pair_address'])
+    created = [event for event in created if event['index'] not in known] + replaced
+    snapshots = snapshot_created_pairs(w3, pair_abi, created, chunk_size, executor)
+    register_pairs(factory_address, snapshots, overwrite=bool(replaced))
+    save_cursor(cursor_name, to_block, Web3.to_hex(w3.eth.get_block(to_block)['hash']))
+    logger.info('PairCreated scan %s-%s for %s: %s events, %s snapshots',
+                from_block, to_block, factory_address, len(created), len(snapshots))
+    return {'from_block': from_block, 'to_block': to_block, 'events': len(created), 'snapshots': snapshots,
+            'replaced': [known[event['index']].pair_address for event in replaced]}
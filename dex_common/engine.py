@@ -0,0 +1,181 @@
+# Generic Uniswap-V2-style sync engine
+# Each DEX is a V2Dex config: factory, pair ABI (its getReserves output shape), the row
+# builder that maps reserves and fee source onto the DEX's columns, and the store
+# function for its table. One pass batches the reads of every configured factory into
+# shared rounds (allPairsLength, allPairs for unregistered indices, pair reads, token
+# metadata), so tracking another DEX adds calls to the rounds instead of new rounds.
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from web3 import Web3
+
+from dex_common.multicall import DEFAULT_CHUNK_SIZE, Call, CallExecutor, abi_function, aggregate3, build_call
+from dex_common.registry import load_registry, register_pairs
+from dex_common.token_cache import TokenMetaStore, token_store
+
+logger = logging.getLogger(__name__)
+
+# Reads for a pair not yet in the registry; registered pairs only need the first
+PAIR_READS = ('getReserves', 'token0', 'token1', 'symbol')
+
+
+class V2Dex(NamedTuple):
+    name: str
+    factory: str
+    factory_abi: List[Dict[str, Any]]
+    # getReserves outputs differ per DEX (Camelot returns fees, Uniswap V2 a timestamp)
+    pair_abi: List[Dict[str, Any]]
+    # (pair_address, reserves, token0, token1, pair_symbol, meta0, meta1) -> model row
+    build_row: Callable[..., Dict[str, Any]]
+    # rows -> {'created', 'updated', 'unchanged'}
+    store_rows: Callable[[List[Dict[str, Any]]], Dict[str, int]]
+    # pair_symbol used when symbol() reverts
+    symbol_fallback: str = ''
+
+
+Job = Tuple[V2Dex, Sequence[int]]
+
+
+class V2SyncEngine:
+    """Batched pair reads for several V2 factories at once."""
+
+    def __init__(self, dexes: Iterable[V2Dex], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 executor: CallExecutor = aggregate3, tokens: TokenMetaStore = token_store):
+        self.dexes = list(dexes)
+        self.chunk_size = chunk_size
+        self.executor = executor
+        self.tokens = tokens
+
+    def pair_counts(self, w3: Web3, dexes: Optional[Sequence[V2Dex]] = None) -> Dict[str, Optional[int]]:
+        """allPairsLength of every factory in one round (None where the read failed)."""
+        dexes = self.dexes if dexes is None else dexes
+        calls = [build_call(w3, dex.factory, abi_function(dex.factory_abi, 'allPairsLength')) for dex in dexes]
+        results = self.executor(w3, calls, self.chunk_size)
+        return {dex.name: int(value) if ok else None for dex, (ok, value) in zip(dexes, results)}
+
+    def fetch_snapshots(self, w3: Web3, jobs: Sequence[Job]) -> Dict[str, List[Dict[str, Any]]]:
+        """Pair snapshots per DEX, in two shared rounds.
+
+        A snapshot is {'index', 'pair_address', 'reserves', 'token0', 'token1', 'symbol'},
+        with symbol None when symbol() reverted.
+
+        Registered pairs cost one getReserves call; unregistered indices go through
+        allPairs first and are added to the registry.
+        """
+        plans = []
+        calls: List[Call] = []
+        owners: List[Tuple[str, int]] = []
+        for dex, indices in jobs:
+            indices = list(indices)
+            known = load_registry(dex.factory, indices)
+            all_pairs_fn = abi_function(dex.factory_abi, 'allPairs')
+            for index in indices:
+                if index not in known:
+                    calls.append(build_call(w3, dex.factory, all_pairs_fn, (index,)))
+                    owners.append((dex.name, index))
+            plans.append((dex, indices, known))
+
+        found: Dict[str, List[Tuple[int, str]]] = {dex.name: [] for dex, _ in jobs}
+        for (name, index), (ok, pair_addr) in zip(owners, self._run(w3, calls)):
+            if not ok or not pair_addr or int(pair_addr, 16) == 0:
+                logger.warning('%s: allPairs(%s) failed', name, index)
+                continue
+            found[name].append((index, Web3.to_checksum_address(pair_addr)))
+
+        # Round 2: getReserves for registered pairs, full reads for discovered ones
+        calls = []
+        reads: List[Tuple[V2Dex, int, Any, int]] = []   # (dex, index, registry entry or address, call count)
+        for dex, indices, known in plans:
+            fn_abis = [abi_function(dex.pair_abi, name) for name in PAIR_READS]
+            for index in indices:
+                if index in known:
+                    calls.append(build_call(w3, known[index].pair_address, fn_abis[0]))
+                    reads.append((dex, index, known[index], 1))
+            for index, pair_addr in found[dex.name]:
+                calls.extend(build_call(w3, pair_addr, fn_abi) for fn_abi in fn_abis)
+                reads.append((dex, index, pair_addr, len(fn_abis)))
+        results = self._run(w3, calls)
+
+        snapshots: Dict[str, List[Dict[str, Any]]] = {dex.name: [] for dex, _ in jobs}
+        discovered: Dict[str, List[Dict[str, Any]]] = {dex.name: [] for dex, _ in jobs}
+        position = 0
+        for dex, index, source, count in reads:
+            chunk = results[position:position + count]
+            position += count
+            if count == 1:
+                ok, reserves = chunk[0]
+                if not ok:
+                    logger.warning('%s: getReserves failed for registered pair %s (index %s)',
+                                   dex.name, source.pair_address, index)
+                    continue
+                snapshots[dex.name].append({
+                    'index': index, 'pair_address': source.pair_address, 'reserves': reserves,
+                    'token0': source.token0, 'token1': source.token1, 'symbol': source.pair_symbol,
+                })
+                continue
+            (ok_res, reserves), (ok_t0, token0), (ok_t1, token1), (ok_sym, symbol) = chunk
+            if not (ok_res and ok_t0 and ok_t1):
+                logger.warning('%s: pair %s (index %s) has no code or reverted (skip)', dex.name, source, index)
+                continue
+            snapshot = {
+                'index': index, 'pair_address': source, 'reserves': reserves,
+                'token0': Web3.to_checksum_address(token0), 'token1': Web3.to_checksum_address(token1),
+                'symbol': symbol if ok_sym else None,
+            }
+            snapshots[dex.name].append(snapshot)
+            discovered[dex.name].append(snapshot)
+
+        for dex, _ in jobs:
+            register_pairs(dex.factory, discovered[dex.name])
+            snapshots[dex.name].sort(key=lambda s: s['index'])
+        return snapshots
+
+    def rows_from_snapshots(self, w3: Web3, dexes: Sequence[V2Dex],
+                            snapshots: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Model rows per DEX, with token metadata for all DEXes resolved in one lookup."""
+        tokens = [s[side] for dex in dexes for s in snapshots.get(dex.name, ()) for side in ('token0', 'token1')]
+        metas = self.tokens.get_many(w3, tokens, self.chunk_size, self.executor)
+        return {
+            dex.name: [
+                dex.build_row(s['pair_address'], s['reserves'], s['token0'], s['token1'],
+                              s['symbol'] or dex.symbol_fallback, metas[s['token0']], metas[s['token1']])
+                for s in snapshots.get(dex.name, ())
+            ]
+            for dex in dexes
+        }
+
+    def fetch_rows(self, w3: Web3, jobs: Sequence[Job]) -> Dict[str, List[Dict[str, Any]]]:
+        return self.rows_from_snapshots(w3, [dex for dex, _ in jobs], self.fetch_snapshots(w3, jobs))
+
+    def sync(self, w3: Web3, start_index: int = 0, limit: int = 200,
+             names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Sync pairs [start_index, start_index + limit) of every factory in one pass."""
+        dexes = self.dexes if names is None else [dex for dex in self.dexes if dex.name in set(names)]
+        totals = self.pair_counts(w3, dexes)
+        jobs: List[Job] = []
+        summaries: Dict[str, Dict[str, Any]] = {}
+        for dex in dexes:
+            total = totals[dex.name]
+            if total is None:
+                logger.error('%s: cannot read allPairsLength', dex.name)
+                summaries[dex.name] = {'ok': False, 'error': 'allPairsLength failed'}
+                continue
+            end = min(start_index + limit, total)
+            jobs.append((dex, range(start_index, max(start_index, end))))
+            summaries[dex.name] = {'ok': True, 'factory': dex.factory, 'total_pairs': total,
+                                   'range': [start_index, end], 'attempted': max(0, end - start_index)}
+
+        rows = self.fetch_rows(w3, jobs)
+        for dex, _ in jobs:
+            pairs = rows[dex.name]
+            counts = dex.store_rows(pairs)
+            summaries[dex.name].update(
+                processed=len(pairs), created=counts['created'], updated=counts['updated'],
+                unchanged=counts['unchanged'], skipped=summaries[dex.name]['attempted'] - len(pairs),
+                addresses=[p['pair_address'] for p in pairs],
+            )
+        return {'ok': all(s['ok'] for s in summaries.values()), 'dexes': summaries}
+
+    def _run(self, w3: Web3, calls: List[Call]) -> List[Tuple[bool, Any]]:
+        return self.executor(w3, calls, self.chunk_size) if calls else []
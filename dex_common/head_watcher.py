@@ -0,0 +1,202 @@
+# Push-based chain head watcher
+# Subscribes to newHeads over WebSocket and falls back to HTTP polling while the socket
+# is down, reconnecting with exponential backoff. Every head goes through one sequencer
+# that drops duplicates, backfills skipped heights (lost notifications, reconnects, poll
+# intervals) and follows parentHash back to the fork point on reorgs, so consumers see a
+# contiguous, parent-linked stream. Heads land in a bounded asyncio.Queue: a slow
+# consumer blocks the watcher (backpressure) instead of growing memory.
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from web3 import AsyncWeb3, Web3
+
+from dex_common.metrics import instrument_web3
+
+logger = logging.getLogger(__name__)
+
+HEAD_QUEUE_SIZE = getattr(settings, 'HEAD_QUEUE_SIZE', 256)
+HEAD_POLL_INTERVAL = getattr(settings, 'HEAD_POLL_INTERVAL', 3.0)
+# Longest gap filled block by block; beyond it the oldest heights are skipped
+HEAD_MAX_BACKFILL = getattr(settings, 'HEAD_MAX_BACKFILL', 500)
+# Hashes kept for duplicate / reorg detection, and the deepest reorg followed
+HEAD_REORG_DEPTH = getattr(settings, 'HEAD_REORG_DEPTH', 64)
+# No notification for this long: check the head over the socket before waiting again
+HEAD_STALL_TIMEOUT = getattr(settings, 'HEAD_STALL_TIMEOUT', 30.0)
+
+
+class Head(NamedTuple):
+    number: int
+    hash: str
+    parent_hash: str
+    # 'ws', 'poll' or 'backfill'
+    source: str
+    # At or below a height already emitted: replaces that block
+    reorg: bool = False
+
+
+def _int(value: Any) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _hex(value: Any) -> str:
+    return value if isinstance(value, str) else Web3.to_hex(value)
+
+
+class HeadWatcher:
+    """Feeds ``queue`` with new chain heads from a WebSocket subscription or HTTP polling.
+
+    Run ``run()`` as a task and cancel it to stop. ``start_block`` makes the first head
+    backfill from that height (e.g. a stored cursor); otherwise the stream starts at the
+    current head.
+    """
+
+    def __init__(self, ws_url: Optional[str] = None, http_url: Optional[str] = None,
+                 queue_size: int = HEAD_QUEUE_SIZE, poll_interval: float = HEAD_POLL_INTERVAL,
+                 start_block: Optional[int] = None, max_backfill: int = HEAD_MAX_BACKFILL,
+                 reorg_depth: int = HEAD_REORG_DEPTH, stall_timeout: float = HEAD_STALL_TIMEOUT,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        if not ws_url and not http_url:
+            raise ValueError('HeadWatcher needs ws_url or http_url')
+        self.ws_url = ws_url
+        self.http_url = http_url
+        self.queue: 'asyncio.Queue[Head]' = asyncio.Queue(maxsize=queue_size)
+        self.poll_interval = poll_interval
+        self.max_backfill = max_backfill
+        self.reorg_depth = reorg_depth
+        self.stall_timeout = stall_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.last: Optional[int] = None if start_block is None else start_block - 1
+        # Highest height emitted so far
+        self.high: Optional[int] = None
+        # height -> hash of recently emitted heads
+        self.hashes: Dict[int, str] = {}
+        self.stats: Counter = Counter()
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            if self.ws_url:
+                received = self.stats['ws']
+                try:
+                    await self._run_ws()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:  # noqa
+                    logger.warning('newHeads subscription failed: %s', e)
+                self.stats['ws_disconnects'] += 1
+                if self.stats['ws'] > received:
+                    delay = self.reconnect_delay
+            if self.http_url:
+                # Poll until the next WebSocket attempt (or forever without one)
+                await self._run_poll(delay if self.ws_url else None)
+            else:
+                await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _run_ws(self) -> None:
+        async with AsyncWeb3(AsyncWeb3.WebSocketProvider(self.ws_url, max_connection_retries=1)) as w3:
+            instrument_web3(w3)
+            await w3.eth.subscribe('newHeads')
+            logger.info('Subscribed to newHeads on %s', self.ws_url)
+            # Catch up on heads mined while disconnected
+            await self.on_header(w3, await w3.eth.get_block('latest'), 'ws')
+            stream = w3.socket.process_subscriptions()
+            while True:
+                try:
+                    message = await asyncio.wait_for(stream.__anext__(), self.stall_timeout)
+                except asyncio.TimeoutError:
+                    self.stats['ws_stalls'] += 1
+                    await self.on_header(w3, await w3.eth.get_block('latest'), 'ws')
+                    continue
+                except StopAsyncIteration:
+                    return
+                await self.on_header(w3, message['result'], 'ws')
+
+    async def _run_poll(self, duration: Optional[float]) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = None if duration is None else loop.time() + duration
+        w3 = instrument_web3(AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(self.http_url)))
+        try:
+            while deadline is None or loop.time() < deadline:
+                try:
+                    await self.on_header(w3, await w3.eth.get_block('latest'), 'poll')
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:  # noqa
+                    self.stats['poll_errors'] += 1
+                    logger.warning('Head poll failed: %s', e)
+                wait = self.poll_interval if deadline is None else min(self.poll_interval, deadline - loop.time())
+                await asyncio.sleep(max(wait, 0))
+        finally:
+            disconnect = getattr(w3.provider, 'disconnect', None)
+            if disconnect is not None:
+                await disconnect()
+
+    async def on_header(self, w3: AsyncWeb3, header: Any, source: str) -> None:
+        """Sequence one observed head: dedup, backfill the gap before it, then emit."""
+        async with self._lock:
+            number = _int(header['number'])
+            if self.hashes.get(number) == _hex(header['hash']):
+                self.stats['duplicates'] += 1
+                return
+            if self.last is not None and number > self.last + 1:
+                first = max(self.last + 1, number - self.max_backfill)
+                if first > self.last + 1:
+                    logger.warning('Head gap %s..%s exceeds max_backfill, skipping %s blocks',
+                                   self.last + 1, number - 1, first - self.last - 1)
+                    self.stats['skipped'] += first - self.last - 1
+                for height in range(first, number):
+                    await self._accept(w3, await w3.eth.get_block(height), 'backfill')
+            await self._accept(w3, header, source)
+
+    async def _accept(self, w3: AsyncWeb3, header: Any, source: str) -> None:
+        head = Head(_int(header['number']), _hex(header['hash']), _hex(header['parentHash']), source)
+        if self.hashes.get(head.number) == head.hash:
+            self.stats['duplicates'] += 1
+            return
+        # Known height with another hash, or a parent we did not emit: walk back to the fork
+        replaced = [head]
+        while True:
+            parent_height = replaced[-1].number - 1
+            known = self.hashes.get(parent_height)
+            if known is None or known == replaced[-1].parent_hash or len(replaced) > self.reorg_depth:
+                break
+            block = await w3.eth.get_block(parent_height)
+            replaced.append(Head(parent_height, _hex(block['hash']), _hex(block['parentHash']), 'backfill'))
+        fork = replaced[-1].number
+        if self.high is not None and fork <= self.high:
+            self.stats['reorgs'] += 1
+            logger.warning('Reorg at block %s: replacing blocks up to %s', fork, self.high)
+        for item in reversed(replaced):
+            await self._emit(item)
+
+    async def _emit(self, head: Head) -> None:
+        if self.high is not None and head.number <= self.high:
+            head = head._replace(reorg=True)
+        self.high = head.number if self.high is None else max(self.high, head.number)
+        for height in [h for h in self.hashes if h >= head.number or h <= head.number - self.reorg_depth]:
+            del self.hashes[height]
+        self.hashes[head.number] = head.hash
+        self.last = head.number
+        self.stats[head.source] += 1
+        if self.queue.full():
+            self.stats['backpressure'] += 1
+        await self.queue.put(head)
+
+
+async def consume(queue: 'asyncio.Queue[Head]', handler: Callable[[Head], Awaitable[Any]]) -> None:
+    """Call ``handler`` for every head in order; exceptions are logged, not fatal."""
+    while True:
+        head = await queue.get()
+        try:
+            await handler(head)
+        except Exception as e:  # noqa
+            logger.exception('Head handler failed for block %s: %s', head.number, e)
+        finally:
+            queue.task_done()
@@ -0,0 +1,228 @@
+# Reserve history
+# Append-only raw snapshots (pair_id, block_number, ts, 28-byte packed reserves), written
+# only for pairs whose reserves changed, plus OHLC bars of price0_in_1 rolled up from them.
+# Raw rows older than the retention window are pruned once their bars exist; bars are kept.
+
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from django.db import models
+from web3 import Web3
+
+from dex_common.cursors import get_cursor, save_cursor
+from dex_common.pricing import batch_numeric_prices
+from dex_common.writer import conflict_target
+
+logger = logging.getLogger(__name__)
+
+# uint112 fits in 14 bytes
+RESERVE_BYTES = 14
+# Bar sizes in seconds (1m, 5m, 1h)
+BAR_INTERVALS = (60, 300, 3600)
+HISTORY_BATCH_SIZE = 5000
+# Raw rows folded into bars per rollup run (a backlog catches up over several runs)
+ROLLUP_MAX_ROWS = 500000
+
+
+def pack_reserves(reserve0: int, reserve1: int) -> bytes:
+    return int(reserve0).to_bytes(RESERVE_BYTES, 'big') + int(reserve1).to_bytes(RESERVE_BYTES, 'big')
+
+
+def unpack_reserves(packed: bytes) -> Tuple[int, int]:
+    packed = bytes(packed)
+    return int.from_bytes(packed[:RESERVE_BYTES], 'big'), int.from_bytes(packed[RESERVE_BYTES:], 'big')
+
+
+def record_snapshots(snapshot_model: Type[models.Model], pair_model: Type[models.Model],
+                     entries: Iterable[Tuple[str, int, int, Optional[int], int]]) -> int:
+    """Append (pair_address, reserve0, reserve1, block_number, ts) entries.
+
+    Callers pass only pairs whose reserves changed. ``block_number`` is 0 when unknown
+    (polled reads that did not pin a block). Pairs missing from ``pair_model`` are skipped.
+    """
+    entries = list(entries)
+    if not entries:
+        return 0
+    ids = dict(
+        pair_model.objects.filter(pair_address__in={e[0] for e in entries}).values_list('pair_address', 'id')
+    )
+    return append_snapshots(snapshot_model, [
+        (ids[address], reserve0, reserve1, block_number, ts)
+        for address, reserve0, reserve1, block_number, ts in entries
+        if address in ids
+    ])
+
+
+def append_snapshots(snapshot_model: Type[models.Model],
+                     entries: Iterable[Tuple[int, int, int, Optional[int], int]]) -> int:
+    """Append (pair_id, reserve0, reserve1, block_number, ts) entries."""
+    objs = [
+        snapshot_model(pair_id=pair_id, block_number=block_number or 0, ts=ts,
+                       reserves=pack_reserves(reserve0, reserve1))
+        for pair_id, reserve0, reserve1, block_number, ts in entries
+    ]
+    snapshot_model.objects.bulk_create(objs, batch_size=HISTORY_BATCH_SIZE)
+    return len(objs)
+
+
+def block_timestamps(w3: Web3, numbers: Iterable[int]) -> Dict[int, int]:
+    """Timestamps for many blocks, in JSON-RPC batches when the provider supports them."""
+    numbers = sorted(set(numbers))
+    batch_request = getattr(w3.provider, 'batch_request', None)
+    if batch_request is None:
+        return {n: int(w3.eth.get_block(n)['timestamp']) for n in numbers}
+    results = batch_request([('eth_getBlockByNumber', [hex(n), False]) for n in numbers])
+    stamps: Dict[int, int] = {}
+    for number, (ok, block) in zip(numbers, results):
+        if ok and block:
+            stamps[number] = int(block['timestamp'], 16)
+    return stamps
+
+
+def rollup_cursor_name(snapshot_model: Type[models.Model]) -> str:
+    return f'rollup:{snapshot_model._meta.db_table}'
+
+
+def prune_cursor_name(snapshot_model: Type[models.Model]) -> str:
+    return f'prune:{snapshot_model._meta.db_table}'
+
+
+def _bucket(ts: int, interval: int) -> int:
+    return ts - ts % interval
+
+
+def _last_folded_id(snapshot_model: Type[models.Model]) -> int:
+    cursor = get_cursor(rollup_cursor_name(snapshot_model))
+    return cursor.block_number if cursor is not None else 0
+
+
+def rollup_bars(snapshot_model: Type[models.Model], bar_model: Type[models.Model],
+                pair_model: Type[models.Model], intervals: Sequence[int] = BAR_INTERVALS,
+                max_rows: int = ROLLUP_MAX_ROWS) -> Dict[str, Any]:
+    """Fold raw snapshots inserted since the last run into OHLC bars.
+
+    Progress is a ChainCursor holding the last folded snapshot id, not a ts: Sync-log
+    catch-up after downtime inserts rows stamped with old block times, and those must
+    still reach their bars. Every widest bucket touched by new rows is rebuilt from its
+    raw rows, so the job is idempotent. Buckets older than the prune horizon no longer
+    have their raw rows; there the new rows are merged into the existing bars (high,
+    low and samples; open/close keep the values built from the full bucket).
+    At most ``max_rows`` new rows are taken per call.
+    """
+    widest = max(intervals)
+    last_id = _last_folded_id(snapshot_model)
+    new_rows = list(
+        snapshot_model.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'pair_id', 'ts')[:max_rows]
+    )
+    if not new_rows:
+        return {'snapshots': 0, 'bars': 0}
+    to_id = new_rows[-1][0]
+    pruned = get_cursor(prune_cursor_name(snapshot_model))
+    horizon = pruned.block_number if pruned is not None else None
+    # widest bucket start -> pair ids with new rows in it
+    touched: Dict[int, set] = {}
+    for _, pair_id, ts in new_rows:
+        touched.setdefault(_bucket(ts, widest), set()).add(pair_id)
+
+    decimals = {
+        pid: (d0, d1) for pid, d0, d1 in pair_model.objects.values_list('id', 'token0_decimals', 'token1_decimals')
+    }
+    # (interval, pair_id, bucket_start) -> [open, high, low, close, samples]
+    bars: Dict[Tuple[int, int, int], List[Any]] = {}
+    merged: Dict[Tuple[int, int, int], List[Any]] = {}
+    seen = 0
+    for bucket, pair_ids in sorted(touched.items()):
+        rows = snapshot_model.objects.filter(pair_id__in=pair_ids, ts__gte=bucket, ts__lt=bucket + widest)
+        target = bars
+        if horizon is not None and bucket < horizon:
+            rows = rows.filter(id__gt=last_id, id__lte=to_id)
+            target = merged
+        seen += _fold_rows(rows.order_by('ts', 'block_number', 'id').values_list('pair_id', 'ts', 'reserves'),
+                           decimals, intervals, target)
+
+    if merged:
+        existing = bar_model.objects.filter(
+            pair_id__in={key[1] for key in merged}, bucket_start__in={key[2] for key in merged},
+        ).values_list('interval', 'pair_id', 'bucket_start', 'open', 'high', 'low', 'close', 'samples')
+        for interval, pair_id, bucket, o, h, lo, c, n in existing:
+            bar = merged.get((interval, pair_id, bucket))
+            if bar is not None:
+                merged[(interval, pair_id, bucket)] = [o, max(h, bar[1]), min(lo, bar[2]), c, n + bar[4]]
+        bars.update(merged)
+
+    objs = [
+        bar_model(pair_id=pair_id, interval=interval, bucket_start=bucket, open=o, high=h, low=lo, close=c, samples=n)
+        for (interval, pair_id, bucket), (o, h, lo, c, n) in bars.items()
+    ]
+    bar_model.objects.bulk_create(
+        objs, batch_size=HISTORY_BATCH_SIZE, update_conflicts=True,
+        unique_fields=conflict_target(bar_model, ['pair_id', 'interval', 'bucket_start']),
+        update_fields=['open', 'high', 'low', 'close', 'samples'],
+    )
+    save_cursor(rollup_cursor_name(snapshot_model), to_id)
+    return {'from_id': last_id + 1, 'to_id': to_id, 'new_snapshots': len(new_rows), 'snapshots': seen,
+            'bars': len(objs)}
+
+
+def _fold_rows(rows: Any, decimals: Dict[int, Tuple[int, int]], intervals: Sequence[int],
+               bars: Dict[Tuple[int, int, int], List[Any]]) -> int:
+    seen = 0
+    chunk: List[Tuple[int, int, bytes]] = []
+    for row in rows.iterator(chunk_size=HISTORY_BATCH_SIZE):
+        chunk.append(row)
+        if len(chunk) >= HISTORY_BATCH_SIZE:
+            seen += _fold(chunk, decimals, intervals, bars)
+            chunk = []
+    return seen + _fold(chunk, decimals, intervals, bars)
+
+
+def _fold(chunk: List[Tuple[int, int, bytes]], decimals: Dict[int, Tuple[int, int]],
+          intervals: Sequence[int], bars: Dict[Tuple[int, int, int], List[Any]]) -> int:
+    known = [row for row in chunk if row[0] in decimals]
+    reserves = [unpack_reserves(row[2]) for row in known]
+    prices = batch_numeric_prices(
+        [r[0] for r in reserves], [r[1] for r in reserves],
+        [decimals[row[0]][0] for row in known], [decimals[row[0]][1] for row in known],
+    )
+    for (pair_id, ts, _), (price, _, _) in zip(known, prices):
+        if price is None:
+            continue
+        for interval in intervals:
+            key = (interval, pair_id, _bucket(ts, interval))
+            bar = bars.get(key)
+            if bar is None:
+                bars[key] = [price, price, price, price, 1]
+            else:
+                bar[1] = max(bar[1], price)
+                bar[2] = min(bar[2], price)
+                bar[3] = price
+                bar[4] += 1
+    return len(known)
+
+
+def prune_snapshots(snapshot_model: Type[models.Model], retention_seconds: int,
+                    now: Optional[int] = None) -> int:
+    """Delete raw snapshots older than the retention window that are already folded into bars.
+
+    The cutoff is aligned to the widest bar so a bucket's raw rows are kept or dropped
+    together; it is recorded as the prune horizon rollup_bars merges against.
+    """
+    now = int(now or time.time())
+    cursor = get_cursor(rollup_cursor_name(snapshot_model))
+    if cursor is None:
+        return 0
+    cutoff = _bucket(now - retention_seconds, max(BAR_INTERVALS))
+    pruned = get_cursor(prune_cursor_name(snapshot_model))
+    if pruned is None or pruned.block_number < cutoff:
+        save_cursor(prune_cursor_name(snapshot_model), cutoff)
+    deleted = 0
+    while True:
+        # Bounded deletes keep transactions and lock times short on large tables
+        ids = list(
+            snapshot_model.objects.filter(ts__lt=cutoff, id__lte=cursor.block_number)
+            .order_by('id').values_list('id', flat=True)[:HISTORY_BATCH_SIZE]
+        )
+        if not ids:
+            return deleted
+        deleted += snapshot_model.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,379 @@
+# RPC, DB and task instrumentation
+# A small in-process metrics registry (counters and histograms) rendered in the
+# Prometheus text format. RPCMetricsMiddleware records per-method JSON-RPC counts,
+# latency and errors, a requests response hook counts HTTP bytes, and a DB execute
+# wrapper counts queries and their time. Celery task_prerun/task_postrun open a
+# TaskStats scope per task, so every number is also attributed to the running task.
+# Worker processes flush their registry to METRICS_DIR (if set) and the /metrics view
+# merges those files with its own process.
+
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from web3.middleware import Web3Middleware
+
+logger = logging.getLogger(__name__)
+
+RPC_METRICS_ENABLED = getattr(settings, 'RPC_METRICS_ENABLED', True)
+# Shared directory for per-process snapshots; None keeps metrics in-process only
+METRICS_DIR = getattr(settings, 'METRICS_DIR', None)
+
+RPC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+METRICS: Dict[str, Tuple[str, str, Optional[Sequence[float]]]] = {
+    # name: (type, help, histogram buckets)
+    'rpc_requests_total': ('counter', 'JSON-RPC requests by method (batch elements counted singly).', None),
+    'rpc_errors_total': ('counter', 'JSON-RPC requests that raised or returned an error object.', None),
+    'rpc_request_duration_seconds': ('histogram', 'JSON-RPC round-trip time by method.', RPC_BUCKETS),
+    'rpc_bytes_sent_total': ('counter', 'HTTP request body bytes sent to RPC endpoints.', None),
+    'rpc_bytes_received_total': ('counter', 'HTTP response body bytes received from RPC endpoints.', None),
+    'celery_task_runs_total': ('counter', 'Finished Celery tasks by final state.', None),
+    'celery_task_duration_seconds': ('histogram', 'Celery task wall time.', TASK_BUCKETS),
+    'celery_task_db_queries_total': ('counter', 'SQL statements executed inside Celery tasks.', None),
+    'celery_task_db_seconds_total': ('counter', 'Time spent executing SQL inside Celery tasks.', None),
+    'celery_task_rpc_requests_total': ('counter', 'JSON-RPC requests made inside Celery tasks.', None),
+    'celery_task_rpc_seconds_total': ('counter', 'JSON-RPC round-trip time inside Celery tasks.', None),
+}
+
+
+def _labels(**labels: Any) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe counters and cumulative histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        # name -> labels -> [bucket counts..., sum, count]
+        self.histograms: Dict[str, Dict[Labels, List[float]]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _labels(**labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        buckets = METRICS[name][2]
+        key = _labels(**labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable copy of every series."""
+        with self._lock:
+            return {
+                'counters': {n: [[list(map(list, k)), v] for k, v in s.items()] for n, s in self.counters.items()},
+                'histograms': {n: [[list(map(list, k)), list(v)] for k, v in s.items()]
+                               for n, s in self.histograms.items()},
+            }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            for name, series in snapshot.get('counters', {}).items():
+                target = self.counters.setdefault(name, {})
+                for labels, value in series:
+                    key = tuple(tuple(pair) for pair in labels)
+                    target[key] = target.get(key, 0) + value
+            for name, series in snapshot.get('histograms', {}).items():
+                target_h = self.histograms.setdefault(name, {})
+                for labels, values in series:
+                    key = tuple(tuple(pair) for pair in labels)
+                    current = target_h.get(key)
+                    target_h[key] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in METRICS.items():
+                series = self.histograms.get(name) if kind == 'histogram' else self.counters.get(name)
+                if not series:
+                    continue
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key in sorted(series):
+                    if kind == 'counter':
+                        lines.append(f'{name}{_format_labels(key)} {_format_value(series[key])}')
+                        continue
+                    state = series[key]
+                    for bound, count in zip(buckets, state):
+                        lines.append(f'{name}_bucket{_format_labels(key + (("le", repr(float(bound))),))} {count}')
+                    lines.append(f'{name}_bucket{_format_labels(key + (("le", "+Inf"),))} {state[-1]}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {_format_value(state[-2])}')
+                    lines.append(f'{name}_count{_format_labels(key)} {state[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(key: Labels) -> str:
+    if not key:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, v in key)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = MetricsRegistry()
+
+
+class TaskStats:
+    """Per-task totals, collected while the task runs (see start_task)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.rpc_requests = 0
+        self.rpc_errors = 0
+        self.rpc_seconds = 0.0
+        self.rpc_methods: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    def add_rpc(self, method: str, seconds: float, error: bool) -> None:
+        with self._lock:
+            self.rpc_requests += 1
+            self.rpc_errors += int(error)
+            self.rpc_seconds += seconds
+            self.rpc_methods[method] = self.rpc_methods.get(method, 0) + 1
+
+    def add_bytes(self, sent: int, received: int) -> None:
+        with self._lock:
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def add_query(self, seconds: float) -> None:
+        with self._lock:
+            self.db_queries += 1
+            self.db_seconds += seconds
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Where the task's time went so far: RPC, DB and the rest (Python, waiting)."""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            return {
+                'elapsed_ms': round(elapsed * 1000, 3),
+                'rpc_requests': self.rpc_requests,
+                'rpc_errors': self.rpc_errors,
+                # Overlaps with other requests when calls run concurrently (async mode)
+                'rpc_ms': round(self.rpc_seconds * 1000, 3),
+                'rpc_methods': dict(self.rpc_methods),
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'db_queries': self.db_queries,
+                'db_ms': round(self.db_seconds * 1000, 3),
+                'other_ms': round(max(0.0, elapsed - self.rpc_seconds - self.db_seconds) * 1000, 3),
+            }
+
+
+_current: contextvars.ContextVar[Optional[TaskStats]] = contextvars.ContextVar('dex_task_stats', default=None)
+# task_id -> (stats, context token) for the Celery signal handlers
+_running: Dict[str, Tuple[TaskStats, contextvars.Token]] = {}
+
+
+def current_task_stats() -> Optional[TaskStats]:
+    return _current.get()
+
+
+def task_breakdown() -> Optional[Dict[str, Any]]:
+    """Breakdown of the running Celery task, or None outside one."""
+    stats = _current.get()
+    return stats.breakdown() if stats is not None else None
+
+
+def record_rpc(method: str, seconds: float, error: bool = False, task_seconds: Optional[float] = None) -> None:
+    method = str(method)
+    registry.inc('rpc_requests_total', method=method)
+    registry.observe('rpc_request_duration_seconds', seconds, method=method)
+    if error:
+        registry.inc('rpc_errors_total', method=method)
+    stats = _current.get()
+    if stats is not None:
+        stats.add_rpc(method, seconds if task_seconds is None else task_seconds, error)
+
+
+def record_rpc_batch(methods: Iterable[str], seconds: float, errors: Iterable[bool]) -> None:
+    """One HTTP batch: every element waited for the whole round trip, which the
+    running task spent only once."""
+    for i, (method, error) in enumerate(zip(methods, errors)):
+        record_rpc(method, seconds, error, task_seconds=seconds if i == 0 else 0.0)
+
+
+def record_http_bytes(response: Any, *args: Any, **kwargs: Any) -> None:
+    """requests response hook: count request and response body sizes."""
+    body = response.request.body if response.request is not None else None
+    sent = len(body) if body else 0
+    length = response.headers.get('Content-Length')
+    received = int(length) if length and length.isdigit() else len(response.content or b'')
+    registry.inc('rpc_bytes_sent_total', sent)
+    registry.inc('rpc_bytes_received_total', received)
+    stats = _current.get()
+    if stats is not None:
+        stats.add_bytes(sent, received)
+
+
+class RPCMetricsMiddleware(Web3Middleware):
+    """Times every JSON-RPC request going through a Web3 / AsyncWeb3 instance."""
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            began = time.perf_counter()
+            try:
+                response = make_request(method, params)
+            except Exception:
+                record_rpc(method, time.perf_counter() - began, True)
+                raise
+            record_rpc(method, time.perf_counter() - began, _is_error(response))
+            return response
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            began = time.perf_counter()
+            try:
+                response = await make_request(method, params)
+            except Exception:
+                record_rpc(method, time.perf_counter() - began, True)
+                raise
+            record_rpc(method, time.perf_counter() - began, _is_error(response))
+            return response
+
+        return middleware
+
+
+def _is_error(response: Any) -> bool:
+    return isinstance(response, dict) and response.get('error') is not None
+
+
+def instrument_web3(w3: Any) -> Any:
+    """Add RPCMetricsMiddleware to ``w3`` (no-op when disabled or already added)."""
+    if RPC_METRICS_ENABLED and 'rpc_metrics' not in w3.middleware_onion:
+        # Innermost, next to the provider: requests that other middleware make while
+        # formatting a call (eth_chainId for validation) are timed on their own
+        w3.middleware_onion.inject(RPCMetricsMiddleware, name='rpc_metrics', layer=0)
+    return w3
+
+
+def instrument_session(session: Any) -> Any:
+    if RPC_METRICS_ENABLED and record_http_bytes not in session.hooks['response']:
+        session.hooks['response'].append(record_http_bytes)
+    return session
+
+
+# -- DB ------------------------------------------------------------------------
+def _query_timer(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    began = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - began)
+
+
+def _on_connection_created(sender: Any, connection: Any, **kwargs: Any) -> None:
+    if _query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_timer)
+
+
+def install_db_instrumentation() -> None:
+    for connection in connections.all(initialized_only=True):
+        _on_connection_created(None, connection)
+    connection_created.connect(_on_connection_created, dispatch_uid='dex_common.metrics')
+
+
+# -- tasks ---------------------------------------------------------------------
+def start_task(name: str) -> Tuple[TaskStats, contextvars.Token]:
+    stats = TaskStats(name)
+    return stats, _current.set(stats)
+
+
+def finish_task(stats: TaskStats, token: contextvars.Token, state: str = 'SUCCESS') -> None:
+    _current.reset(token)
+    breakdown = stats.breakdown()
+    registry.inc('celery_task_runs_total', task=stats.name, state=state)
+    registry.observe('celery_task_duration_seconds', breakdown['elapsed_ms'] / 1000, task=stats.name)
+    registry.inc('celery_task_db_queries_total', stats.db_queries, task=stats.name)
+    registry.inc('celery_task_db_seconds_total', stats.db_seconds, task=stats.name)
+    registry.inc('celery_task_rpc_requests_total', stats.rpc_requests, task=stats.name)
+    registry.inc('celery_task_rpc_seconds_total', stats.rpc_seconds, task=stats.name)
+    if METRICS_DIR:
+        flush()
+
+
+@task_prerun.connect
+def _on_task_prerun(task_id: Optional[str] = None, task: Any = None, **kwargs: Any) -> None:
+    if task_id is not None:
+        _running[task_id] = start_task(getattr(task, 'name', 'unknown'))
+
+
+@task_postrun.connect
+def _on_task_postrun(task_id: Optional[str] = None, state: Optional[str] = None, **kwargs: Any) -> None:
+    entry = _running.pop(task_id, None) if task_id is not None else None
+    if entry is not None:
+        finish_task(*entry, state=state or 'UNKNOWN')
+
+
+# -- export --------------------------------------------------------------------
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f'metrics-{pid}.json')
+
+
+def flush() -> None:
+    """Write this process's registry to METRICS_DIR for the /metrics view to merge."""
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = _snapshot_path(os.getpid())
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning('Cannot write metrics snapshot to %s: %s', METRICS_DIR, e)
+
+
+def collect() -> MetricsRegistry:
+    """This process's metrics plus every other process's last flushed snapshot."""
+    merged = MetricsRegistry()
+    merged.merge(registry.snapshot())
+    if METRICS_DIR:
+        own = _snapshot_path(os.getpid())
+        for path in glob.glob(os.path.join(METRICS_DIR, 'metrics-*.json')):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    merged.merge(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning('Skipping metrics snapshot %s: %s', path, e)
+    return merged
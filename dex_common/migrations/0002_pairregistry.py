@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dex_common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PairRegistry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('factory', models.CharField(max_length=50)),
+                ('pair_index', models.IntegerField()),
+                ('pair_address', models.CharField(max_length=50)),
+                ('token0', models.CharField(max_length=50)),
+                ('token1', models.CharField(max_length=50)),
+                ('pair_symbol', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'pair_registry',
+                'indexes': [models.Index(fields=['pair_address'], name='pair_registry_address')],
+                'constraints': [models.UniqueConstraint(fields=('factory', 'pair_index'), name='pair_registry_factory_index')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dex_common', '0002_pairregistry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('block_number', models.BigIntegerField()),
+                ('block_hash', models.CharField(blank=True, default='', max_length=66)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'chain_cursor',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dex_common', '0003_chaincursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('pairs', models.IntegerField(default=0)),
+                ('shards', models.IntegerField(default=0)),
+                ('per_pair_seconds', models.FloatField()),
+                ('wall_seconds', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'crawl_stat',
+            },
+        ),
+    ]
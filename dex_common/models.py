@@ -0,0 +1,105 @@
+from django.db import models
+
+
+class TokenMeta(models.Model):
+    """ERC20 symbol/decimals shared by every DEX app and worker process."""
+    address = models.CharField(max_length=50, unique=True)
+    symbol = models.CharField(max_length=100)
+    decimals = models.IntegerField(default=18)
+    # symbol() reverted; the row is a negative-cache entry and is re-checked after a TTL
+    symbol_failed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'token_meta'
+
+    def __str__(self):
+        return self.symbol
+
+
+class PairRegistry(models.Model):
+    """Immutable facts about a factory pair: its index, address and tokens never change."""
+    factory = models.CharField(max_length=50)
+    pair_index = models.IntegerField()
+    pair_address = models.CharField(max_length=50)
+    token0 = models.CharField(max_length=50)
+    token1 = models.CharField(max_length=50)
+    # pair symbol() at discovery time; null when it reverted
+    pair_symbol = models.CharField(max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pair_registry'
+        constraints = [
+            models.UniqueConstraint(fields=['factory', 'pair_index'], name='pair_registry_factory_index'),
+        ]
+        indexes = [
+            models.Index(fields=['pair_address'], name='pair_registry_address'),
+        ]
+
+    def __str__(self):
+        return self.pair_address
+
+
+class ChainCursor(models.Model):
+    """Progress of an incremental job (one row per job name): the last block processed by
+    a log-ingestion job, the last snapshot id folded by a history rollup, or its prune horizon (a ts)."""
+    name = models.CharField(max_length=100, unique=True)
+    block_number = models.BigIntegerField()
+    block_hash = models.CharField(max_length=66, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'chain_cursor'
+
+    def __str__(self):
+        return f'{self.name}@{self.block_number}'
+
+
+class CrawlStat(models.Model):
+    """Outcome of the last sharded full-factory crawl, used to size the next one's shards."""
+    # '<factory>:<mode>'
+    name = models.CharField(max_length=100, unique=True)
+    pairs = models.IntegerField(default=0)
+    shards = models.IntegerField(default=0)
+    # Summed shard time per processed pair (worker-seconds, not wall-clock)
+    per_pair_seconds = models.FloatField()
+    wall_seconds = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'crawl_stat'
+
+    def __str__(self):
+        return f'{self.name}: {self.per_pair_seconds:.4f}s/pair'
+
+
+class ReserveSnapshot(models.Model):
+    """Append-only reserve history row (see dex_common.history). Concrete per DEX app."""
+    id = models.BigAutoField(primary_key=True)
+    # id of the pair row in the app's pair table; no FK constraint to keep inserts cheap
+    pair_id = models.IntegerField()
+    # 0 when the reserves were polled without pinning a block
+    block_number = models.BigIntegerField()
+    ts = models.IntegerField()
+    # reserve0 || reserve1, 14 bytes each, big-endian
+    reserves = models.BinaryField(max_length=28)
+
+    class Meta:
+        abstract = True
+
+
+class PriceBar(models.Model):
+    """OHLC bar of price0_in_1 per pair and interval, rolled up from ReserveSnapshot rows."""
+    pair_id = models.IntegerField()
+    # bar size in seconds
+    interval = models.IntegerField()
+    bucket_start = models.IntegerField()
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    samples = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
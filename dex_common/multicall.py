@@ -0,0 +1,222 @@
+# Multicall3 helpers shared by the V2 DEX sync tasks
+# Multicall3 is deployed at the same address on Arbitrum and most EVM chains.
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+
+logger = logging.getLogger(__name__)
+
+MULTICALL3_ADDRESS = Web3.to_checksum_address('0xcA11bde05977b3631167028862bE2a173976CA11')
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+ERC20_META_ABI = [
+    {"name": "symbol", "outputs": [{"type": "string", "name": ""}], "inputs": [], "stateMutability": "view", "type": "function"},
+    {"name": "decimals", "outputs": [{"type": "uint8", "name": ""}], "inputs": [], "stateMutability": "view", "type": "function"},
+]
+
+# Calls per aggregate3 request. Each pair read is cheap (~5k gas) but providers
+# cap eth_call gas and response size, so keep a few hundred calls per request.
+DEFAULT_CHUNK_SIZE = 200
+
+# Error text of a call that executed and failed: a smaller request fails the same way
+REVERT_MARKERS = ('execution reverted', 'invalid opcode', 'out of gas')
+# Error text of a request the provider refused for its size (eth_call gas cap, response limit)
+OVERSIZE_MARKERS = (
+    'gas required exceeds', 'exceeds block gas limit', 'gas limit reached', 'response size',
+    'response too large', 'payload too large', 'request entity too large', 'request too large',
+)
+
+
+class Call(NamedTuple):
+    target: str
+    data: bytes
+    output_types: Tuple[str, ...]
+
+
+# (w3, calls, chunk_size) -> [(success, value), ...] in call order
+CallExecutor = Callable[[Web3, List[Call], int], List[Tuple[bool, Any]]]
+
+
+def abi_function(abi: List[Dict[str, Any]], name: str) -> Dict[str, Any]:
+    for entry in abi:
+        if entry.get('type') == 'function' and entry.get('name') == name:
+            return entry
+    raise KeyError(f'Function {name} not found in ABI')
+
+
+def function_selector(fn_abi: Dict[str, Any]) -> bytes:
+    input_types = ','.join(i['type'] for i in fn_abi['inputs'])
+    return bytes(Web3.keccak(text=f"{fn_abi['name']}({input_types})")[:4])
+
+
+def build_call(w3: Web3, target: str, fn_abi: Dict[str, Any], args: Sequence[Any] = ()) -> Call:
+    """Encode a single view call for aggregate3."""
+    input_types = [i['type'] for i in fn_abi['inputs']]
+    data = function_selector(fn_abi)
+    if input_types:
+        data += w3.codec.encode(input_types, list(args))
+    output_types = tuple(o['type'] for o in fn_abi['outputs'])
+    return Call(Web3.to_checksum_address(target), data, output_types)
+
+
+def decode_result(w3: Web3, call: Call, success: bool, data: bytes) -> Tuple[bool, Any]:
+    """Decode one aggregate3 result. Single outputs are unwrapped, several become a tuple.
+
+    A call to an address without code succeeds with empty return data, so that case
+    is reported as a failure as well (this replaces the separate get_code check).
+    """
+    if not success or not data:
+        return False, None
+    try:
+        values = w3.codec.decode(list(call.output_types), bytes(data))
+    except Exception as e:  # noqa
+        logger.debug('multicall decode failed for %s: %s', call.target, e)
+        return False, None
+    if len(values) == 1:
+        return True, values[0]
+    return True, tuple(values)
+
+
+def is_call_failure(error: BaseException) -> bool:
+    """True when the node executed the call and it reverted (or ran out of gas), or the
+    target returned nothing decodable (no code)."""
+    if isinstance(error, (ContractLogicError, BadFunctionCallOutput)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in REVERT_MARKERS)
+
+
+def is_oversize_error(error: BaseException) -> bool:
+    """True when a request failed because of its size, so splitting it can help: the
+    provider's gas cap (out of gas), response size limit or HTTP 413.
+
+    Everything else is raised so the task fails and is retried: transport and provider
+    failures (connection refused, timeouts, 429/5xx), and an aggregator that returned
+    nothing (no Multicall3 code on this chain), which every smaller request would hit too.
+    """
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 413:
+        return True
+    message = str(error).lower()
+    return 'out of gas' in message or any(marker in message for marker in OVERSIZE_MARKERS)
+
+
+def _aggregate_chunk(w3: Web3, calls: List[Call], block_identifier: Any) -> List[Tuple[bool, Any]]:
+    contract = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+    try:
+        raw = contract.functions.aggregate3(
+            [(c.target, True, c.data) for c in calls]
+        ).call(block_identifier=block_identifier)
+    except Exception as e:
+        if not is_oversize_error(e):
+            raise
+        # The provider's gas / response-size cap: retry in halves.
+        if len(calls) == 1:
+            logger.warning('aggregate3 failed for single call to %s: %s', calls[0].target, e)
+            return [(False, None)]
+        logger.warning('aggregate3 with %s calls failed, splitting: %s', len(calls), e)
+        mid = len(calls) // 2
+        return (_aggregate_chunk(w3, calls[:mid], block_identifier)
+                + _aggregate_chunk(w3, calls[mid:], block_identifier))
+    return [decode_result(w3, c, success, data) for c, (success, data) in zip(calls, raw)]
+
+
+def call_each(w3: Web3, calls: List[Call], chunk_size: int = DEFAULT_CHUNK_SIZE,
+              block_identifier: Any = 'latest') -> List[Tuple[bool, Any]]:
+    """Plain eth_call per call. Same contract as aggregate3, for the serial sync path.
+
+    Reverts fail only their call; transport and provider errors are raised.
+    """
+    results: List[Tuple[bool, Any]] = []
+    for c in calls:
+        try:
+            data = w3.eth.call({'to': c.target, 'data': c.data}, block_identifier)
+        except Exception as e:
+            if not is_call_failure(e):
+                raise
+            logger.debug('eth_call to %s reverted: %s', c.target, e)
+            results.append((False, None))
+            continue
+        results.append(decode_result(w3, c, True, data))
+    return results
+
+
+def aggregate3(w3: Web3, calls: List[Call], chunk_size: int = DEFAULT_CHUNK_SIZE,
+               block_identifier: Any = 'latest') -> List[Tuple[bool, Any]]:
+    """Run calls through Multicall3.aggregate3 with allowFailure=True.
+
+    Returns one (success, value) tuple per call, in the same order as ``calls``.
+    Chunks refused for their size are split; other request errors are raised.
+    """
+    chunk_size = max(1, int(chunk_size))
+    results: List[Tuple[bool, Any]] = []
+    for start in range(0, len(calls), chunk_size):
+        results.extend(_aggregate_chunk(w3, calls[start:start + chunk_size], block_identifier))
+    return results
+
+
+def fetch_token_metas(w3: Web3, addresses: Iterable[str], cache: Dict[str, Dict[str, Any]],
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, erc20_abi: Optional[List[Dict[str, Any]]] = None,
+                      executor: Optional[CallExecutor] = None) -> Dict[str, Dict[str, Any]]:
+    """Resolve symbol/decimals for all unknown tokens in one multicall round.
+
+    Reverted reads fall back to 'UNKNOWN' / 18, the same defaults as safe_call, and are
+    flagged ``symbol_failed`` / ``decimals_failed``; request errors propagate.
+    New entries are written into ``cache``. ``executor`` defaults to aggregate3.
+    """
+    executor = executor or aggregate3
+    erc20_abi = erc20_abi or ERC20_META_ABI
+    symbol_fn = abi_function(erc20_abi, 'symbol')
+    decimals_fn = abi_function(erc20_abi, 'decimals')
+    wanted = list(dict.fromkeys(
+        a for a in (Web3.to_checksum_address(addr) for addr in addresses) if a not in cache
+    ))
+    if wanted:
+        calls: List[Call] = []
+        for addr in wanted:
+            calls.append(build_call(w3, addr, symbol_fn))
+            calls.append(build_call(w3, addr, decimals_fn))
+        results = executor(w3, calls, chunk_size)
+        for i, addr in enumerate(wanted):
+            ok_symbol, symbol = results[2 * i]
+            ok_decimals, decimals = results[2 * i + 1]
+            cache[addr] = {
+                'symbol': (symbol if ok_symbol else None) or 'UNKNOWN',
+                'decimals': int(decimals) if ok_decimals and decimals is not None else 18,
+                'symbol_failed': not ok_symbol,
+                'decimals_failed': not (ok_decimals and decimals is not None),
+            }
+    return cache
+
@@ -0,0 +1,194 @@
+# In-memory pool index
+# Every pool of every venue table (Camelot, SushiSwap V2), with integer reserves and
+# per-direction fees, indexed by token pair and by token. Loaded once per process and
+# refreshed per sync batch; lookups also re-read rows any process wrote since the last
+# check (by updated_at). Consumers (arbitrage scanner, token graph) subscribe to
+# refreshes instead of reading the tables themselves.
+
+import datetime
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Type
+
+from django.conf import settings
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for rows written by other processes
+POOL_INDEX_CHECK_INTERVAL = getattr(settings, 'POOL_INDEX_CHECK_INTERVAL', 5.0)
+# Re-read window behind the newest updated_at seen: covers writer clock skew and
+# transactions that commit after a later-stamped one
+POOL_INDEX_CLOCK_SLACK = getattr(settings, 'POOL_INDEX_CLOCK_SLACK', 60)
+
+# Fees are kept as integer parts of FEE_DENOMINATOR (Camelot's own denominator)
+FEE_DENOMINATOR = 100000
+
+PoolKey = Tuple[str, str]      # (venue, pair_address)
+TokenKey = Tuple[str, str]     # sorted (token_a, token_b), lower-case
+
+POOL_FIELDS = (
+    'pair_address', 'token0_address', 'token1_address', 'token0_reserve', 'token1_reserve',
+    'token0_decimals', 'token1_decimals',
+)
+
+
+class Venue(NamedTuple):
+    name: str
+    model: Type[models.Model]
+    # row -> (fee when token0 is the input, fee when token1 is the input) in FEE_DENOMINATOR parts
+    fees: Callable[[Dict[str, Any]], Tuple[int, int]]
+    extra_fields: Tuple[str, ...] = ()
+
+
+def fixed_fee(fraction: float) -> Callable[[Dict[str, Any]], Tuple[int, int]]:
+    parts = int(round(fraction * FEE_DENOMINATOR))
+    return lambda row: (parts, parts)
+
+
+def camelot_fees(row: Dict[str, Any]) -> Tuple[int, int]:
+    # Stored as the on-chain value / 10000; on-chain fees are parts of 100000
+    return (int(Decimal(row['token0FeePercent']) * 10000), int(Decimal(row['token1FeePercent']) * 10000))
+
+
+def amount_out(amount_in: int, reserve_in: int, reserve_out: int, fee: int) -> int:
+    """UniswapV2-style getAmountOut with ``fee`` in FEE_DENOMINATOR parts."""
+    with_fee = amount_in * (FEE_DENOMINATOR - fee)
+    return with_fee * reserve_out // (reserve_in * FEE_DENOMINATOR + with_fee)
+
+
+def side(pool: Dict[str, Any], token_in: str) -> Tuple[int, int, int, int]:
+    """(reserve_in, reserve_out, fee, decimals_in) for a swap into ``pool`` with ``token_in``."""
+    if pool['token0'] == token_in:
+        return pool['reserve0'], pool['reserve1'], pool['fee0'], pool['decimals0']
+    return pool['reserve1'], pool['reserve0'], pool['fee1'], pool['decimals1']
+
+
+def token_key(token_a: str, token_b: str) -> TokenKey:
+    return (token_a, token_b) if token_a <= token_b else (token_b, token_a)
+
+
+class PoolIndex:
+    """Pools of several venue tables keyed by (venue, pair_address).
+
+    Subscribers are called with the refreshed pool keys after ``refresh`` and
+    ``refresh_changed`` and with None after a full ``load``.
+    """
+
+    def __init__(self, venues: Iterable[Venue], check_interval: float = POOL_INDEX_CHECK_INTERVAL):
+        self.venues = {v.name: v for v in venues}
+        self.check_interval = check_interval
+        self.loaded = False
+        # venue -> newest updated_at read by load / refresh_changed
+        self._watermarks: Dict[str, Optional[datetime.datetime]] = {}
+        self._checked_at = 0.0
+        self.pools: Dict[PoolKey, Dict[str, Any]] = {}
+        self.by_tokens: Dict[TokenKey, Set[PoolKey]] = {}
+        self.by_token: Dict[str, Set[PoolKey]] = {}
+        self._lock = threading.RLock()
+        self._subscribers: List[Callable[[Optional[List[PoolKey]]], Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def subscribe(self, callback: Callable[[Optional[List[PoolKey]]], Any]) -> None:
+        self._subscribers.append(callback)
+
+    def ensure_loaded(self) -> None:
+        """Load on first use; afterwards pick up rows written since the last check, at
+        most every ``check_interval`` seconds."""
+        if not self.loaded:
+            self.load()
+        elif time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh_changed()
+
+    def load(self) -> None:
+        """(Re)build the index from every venue table."""
+        with self._lock:
+            self.pools.clear()
+            self.by_tokens.clear()
+            self.by_token.clear()
+            self._checked_at = time.monotonic()
+            for venue in self.venues.values():
+                self._ingest(venue, venue.model.objects.values(*POOL_FIELDS, 'updated_at', *venue.extra_fields),
+                             track=True)
+            self.loaded = True
+            logger.info('Pool index loaded: %s pools, %s token pairs', len(self.pools), len(self.by_tokens))
+            self._notify(None)
+
+    def refresh(self, addresses: Iterable[str]) -> List[PoolKey]:
+        """Reload the given pair addresses from every venue table (new pairs are added)."""
+        addresses = list(set(addresses))
+        if not addresses:
+            return []
+        with self._lock:
+            keys: List[PoolKey] = []
+            for venue in self.venues.values():
+                rows = venue.model.objects.filter(pair_address__in=addresses).values(*POOL_FIELDS, *venue.extra_fields)
+                keys.extend(self._ingest(venue, rows))
+            self._notify(keys)
+        return keys
+
+    def refresh_changed(self) -> List[PoolKey]:
+        """Reload rows whose updated_at is at or after the newest one seen (less the clock
+        slack), whichever process wrote them."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            keys: List[PoolKey] = []
+            for venue in self.venues.values():
+                rows = venue.model.objects.all()
+                since = self._watermarks.get(venue.name)
+                if since is not None:
+                    rows = rows.filter(updated_at__gte=since - datetime.timedelta(seconds=POOL_INDEX_CLOCK_SLACK))
+                keys.extend(self._ingest(venue, rows.values(*POOL_FIELDS, 'updated_at', *venue.extra_fields),
+                                         track=True))
+            if keys:
+                self._notify(keys)
+        return keys
+
+    def _notify(self, keys: Optional[List[PoolKey]]) -> None:
+        for callback in self._subscribers:
+            callback(keys)
+
+    def _ingest(self, venue: Venue, rows: Iterable[Dict[str, Any]], track: bool = False) -> List[PoolKey]:
+        # ``track``: rows are complete since the watermark, so it may advance. A partial
+        # refresh must not move it past rows of other pairs it did not read.
+        keys: List[PoolKey] = []
+        for row in rows:
+            stamp = row.get('updated_at')
+            if track and stamp is not None:
+                watermark = self._watermarks.get(venue.name)
+                if watermark is None or stamp > watermark:
+                    self._watermarks[venue.name] = stamp
+            token0, token1 = row['token0_address'].lower(), row['token1_address'].lower()
+            if not token0.startswith('0x') or not token1.startswith('0x'):
+                # Rows stored before token addresses were tracked
+                continue
+            fee0, fee1 = venue.fees(row)
+            key = (venue.name, row['pair_address'])
+            self.pools[key] = {
+                'venue': venue.name,
+                'pair_address': row['pair_address'],
+                'token0': token0,
+                'token1': token1,
+                'reserve0': int(row['token0_reserve']),
+                'reserve1': int(row['token1_reserve']),
+                'decimals0': row['token0_decimals'],
+                'decimals1': row['token1_decimals'],
+                'fee0': fee0,
+                'fee1': fee1,
+            }
+            self.by_tokens.setdefault(token_key(token0, token1), set()).add(key)
+            self.by_token.setdefault(token0, set()).add(key)
+            self.by_token.setdefault(token1, set()).add(key)
+            keys.append(key)
+        return keys
+
+    def keys_for(self, addresses: Iterable[str]) -> List[PoolKey]:
+        addresses = set(addresses)
+        return [key for key in self.pools if key[1] in addresses]
+
+    def token_keys(self, addresses: Iterable[str]) -> Set[TokenKey]:
+        return {token_key(self.pools[k]['token0'], self.pools[k]['token1']) for k in self.keys_for(addresses)}
@@ -0,0 +1,107 @@
+# Batch pair pricing
+# Prices come from exact integer fixed-point arithmetic:
+#   price0_in_1 = reserve1 * 10**decimals0 / (reserve0 * 10**decimals1)
+# rounded half-even to PRICE_PLACES decimals, which is what the old per-pair Decimal
+# path printed, without Decimal contexts or per-pair object churn. The indexed float
+# columns (price0_in_1, price1_in_0, liquidity) come from the same integers.
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Decimal places kept in the formatted prices
+PRICE_PLACES = 8
+_SCALE = 10 ** PRICE_PLACES
+# 10**d for every decimals() value an ERC20 can report (uint8), and for the sum of two
+# of them (liquidity scales by 10**(decimals0 + decimals1))
+_POW10 = [10 ** d for d in range(511)]
+
+
+def format_scaled(q: int) -> str:
+    """Fixed-point integer (PRICE_PLACES implied decimals) as a plain string, trailing zeros cut."""
+    digits = str(q).rjust(PRICE_PLACES + 1, '0')
+    frac = digits[-PRICE_PLACES:].rstrip('0')
+    return f'{digits[:-PRICE_PLACES]}.{frac}' if frac else digits[:-PRICE_PLACES]
+
+
+def exchange_rate_payload(price0_in_1: str, price1_in_0: str) -> Dict[str, Any]:
+    return {
+        'numeric': {
+            'price_token0_in_token1': price0_in_1,
+            'price_token1_in_token0': price1_in_0,
+        },
+        'display': {
+            '1 token0': f'{price0_in_1} token1',
+            '1 token1': f'{price1_in_0} token0',
+        },
+    }
+
+
+def batch_prices(reserve0: Sequence[int], reserve1: Sequence[int], decimals0: Sequence[int],
+                 decimals1: Sequence[int]) -> List[Optional[Tuple[int, int]]]:
+    """Both price directions per pair as PRICE_PLACES fixed-point integers (None if a reserve is 0)."""
+    pow10, scale = _POW10, _SCALE
+    out: List[Optional[Tuple[int, int]]] = []
+    append = out.append
+    for r0, r1, d0, d1 in zip(reserve0, reserve1, decimals0, decimals1):
+        if not r0 or not r1:
+            append(None)
+            continue
+        a = int(r1) * pow10[d0]
+        b = int(r0) * pow10[d1]
+        # round_half_even(x * scale / y) for both directions, inlined: this loop is the hot path
+        q0, rem0 = divmod(a * scale, b)
+        if rem0 * 2 > b or (rem0 * 2 == b and q0 & 1):
+            q0 += 1
+        q1, rem1 = divmod(b * scale, a)
+        if rem1 * 2 > a or (rem1 * 2 == a and q1 & 1):
+            q1 += 1
+        append((q0, q1))
+    return out
+
+
+def batch_exchange_rates(reserve0: Sequence[int], reserve1: Sequence[int], decimals0: Sequence[int],
+                         decimals1: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+    """exchange_rate JSON for many pairs in one pass (same output as the per-pair Decimal path)."""
+    return [
+        None if p is None else exchange_rate_payload(format_scaled(p[0]), format_scaled(p[1]))
+        for p in batch_prices(reserve0, reserve1, decimals0, decimals1)
+    ]
+
+
+def batch_numeric_prices(reserve0: Sequence[int], reserve1: Sequence[int], decimals0: Sequence[int],
+                         decimals1: Sequence[int]) -> List[Tuple[Optional[float], Optional[float], float]]:
+    """(price0_in_1, price1_in_0, liquidity) floats per pair; prices are None if a reserve is 0.
+
+    int / int true division is correctly rounded, so prices are the nearest doubles to the
+    exact ratios. liquidity is sqrt(reserve0 * reserve1) with both reserves in token units.
+    """
+    pow10 = _POW10
+    out: List[Tuple[Optional[float], Optional[float], float]] = []
+    for r0, r1, d0, d1 in zip(reserve0, reserve1, decimals0, decimals1):
+        r0, r1 = int(r0), int(r1)
+        liquidity = math.sqrt((r0 * r1) / pow10[d0 + d1])
+        if not r0 or not r1:
+            out.append((None, None, liquidity))
+            continue
+        a = r1 * pow10[d0]
+        b = r0 * pow10[d1]
+        out.append((a / b, b / a, liquidity))
+    return out
+
+
+def compute_exchange_rate(token0_reserve: int, token1_reserve: int, d0: int, d1: int) -> Optional[Dict[str, Any]]:
+    return batch_exchange_rates([token0_reserve], [token1_reserve], [d0], [d1])[0]
+
+
+def with_prices(rows: List[Dict[str, Any]], display: bool = True) -> List[Dict[str, Any]]:
+    """Attach price0_in_1/price1_in_0/liquidity (and the exchange_rate display JSON unless
+    ``display`` is False) to pair row dicts carrying token0/1_reserve and token0/1_decimals."""
+    columns = (
+        [r['token0_reserve'] for r in rows], [r['token1_reserve'] for r in rows],
+        [r['token0_decimals'] for r in rows], [r['token1_decimals'] for r in rows],
+    )
+    rates = batch_exchange_rates(*columns) if display else [None] * len(rows)
+    return [
+        {**row, 'price0_in_1': p01, 'price1_in_0': p10, 'liquidity': liquidity, 'exchange_rate': rate}
+        for row, (p01, p10, liquidity), rate in zip(rows, batch_numeric_prices(*columns), rates)
+    ]
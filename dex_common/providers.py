@@ -0,0 +1,168 @@
+# Per-process Web3 provider pool
+# One BatchHTTPProvider per RPC URL with a keep-alive requests.Session, built once per
+# worker process (worker_process_init) instead of once per task. Contracts and factory
+# code checks are memoised; the liveness probe only runs after a connection error.
+# Retries live in one layer only: urllib3 Retry on the session. web3's own
+# exception_retry_configuration is switched off so the two do not multiply.
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import requests
+from celery.signals import worker_process_init
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import Web3
+from web3.contract import Contract
+
+from dex_common.metrics import instrument_session, instrument_web3
+from dex_common.rpc_batch import DEFAULT_BATCH_SIZE, BatchHTTPProvider
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections per host
+RPC_POOL_SIZE = getattr(settings, 'RPC_POOL_SIZE', 10)
+RPC_CONNECT_TIMEOUT = getattr(settings, 'RPC_CONNECT_TIMEOUT', 5)
+RPC_READ_TIMEOUT = getattr(settings, 'RPC_READ_TIMEOUT', 30)
+# urllib3 retries for connect errors and 429/5xx answers (the only retry layer)
+RPC_MAX_RETRIES = getattr(settings, 'RPC_MAX_RETRIES', 3)
+RPC_RETRY_BACKOFF = getattr(settings, 'RPC_RETRY_BACKOFF', 0.5)
+RPC_BATCH_SIZE = getattr(settings, 'RPC_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+# Answers that never change for an endpoint, cached by web3's request cache. Contract
+# calls otherwise re-send eth_chainId before every eth_call. Block-keyed methods of the
+# default allowlist are left out: validating them costs an extra request per call.
+RPC_CACHED_METHODS = frozenset({'eth_chainId', 'net_version', 'web3_clientVersion'})
+# Connection errors within this many seconds of a probe reuse its answer
+RPC_PROBE_INTERVAL = getattr(settings, 'RPC_PROBE_INTERVAL', 10.0)
+
+
+def build_session(pool_size: int = RPC_POOL_SIZE, max_retries: int = RPC_MAX_RETRIES,
+                  backoff: float = RPC_RETRY_BACKOFF) -> requests.Session:
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 502, 503, 504),
+        # JSON-RPC reads are POSTs; they are safe to resend
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return instrument_session(session)
+
+
+class ProviderPool:
+    """Web3 instances, contracts and code checks cached per RPC URL for this process."""
+
+    def __init__(self, timeout: Tuple[float, float] = (RPC_CONNECT_TIMEOUT, RPC_READ_TIMEOUT),
+                 probe_interval: float = RPC_PROBE_INTERVAL):
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._web3: Dict[str, Web3] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._contracts: Dict[Tuple[str, str], Contract] = {}
+        self._has_code: Set[Tuple[str, str]] = set()
+        # rpc_url -> (monotonic time, alive) of the last probe
+        self._probed: Dict[str, Tuple[float, bool]] = {}
+
+    def web3(self, rpc_url: str, batch_size: int = RPC_BATCH_SIZE) -> Web3:
+        """Pooled Web3 for ``rpc_url``. No round trip is made here."""
+        w3 = self._web3.get(rpc_url)
+        if w3 is not None:
+            return w3
+        with self._lock:
+            if rpc_url not in self._web3:
+                session = build_session()
+                provider = BatchHTTPProvider(
+                    rpc_url, request_kwargs={'timeout': self.timeout}, session=session, batch_size=batch_size,
+                    exception_retry_configuration=None,
+                    cache_allowed_requests=True, cacheable_requests=set(RPC_CACHED_METHODS),
+                )
+                provider.on_connection_error = lambda _provider, url=rpc_url: self.probe(url)
+                self._sessions[rpc_url] = session
+                self._web3[rpc_url] = instrument_web3(Web3(provider))
+            return self._web3[rpc_url]
+
+    def contract(self, w3: Web3, address: str, abi: List[Dict[str, Any]]) -> Contract:
+        key = (str(w3.provider.endpoint_uri), Web3.to_checksum_address(address))
+        contract = self._contracts.get(key)
+        if contract is None:
+            contract = self._contracts[key] = w3.eth.contract(address=key[1], abi=abi)
+        return contract
+
+    def has_code(self, w3: Web3, address: str) -> bool:
+        """eth_getCode check, remembered once positive (deployed code does not go away)."""
+        key = (str(w3.provider.endpoint_uri), Web3.to_checksum_address(address))
+        if key in self._has_code:
+            return True
+        if len(w3.eth.get_code(key[1])) == 0:
+            return False
+        self._has_code.add(key)
+        return True
+
+    def probe(self, rpc_url: str) -> bool:
+        """Liveness check after a connection error, at most once per ``probe_interval``.
+
+        When the endpoint answers, the failure was a dead keep-alive socket: the pooled
+        session's connections are dropped so the next call reconnects. When it does not,
+        nothing is reset; cached contracts and code checks stay valid for when it returns.
+        """
+        now = time.monotonic()
+        last = self._probed.get(rpc_url)
+        if last is not None and now - last[0] < self.probe_interval:
+            return last[1]
+        try:
+            response = requests.post(
+                rpc_url, json={'jsonrpc': '2.0', 'id': 1, 'method': 'web3_clientVersion', 'params': []},
+                timeout=self.timeout,
+            )
+            alive = response.ok
+        except requests.exceptions.RequestException:
+            alive = False
+        self._probed[rpc_url] = (now, alive)
+        if alive:
+            self.reset_connections(rpc_url)
+            logger.warning('RPC connection to %s dropped; session reset', rpc_url)
+        else:
+            logger.error('RPC endpoint %s is unreachable', rpc_url)
+        return alive
+
+    def reset_connections(self, rpc_url: str) -> None:
+        """Close the pooled keep-alive sockets for ``rpc_url``; the session stays usable."""
+        session = self._sessions.get(rpc_url)
+        if session is not None:
+            for adapter in session.adapters.values():
+                adapter.close()
+
+    def discard(self, rpc_url: Optional[str] = None) -> None:
+        """Forget the pooled objects for ``rpc_url`` (all URLs when None)."""
+        with self._lock:
+            urls = list(self._web3) if rpc_url is None else [rpc_url]
+            for url in urls:
+                self._web3.pop(url, None)
+                session = self._sessions.pop(url, None)
+                if session is not None:
+                    session.close()
+            self._contracts = {k: v for k, v in self._contracts.items() if k[0] not in urls}
+            self._has_code = {k for k in self._has_code if k[0] not in urls}
+            for url in urls:
+                self._probed.pop(url, None)
+
+
+# One pool per process, shared by every DEX app
+provider_pool = ProviderPool()
+
+
+@worker_process_init.connect
+def init_provider_pool(**kwargs: Any) -> None:
+    # Sessions must not be shared across fork: start clean in every child
+    provider_pool.discard()
+    rpc_url = getattr(settings, 'RPC_URL', None)
+    if rpc_url:
+        provider_pool.web3(rpc_url)
@@ -0,0 +1,52 @@
+# Pair registry: cache allPairs(i) -> address, token0 and token1 forever.
+# Known pairs only need getReserves on later syncs (dex_common.engine); only unknown
+# indices go through allPairs discovery.
+
+import logging
+from typing import Any, Dict, Iterable, List
+
+from dex_common.models import PairRegistry
+from dex_common.writer import conflict_target
+
+logger = logging.getLogger(__name__)
+
+
+def load_registry(factory: str, indices: Iterable[int]) -> Dict[int, PairRegistry]:
+    indices = list(indices)
+    if not indices:
+        return {}
+    rows = PairRegistry.objects.filter(factory=factory, pair_index__gte=min(indices), pair_index__lte=max(indices))
+    wanted = set(indices)
+    return {row.pair_index: row for row in rows if row.pair_index in wanted}
+
+
+def register_pairs(factory: str, snapshots: List[Dict[str, Any]], overwrite: bool = False) -> None:
+    """Store the immutable part of freshly discovered pair snapshots.
+
+    Existing indices are left alone unless ``overwrite`` is set (a reorg replaced the
+    PairCreated event that registered them).
+    """
+    if not snapshots:
+        return
+    conflicts: Dict[str, Any] = {'ignore_conflicts': True}
+    if overwrite:
+        conflicts = {
+            'update_conflicts': True,
+            'unique_fields': conflict_target(PairRegistry, ['factory', 'pair_index']),
+            'update_fields': ['pair_address', 'token0', 'token1', 'pair_symbol'],
+        }
+    PairRegistry.objects.bulk_create(
+        [
+            PairRegistry(
+                factory=factory,
+                pair_index=s['index'],
+                pair_address=s['pair_address'],
+                token0=s['token0'],
+                token1=s['token1'],
+                pair_symbol=s['symbol'],
+            )
+            for s in snapshots
+        ],
+        **conflicts,
+    )
+
@@ -0,0 +1,249 @@
+# Token graph and multi-hop pricing
+# Tokens are nodes and pools (dex_common.pools) are edges. USD prices start at the anchor
+# stablecoins (price 1) and follow the most liquid path: a widest-path tree where a
+# path's liquidity is its thinnest hop, measured as the USD depth of the pool seen from
+# the already priced side (2 * reserve * price). That width depends on the price the path
+# itself produces, so the tree is only well defined as the one grown widest-first from the
+# anchors: when a sync batch changes a tree edge (or a pool that would now widen a path),
+# the whole connected component around it is re-grown from its anchors, exactly as
+# rebuild() would. Other components are left alone.
+
+import heapq
+import logging
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+
+from dex_common.pools import PoolIndex, PoolKey, amount_out, side, token_key
+
+logger = logging.getLogger(__name__)
+
+# Arbitrum USDC, USDC.e, USDT and DAI
+ROUTING_ANCHORS = getattr(settings, 'ROUTING_ANCHORS', (
+    '0xaf88d065e77c8cC2239327C5EDb3A432268e5831',
+    '0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8',
+    '0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9',
+    '0xDA10009cBd5D07dd0CeCc66161FC93D7c9000da1',
+))
+
+
+class TokenGraph:
+    """USD prices for every token reachable from the anchors, kept in sync with a PoolIndex."""
+
+    def __init__(self, index: PoolIndex, anchors: Iterable[str] = ROUTING_ANCHORS):
+        self.index = index
+        self.anchors = {a.lower() for a in anchors}
+        self._lock = threading.RLock()
+        self._built = False
+        # token -> USD price / path liquidity (bottleneck USD depth) / pool linking it to its parent
+        self._price: Dict[str, float] = {}
+        self._width: Dict[str, float] = {}
+        self._parent: Dict[str, PoolKey] = {}
+        self._children: Dict[str, Set[str]] = {}
+        index.subscribe(self._on_refresh)
+
+    # -- lookups ---------------------------------------------------------------
+    def price_of(self, token: str) -> Optional[float]:
+        """USD price of ``token`` via its most liquid path to an anchor (None if unreachable)."""
+        self._ensure_built()
+        return self._price.get(token.lower())
+
+    def price_info(self, token: str) -> Optional[Dict[str, Any]]:
+        """Price plus the path liquidity and the pools from the token back to its anchor."""
+        self._ensure_built()
+        token = token.lower()
+        if token not in self._price:
+            return None
+        pools: List[str] = []
+        node = token
+        while node in self._parent:
+            key = self._parent[node]
+            pools.append(key[1])
+            node = _other(self.index.pools[key], node)
+        return {'price': self._price[token], 'liquidity_usd': self._width[token], 'anchor': node, 'pools': pools}
+
+    def quote(self, path: Sequence[str], amounts_in: Sequence[int]) -> List[Dict[str, Any]]:
+        """Swap ``amounts_in`` (raw units of path[0]) along the token ``path``.
+
+        Each hop uses the pool with the best output for the running amount, with that
+        pool's own fee for the input direction. amount_out is None if a hop has no pool.
+        """
+        self.index.ensure_loaded()
+        path = [t.lower() for t in path]
+        hops = [
+            [self.index.pools[k] for k in sorted(self.index.by_tokens.get(token_key(a, b), ()))]
+            for a, b in zip(path, path[1:])
+        ]
+        quotes: List[Dict[str, Any]] = []
+        for amount in amounts_in:
+            used: List[str] = []
+            for token_in, pools in zip(path, hops):
+                best = None
+                for pool in pools:
+                    reserve_in, reserve_out, fee, _ = side(pool, token_in)
+                    if not reserve_in or not reserve_out:
+                        continue
+                    out = amount_out(amount, reserve_in, reserve_out, fee)
+                    if best is None or out > best[0]:
+                        best = (out, pool['pair_address'])
+                if best is None:
+                    amount = None
+                    break
+                amount = best[0]
+                used.append(best[1])
+            quotes.append({'amount_out': amount, 'pools': used if amount is not None else []})
+        return quotes
+
+    # -- maintenance -----------------------------------------------------------
+    def _ensure_built(self) -> None:
+        # Also applies rows other processes wrote since the index's last check
+        self.index.ensure_loaded()
+        if not self._built:
+            self.rebuild()
+
+    def _on_refresh(self, keys: Optional[List[PoolKey]]) -> None:
+        if keys is None:
+            # Full index reload: rebuild lazily on the next lookup
+            self._built = False
+        elif self._built:
+            self.update(keys)
+
+    def rebuild(self) -> None:
+        with self._lock:
+            self._price.clear()
+            self._width.clear()
+            self._parent.clear()
+            self._children.clear()
+            heap: List[Tuple[float, str]] = []
+            for anchor in self.anchors:
+                if anchor in self.index.by_token:
+                    self._price[anchor] = 1.0
+                    self._width[anchor] = math.inf
+                    heap.append((-math.inf, anchor))
+            self._grow(heap)
+            self._built = True
+        logger.info('Token graph built: %s of %s tokens priced', len(self._price), len(self.index.by_token))
+
+    def update(self, keys: Iterable[PoolKey]) -> None:
+        """Apply changed pools: re-grow the components holding a changed tree edge or a
+        changed pool that now offers a wider path. Patching only the affected subtrees
+        settles on a history-dependent tree (edge widths depend on path prices), so the
+        component is grown again from its anchors; the result equals rebuild()."""
+        with self._lock:
+            roots: Set[str] = set()
+            for key in keys:
+                pool = self.index.pools[key]
+                for u, v in ((pool['token0'], pool['token1']), (pool['token1'], pool['token0'])):
+                    if u in self.anchors and u not in self._price:
+                        # First pool of an anchor
+                        roots.add(u)
+                    elif self._parent.get(v) == key:
+                        roots.add(v)
+                    elif u in self._price and self._candidate(u, pool)[0] >= self._width.get(v, 0.0):
+                        # Wider, or tied with v's path (widths are shared bottlenecks, so ties
+                        # are common and rebuild() would settle them by visiting order)
+                        roots.add(v)
+            if not roots:
+                return
+            component = self._component(roots)
+            self._invalidate(component)
+            heap: List[Tuple[float, str]] = []
+            for anchor in component & self.anchors:
+                self._price[anchor] = 1.0
+                self._width[anchor] = math.inf
+                heap.append((-math.inf, anchor))
+            self._grow(heap)
+
+    def _component(self, roots: Set[str]) -> Set[str]:
+        # Tokens connected to ``roots`` through any pool
+        seen = set(roots)
+        stack = list(roots)
+        while stack:
+            for key in self.index.by_token.get(stack.pop(), ()):
+                pool = self.index.pools[key]
+                for token in (pool['token0'], pool['token1']):
+                    if token not in seen:
+                        seen.add(token)
+                        stack.append(token)
+        return seen
+
+    def _candidate(self, u: str, pool: Dict[str, Any]) -> Tuple[float, float]:
+        # (path width, price) for the token across ``pool`` from priced token ``u``
+        reserve_u, reserve_v, _, decimals_u = side(pool, u)
+        if not reserve_u or not reserve_v:
+            return 0.0, 0.0
+        decimals_v = pool['decimals1'] if pool['token0'] == u else pool['decimals0']
+        units_u = reserve_u / 10 ** decimals_u
+        units_v = reserve_v / 10 ** decimals_v
+        depth = 2 * units_u * self._price[u]
+        return min(self._width[u], depth), self._price[u] * units_u / units_v
+
+    def _set(self, v: str, width: float, price: float, key: PoolKey, u: str) -> None:
+        old = self._parent.get(v)
+        if old is not None:
+            self._children.get(_other(self.index.pools[old], v), set()).discard(v)
+        self._width[v] = width
+        self._price[v] = price
+        self._parent[v] = key
+        self._children.setdefault(u, set()).add(v)
+
+    def _relax(self, u: str, heap: List[Tuple[float, str]]) -> None:
+        for key in self.index.by_token.get(u, ()):
+            pool = self.index.pools[key]
+            v = _other(pool, u)
+            if v in self.anchors:
+                continue
+            width, price = self._candidate(u, pool)
+            if width <= self._width.get(v, 0.0) or self._parent.get(u) == key:
+                continue
+            # v improves: its descendants' paths change, re-grow them from scratch
+            dead = self._invalidate(set(self._children.get(v, ())))
+            self._set(v, width, price, key, u)
+            heapq.heappush(heap, (-width, v))
+            self._seed(dead, heap)
+
+    def _grow(self, heap: List[Tuple[float, str]]) -> None:
+        # Widest-path Dijkstra: pop the widest token and offer its pools to its neighbours
+        while heap:
+            negative, u = heapq.heappop(heap)
+            if u not in self._width or -negative < self._width[u]:
+                # Invalidated, or superseded by a wider entry
+                continue
+            self._relax(u, heap)
+
+    def _invalidate(self, roots: Set[str]) -> Set[str]:
+        dead: Set[str] = set()
+        stack = [t for t in roots if t not in self.anchors]
+        while stack:
+            token = stack.pop()
+            if token in dead:
+                continue
+            dead.add(token)
+            stack.extend(self._children.pop(token, ()))
+        for token in dead:
+            key = self._parent.pop(token, None)
+            if key is not None:
+                self._children.get(_other(self.index.pools[key], token), set()).discard(token)
+            self._price.pop(token, None)
+            self._width.pop(token, None)
+        return dead
+
+    def _seed(self, dead: Set[str], heap: List[Tuple[float, str]]) -> None:
+        # Offer the pools of every priced token outside ``dead`` to the invalidated tokens;
+        # paths through other invalidated tokens are found by _grow
+        for v in dead:
+            for key in self.index.by_token.get(v, ()):
+                pool = self.index.pools[key]
+                u = _other(pool, v)
+                if u not in self._price or u in dead:
+                    continue
+                width, price = self._candidate(u, pool)
+                if width > self._width.get(v, 0.0):
+                    self._set(v, width, price, key, u)
+                    heapq.heappush(heap, (-width, v))
+
+
+def _other(pool: Dict[str, Any], token: str) -> str:
+    return pool['token1'] if pool['token0'] == token else pool['token0']
@@ -0,0 +1,170 @@
+# JSON-RPC batch transport
+# Sends many pending requests (eth_call, eth_getCode, ...) as one JSON-RPC batch array
+# and maps each response back to its request by id.
+
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from web3 import Web3
+
+from dex_common.metrics import record_rpc, record_rpc_batch
+from dex_common.multicall import Call, decode_result, is_call_failure
+
+logger = logging.getLogger(__name__)
+
+# Requests per HTTP batch. Most hosted providers accept 100-1000 per batch.
+DEFAULT_BATCH_SIZE = 100
+# Error text of a batch refused for its size or because batching is not supported
+BATCH_REFUSAL_MARKERS = ('batch', 'too large', 'too many', 'exceeds', 'not supported')
+
+
+class RPCBatchError(Exception):
+    """The batch as a whole was rejected (HTTP error, malformed response).
+
+    ``splittable`` is set when the provider refused the batch for its size or for
+    batching itself, so smaller batches (or single requests) can still succeed.
+    """
+
+    def __init__(self, message: str, splittable: bool = False):
+        super().__init__(message)
+        self.splittable = splittable
+
+
+class BatchHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider that can additionally send a list of requests as one batch.
+
+    Normal web3 calls keep going through HTTPProvider; ``batch_request`` posts
+    ``[{"jsonrpc": "2.0", "id": n, "method": ..., "params": ...}, ...]`` and returns
+    one ``(ok, result_or_error)`` tuple per request, in request order.
+    ``on_connection_error`` (if set) is called with the provider when a request cannot
+    reach the endpoint, before the error propagates.
+    """
+
+    def __init__(self, endpoint_uri: Optional[str] = None, request_kwargs: Optional[Dict[str, Any]] = None,
+                 session: Optional[requests.Session] = None, batch_size: int = DEFAULT_BATCH_SIZE, **kwargs: Any):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs, session=session, **kwargs)
+        self.batch_size = max(1, int(batch_size))
+        self._batch_session = session or requests.Session()
+        self._batch_timeout = (request_kwargs or {}).get('timeout', 10)
+        self._ids = itertools.count(1)
+        self.on_connection_error: Optional[Callable[['BatchHTTPProvider'], Any]] = None
+
+    def _connection_failed(self) -> None:
+        if self.on_connection_error is not None:
+            self.on_connection_error(self)
+
+    def make_request(self, method: Any, params: Any) -> Any:
+        try:
+            return super().make_request(method, params)
+        except requests.exceptions.ConnectionError:
+            self._connection_failed()
+            raise
+
+    def _post_batch(self, payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        try:
+            response = self._batch_session.post(
+                str(self.endpoint_uri), json=payload, timeout=self._batch_timeout,
+                headers={'Content-Type': 'application/json'},
+            )
+            response.raise_for_status()
+            body = response.json()
+        except requests.exceptions.ConnectionError as e:
+            self._connection_failed()
+            raise RPCBatchError(str(e)) from e
+        except requests.exceptions.HTTPError as e:
+            raise RPCBatchError(str(e), splittable=e.response is not None and e.response.status_code == 413) from e
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise RPCBatchError(str(e)) from e
+        if not isinstance(body, list):
+            # Providers answer a single error object when the batch itself is refused
+            error = body.get('error') if isinstance(body, dict) else None
+            message = str((error or {}).get('message', '') if isinstance(error, dict) else error).lower()
+            raise RPCBatchError(f'batch rejected: {body}',
+                                splittable=any(marker in message for marker in BATCH_REFUSAL_MARKERS))
+        return body
+
+    def _send_chunk(self, requests_: Sequence[Tuple[str, Any]]) -> List[Tuple[bool, Any]]:
+        payload = []
+        for method, params in requests_:
+            payload.append({'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': list(params)})
+        methods = [req['method'] for req in payload]
+        began = time.perf_counter()
+        try:
+            body = self._post_batch(payload)
+        except RPCBatchError as e:
+            record_rpc_batch(methods, time.perf_counter() - began, [True] * len(payload))
+            if not e.splittable:
+                raise
+            if len(payload) == 1:
+                # Batching itself is refused: send the request on its own
+                method, params = requests_[0]
+                began = time.perf_counter()
+                response = self.make_request(method, list(params))
+                failed = response.get('error') is not None
+                record_rpc(method, time.perf_counter() - began, failed)
+                return [(False, response['error']) if failed else (True, response.get('result'))]
+            logger.warning('RPC batch with %s requests refused, splitting: %s', len(payload), e)
+            mid = len(requests_) // 2
+            return self._send_chunk(requests_[:mid]) + self._send_chunk(requests_[mid:])
+
+        # Responses may come back in any order; demultiplex by id
+        by_id = {item.get('id'): item for item in body if isinstance(item, dict)}
+        results: List[Tuple[bool, Any]] = []
+        for req in payload:
+            item = by_id.get(req['id'])
+            if item is None:
+                results.append((False, {'message': 'missing response'}))
+            elif item.get('error') is not None:
+                results.append((False, item['error']))
+            else:
+                results.append((True, item.get('result')))
+        record_rpc_batch(methods, time.perf_counter() - began, [not ok for ok, _ in results])
+        return results
+
+    def batch_request(self, requests_: Sequence[Tuple[str, Any]],
+                      batch_size: Optional[int] = None) -> List[Tuple[bool, Any]]:
+        """Send (method, params) pairs in batches of ``batch_size``.
+
+        Batches refused for their size are split; transport errors raise RPCBatchError.
+        """
+        size = max(1, int(batch_size or self.batch_size))
+        results: List[Tuple[bool, Any]] = []
+        for start in range(0, len(requests_), size):
+            results.extend(self._send_chunk(requests_[start:start + size]))
+        return results
+
+
+def _batch_provider(w3: Web3, batch_size: int) -> BatchHTTPProvider:
+    provider = w3.provider
+    if isinstance(provider, BatchHTTPProvider):
+        return provider
+    # Plain HTTPProvider: reuse its endpoint for batch requests
+    return BatchHTTPProvider(str(getattr(provider, 'endpoint_uri')), batch_size=batch_size)
+
+
+def batch_calls(w3: Web3, calls: List[Call], chunk_size: int = DEFAULT_BATCH_SIZE,
+                block_identifier: Any = 'latest') -> List[Tuple[bool, Any]]:
+    """Run eth_calls as JSON-RPC batches. Same contract as multicall.aggregate3.
+
+    A reverted item only fails that call; any other per-item error (rate limit,
+    internal error) raises RPCBatchError, so it is never mistaken for a revert.
+    """
+    provider = _batch_provider(w3, chunk_size)
+    block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+    requests_ = [
+        ('eth_call', [{'to': c.target, 'data': Web3.to_hex(c.data)}, block]) for c in calls
+    ]
+    results: List[Tuple[bool, Any]] = []
+    for call, (ok, value) in zip(calls, provider.batch_request(requests_, chunk_size)):
+        if not ok:
+            if not is_call_failure(RPCBatchError(str(value))):
+                raise RPCBatchError(f'eth_call to {call.target} failed in batch: {value}')
+            logger.debug('eth_call to %s reverted in batch: %s', call.target, value)
+            results.append((False, None))
+            continue
+        results.append(decode_result(w3, call, True, Web3.to_bytes(hexstr=value or '0x')))
+    return results
+
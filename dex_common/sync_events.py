@@ -0,0 +1,149 @@
+# Event-driven reserve tracking
+# Uniswap-V2-style pairs (SushiSwap, Camelot) emit Sync(uint112 reserve0, uint112 reserve1)
+# on every reserve change, so scanning those logs costs per market move, not per pair.
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from django.db import models
+from django.utils import timezone
+from web3 import Web3
+
+from dex_common.history import append_snapshots
+from dex_common.multicall import DEFAULT_CHUNK_SIZE, abi_function, aggregate3, build_call
+from dex_common.pricing import with_prices
+
+logger = logging.getLogger(__name__)
+
+SYNC_TOPIC = Web3.to_hex(Web3.keccak(text='Sync(uint112,uint112)'))
+# Blocks per eth_getLogs request before any splitting
+DEFAULT_BLOCK_SPAN = 2000
+# JSON-RPC code and error text of a window refused for its result count or response size
+LOG_LIMIT_CODE = -32005
+LOG_LIMIT_MARKERS = ('more than', 'too large', 'limit exceeded', 'response size', 'block range')
+
+
+def is_log_limit_error(error: BaseException) -> bool:
+    """True when eth_getLogs was refused for the size of its window, so a smaller one
+    can succeed. Transport and provider failures (connection errors, 429, timeouts) are not."""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 413:
+        return True
+    rpc_error = (getattr(error, 'rpc_response', None) or {}).get('error')
+    if isinstance(rpc_error, dict) and rpc_error.get('code') == LOG_LIMIT_CODE:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in LOG_LIMIT_MARKERS)
+
+
+def get_logs_adaptive(w3: Web3, from_block: int, to_block: int, topics: List[Any],
+                      addresses: Optional[Sequence[str]] = None,
+                      max_span: int = DEFAULT_BLOCK_SPAN) -> List[Dict[str, Any]]:
+    """eth_getLogs over [from_block, to_block], halving the window whenever the provider
+    refuses it (result limit / response size errors) and growing it back after successes.
+    Other errors are raised at once.
+    """
+    logs: List[Dict[str, Any]] = []
+    span = max(1, max_span)
+    start = from_block
+    while start <= to_block:
+        end = min(start + span - 1, to_block)
+        params: Dict[str, Any] = {'fromBlock': start, 'toBlock': end, 'topics': topics}
+        if addresses:
+            params['address'] = list(addresses)
+        try:
+            chunk = w3.eth.get_logs(params)
+        except Exception as e:
+            if end == start or not is_log_limit_error(e):
+                raise
+            span = max(1, (end - start + 1) // 2)
+            logger.info('eth_getLogs %s-%s refused (%s); retrying with %s blocks', start, end, e, span)
+            continue
+        logs.extend(chunk)
+        start = end + 1
+        span = min(max_span, span * 2)
+    return logs
+
+
+def latest_sync_per_pair(w3: Web3, logs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Keep only the last Sync per pair (by block number, then log index)."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for log in logs:
+        if log.get('removed'):
+            continue
+        address = Web3.to_checksum_address(log['address'])
+        position = (int(log['blockNumber']), int(log['logIndex']))
+        current = latest.get(address)
+        if current is not None and current['position'] >= position:
+            continue
+        reserve0, reserve1 = w3.codec.decode(['uint112', 'uint112'], bytes(log['data']))
+        latest[address] = {'position': position, 'reserve0': reserve0, 'reserve1': reserve1}
+    return latest
+
+
+def fetch_reserves(w3: Web3, pair_abi: List[Dict[str, Any]], addresses: Sequence[str],
+                   block_identifier: Any = 'latest',
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Dict[str, Any]]:
+    """getReserves for the given pairs at ``block_identifier``, shaped like latest_sync_per_pair.
+
+    Used after a reorg: a pair whose last Sync was orphaned may have no canonical log
+    in the re-scanned window, so its stored reserves can only be corrected by reading state.
+    """
+    get_reserves = abi_function(pair_abi, 'getReserves')
+    calls = [build_call(w3, address, get_reserves) for address in addresses]
+    results = aggregate3(w3, calls, chunk_size, block_identifier=block_identifier)
+    reserves: Dict[str, Dict[str, Any]] = {}
+    for address, (ok, values) in zip(addresses, results):
+        if not ok:
+            logger.warning('getReserves failed for %s', address)
+            continue
+        reserves[address] = {'position': None, 'reserve0': values[0], 'reserve1': values[1]}
+    return reserves
+
+
+def apply_reserve_updates(model: Type[models.Model], updates: Dict[str, Dict[str, Any]],
+                          batch_size: int = 500, display: bool = True,
+                          snapshot_model: Optional[Type[models.Model]] = None) -> int:
+    """Write changed reserves and the derived price columns for pairs stored in ``model``.
+
+    Pairs that are not tracked in the table are ignored. With ``snapshot_model`` every
+    changed pair also gets a history row, using the update's ``block_number``/``ts`` when set.
+    Returns the number of rows updated.
+    """
+    if not updates:
+        return 0
+    now = timezone.now()
+    changed = []
+    for obj in model.objects.filter(pair_address__in=list(updates)):
+        u = updates[obj.pair_address]
+        if obj.token0_reserve == u['reserve0'] and obj.token1_reserve == u['reserve1']:
+            continue
+        obj.token0_reserve = u['reserve0']
+        obj.token1_reserve = u['reserve1']
+        # bulk_update skips auto_now
+        obj.updated_at = now
+        changed.append(obj)
+    priced = with_prices([
+        {'token0_reserve': o.token0_reserve, 'token1_reserve': o.token1_reserve,
+         'token0_decimals': o.token0_decimals, 'token1_decimals': o.token1_decimals}
+        for o in changed
+    ], display=display)
+    for obj, row in zip(changed, priced):
+        obj.exchange_rate = row['exchange_rate']
+        obj.price0_in_1 = row['price0_in_1']
+        obj.price1_in_0 = row['price1_in_0']
+        obj.liquidity = row['liquidity']
+    model.objects.bulk_update(
+        changed,
+        ['token0_reserve', 'token1_reserve', 'exchange_rate', 'price0_in_1', 'price1_in_0', 'liquidity', 'updated_at'],
+        batch_size=batch_size,
+    )
+    if snapshot_model is not None:
+        write_ts = int(time.time())
+        append_snapshots(snapshot_model, [
+            (o.id, o.token0_reserve, o.token1_reserve,
+             updates[o.pair_address].get('block_number'), updates[o.pair_address].get('ts') or write_ts)
+            for o in changed
+        ])
+    return len(changed)
@@ -0,0 +1,246 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from celery import current_app, shared_task
+from django.conf import settings
+from web3 import Web3
+
+from Camelot_v2 import tasks as camelot_tasks
+from Camelot_v2.models import Camelot, CamelotPriceBar, CamelotReserveSnapshot
+from SushiSwap_v2 import tasks as sushiswap_tasks
+from SushiSwap_v2.models import SushiSwapV2, SushiSwapV2PriceBar, SushiSwapV2ReserveSnapshot
+from dex_common.arbitrage import ArbitrageScanner
+from dex_common.crawl import dispatch_shards, merge_report, run_shard
+from dex_common.cursors import get_cursor, save_cursor
+from dex_common.engine import V2SyncEngine
+from dex_common.history import block_timestamps, prune_snapshots, rollup_bars
+from dex_common.metrics import task_breakdown
+from dex_common.multicall import DEFAULT_CHUNK_SIZE, aggregate3, call_each
+from dex_common.pools import PoolIndex, Venue, camelot_fees, fixed_fee
+from dex_common.providers import provider_pool
+from dex_common.routing import TokenGraph
+from dex_common.rpc_batch import DEFAULT_BATCH_SIZE, batch_calls
+from dex_common.sync_events import (
+    DEFAULT_BLOCK_SPAN, SYNC_TOPIC, apply_reserve_updates, fetch_reserves, get_logs_adaptive, latest_sync_per_pair,
+)
+
+logger = logging.getLogger(__name__)
+
+SYNC_LOG_CURSOR = 'sync_logs'
+# Blocks re-scanned on every run so events from reorged blocks are replaced by canonical ones
+SYNC_LOG_REORG_WINDOW = getattr(settings, 'SYNC_LOG_REORG_WINDOW', 64)
+SYNC_LOG_BLOCK_SPAN = getattr(settings, 'SYNC_LOG_BLOCK_SPAN', DEFAULT_BLOCK_SPAN)
+# Upper bound of blocks handled by one run (catch-up after downtime continues next run)
+SYNC_LOG_MAX_BLOCKS = getattr(settings, 'SYNC_LOG_MAX_BLOCKS', 50000)
+# Filter eth_getLogs by pair address while we track at most this many pairs,
+# otherwise query the Sync topic alone and drop unknown pairs client-side
+SYNC_LOG_ADDRESS_FILTER_MAX = getattr(settings, 'SYNC_LOG_ADDRESS_FILTER_MAX', 1000)
+PAIR_PRICE_DISPLAY = getattr(settings, 'PAIR_PRICE_DISPLAY', True)
+RESERVE_HISTORY_ENABLED = getattr(settings, 'RESERVE_HISTORY_ENABLED', True)
+# Raw reserve snapshots older than this are deleted once rolled up into bars
+RESERVE_HISTORY_RETENTION = getattr(settings, 'RESERVE_HISTORY_RETENTION', 7 * 86400)
+# Re-evaluate cross-DEX spreads for the pairs touched by every Sync log batch
+ARBITRAGE_SCAN_ENABLED = getattr(settings, 'ARBITRAGE_SCAN_ENABLED', True)
+# SushiSwap V2 charges a flat 0.3% on the input token
+SUSHISWAP_FEE = getattr(settings, 'SUSHISWAP_FEE', 0.003)
+MULTICALL_CHUNK_SIZE = getattr(settings, 'MULTICALL_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+RPC_BATCH_SIZE = getattr(settings, 'RPC_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+# V2 factories synced together by sync_v2_dexes; a new DEX app adds its V2Dex here
+V2_DEXES = (camelot_tasks.DEX, sushiswap_tasks.DEX)
+# mode -> (call executor, default chunk size)
+ENGINE_MODES = {
+    'multicall': (aggregate3, MULTICALL_CHUNK_SIZE),
+    'rpc_batch': (batch_calls, RPC_BATCH_SIZE),
+    'serial': (call_each, MULTICALL_CHUNK_SIZE),
+}
+
+# (model, pair ABI, reserve snapshot model) for every table fed by Sync logs
+SYNC_TARGETS = (
+    (Camelot, camelot_tasks.PAIR_ABI, CamelotReserveSnapshot),
+    (SushiSwapV2, sushiswap_tasks.PAIR_ABI, SushiSwapV2ReserveSnapshot),
+)
+# (pair model, reserve snapshot model, price bar model)
+HISTORY_TARGETS = (
+    (Camelot, CamelotReserveSnapshot, CamelotPriceBar),
+    (SushiSwapV2, SushiSwapV2ReserveSnapshot, SushiSwapV2PriceBar),
+)
+POOL_VENUES = (
+    Venue('camelot', Camelot, camelot_fees, ('token0FeePercent', 'token1FeePercent')),
+    Venue('sushiswap_v2', SushiSwapV2, fixed_fee(SUSHISWAP_FEE)),
+)
+
+# Per-process pool index, loaded on first use, refreshed per batch and re-checked for
+# rows written by other processes on lookups; the scanner and the token graph both
+# read it (the graph follows its refreshes incrementally)
+pool_index = PoolIndex(POOL_VENUES)
+arbitrage_scanner = ArbitrageScanner(pool_index)
+token_graph = TokenGraph(pool_index)
+
+
+def get_web3() -> Web3:
+    return provider_pool.web3(settings.RPC_URL)
+
+
+def _tracked_addresses() -> List[str]:
+    addresses: List[str] = []
+    for model, _, _ in SYNC_TARGETS:
+        addresses.extend(model.objects.values_list('pair_address', flat=True))
+    return addresses
+
+
+@shared_task
+def ingest_sync_logs(from_block: Optional[int] = None, max_blocks: Optional[int] = None) -> Dict[str, Any]:
+    """Apply reserve changes from pair Sync logs since the last processed block.
+    Args:
+        from_block: override the stored cursor (first run defaults to the current head)
+        max_blocks: cap on blocks scanned this run
+    Returns summary dict
+    """
+    w3 = get_web3()
+    head = w3.eth.block_number
+    cursor = get_cursor(SYNC_LOG_CURSOR)
+    reorg = False
+    if from_block is None:
+        if cursor is None:
+            from_block = head
+        else:
+            if cursor.block_hash:
+                current_hash = Web3.to_hex(w3.eth.get_block(cursor.block_number)['hash'])
+                if current_hash != cursor.block_hash:
+                    reorg = True
+                    logger.warning('Reorg detected at block %s, refreshing tracked reserves from state',
+                                   cursor.block_number)
+            from_block = max(0, cursor.block_number + 1 - SYNC_LOG_REORG_WINDOW)
+    to_block = min(head, from_block + (max_blocks or SYNC_LOG_MAX_BLOCKS) - 1)
+    if to_block < from_block:
+        return {'ok': True, 'from_block': from_block, 'to_block': to_block, 'logs': 0, 'updated': {}}
+
+    tracked = _tracked_addresses()
+    addresses = tracked if len(tracked) <= SYNC_LOG_ADDRESS_FILTER_MAX else None
+    if not tracked or reorg:
+        # After a reorg the state read below supersedes any log in the window
+        logs = []
+    else:
+        logs = get_logs_adaptive(w3, from_block, to_block, [SYNC_TOPIC], addresses, SYNC_LOG_BLOCK_SPAN)
+    latest = latest_sync_per_pair(w3, logs)
+
+    stamps: Dict[int, int] = {}
+    if RESERVE_HISTORY_ENABLED:
+        stamps = block_timestamps(w3, [u['position'][0] for u in latest.values()] + [to_block])
+
+    updated: Dict[str, int] = {}
+    for model, pair_abi, snapshot_model in SYNC_TARGETS:
+        updates = latest
+        if reorg:
+            # Orphaned Syncs may have no canonical replacement in the window: read state instead
+            pairs = list(model.objects.values_list('pair_address', flat=True))
+            updates = fetch_reserves(w3, pair_abi, pairs, block_identifier=to_block)
+        for u in updates.values():
+            u['block_number'] = u['position'][0] if u['position'] else to_block
+            u['ts'] = stamps.get(u['block_number'])
+        updated[model._meta.db_table] = apply_reserve_updates(
+            model, updates, display=PAIR_PRICE_DISPLAY,
+            snapshot_model=snapshot_model if RESERVE_HISTORY_ENABLED else None,
+        )
+
+    to_hash = Web3.to_hex(w3.eth.get_block(to_block)['hash'])
+    save_cursor(SYNC_LOG_CURSOR, to_block, to_hash)
+
+    arbitrage = None
+    if ARBITRAGE_SCAN_ENABLED and (latest or reorg):
+        scan = arbitrage_scanner.scan_pairs(tracked if reorg else list(latest))
+        arbitrage = {**scan, 'opportunities': len(scan['opportunities'])}
+    summary = {
+        'ok': True,
+        'from_block': from_block,
+        'to_block': to_block,
+        'head': head,
+        'reorg': reorg,
+        'logs': len(logs),
+        'pairs_touched': len(latest),
+        'updated': updated,
+        'arbitrage': arbitrage,
+    }
+    logger.info('Sync log ingestion summary %s', summary)
+    return summary
+
+
+@shared_task
+def sync_v2_dexes(start_index: int = 0, limit: int = 200, mode: str = 'multicall',
+                  chunk_size: Optional[int] = None, dexes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Sync the same index window of every V2 factory in one pass.
+    Args:
+        start_index: starting pair index
+        limit: number of pairs per factory
+        mode: 'multicall', 'rpc_batch' or 'serial' (how each shared round is sent)
+        chunk_size: calls per aggregate3 request / JSON-RPC batch
+        dexes: V2Dex names to sync (default all of V2_DEXES)
+    Returns summary dict with one sync_pairs_batch-style entry per DEX
+    """
+    if mode not in ENGINE_MODES:
+        return {'ok': False, 'error': f'Unknown sync mode: {mode}'}
+    executor, default_chunk = ENGINE_MODES[mode]
+    engine = V2SyncEngine(V2_DEXES, chunk_size or default_chunk, executor)
+    summary = engine.sync(get_web3(), start_index, limit, dexes)
+    summary.update(mode=mode, metrics=task_breakdown())
+    logger.info('V2 engine sync: %s', {name: {k: v for k, v in s.items() if k != 'addresses'}
+                                       for name, s in summary['dexes'].items()})
+    return summary
+
+
+@shared_task
+def crawl_shard(task_name: str, start_index: int, limit: int, mode: str) -> Dict[str, Any]:
+    """One shard of a full-factory crawl; failures come back as {'ok': False} instead of
+    raising, so the chord callback still runs and can retry just this shard."""
+    return run_shard(current_app.tasks[task_name], start_index, limit, mode)
+
+
+@shared_task
+def merge_crawl(results: List[Dict[str, Any]], crawl: Dict[str, Any]) -> Dict[str, Any]:
+    """Chord callback: re-dispatch failed shards until max_attempts, then report."""
+    failed = [r for r in results if not r.get('ok')]
+    crawl = {**crawl, 'done': crawl['done'] + [r for r in results if r.get('ok')], 'failed': failed}
+    if failed and crawl['attempt'] < crawl['max_attempts']:
+        logger.warning('Crawl of %s: retrying %s failed shards (attempt %s)',
+                       crawl['factory'], len(failed), crawl['attempt'] + 1)
+        dispatch_shards({**crawl, 'attempt': crawl['attempt'] + 1, 'failed': []},
+                        [(r['start_index'], r['limit']) for r in failed])
+        return {'ok': None, 'retrying': len(failed), 'attempt': crawl['attempt']}
+    report = merge_report(crawl)
+    logger.info('Crawl report %s', report)
+    return report
+
+
+@shared_task
+def rollup_reserve_history(retention: Optional[int] = None) -> Dict[str, Any]:
+    """Fold raw reserve snapshots into 1m/5m/1h price bars, then prune expired raw rows."""
+    summary: Dict[str, Any] = {'ok': True}
+    for pair_model, snapshot_model, bar_model in HISTORY_TARGETS:
+        result = rollup_bars(snapshot_model, bar_model, pair_model)
+        result['pruned'] = prune_snapshots(snapshot_model, retention or RESERVE_HISTORY_RETENTION)
+        summary[pair_model._meta.db_table] = result
+    logger.info('Reserve history rollup summary %s', summary)
+    return summary
+
+
+@shared_task
+def scan_arbitrage(addresses: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Cross-DEX spreads between Camelot and SushiSwap pools of the same token pair.
+    Args:
+        addresses: pair addresses changed by a sync batch (e.g. its summary's 'addresses');
+            None reloads the index and scans every token pair
+    Returns summary dict with the opportunities above ARB_MIN_SPREAD
+    """
+    summary = arbitrage_scanner.scan_pairs(addresses)
+    return {'ok': True, 'pools': len(pool_index), **summary}
+
+
+@shared_task
+def token_prices(tokens: List[str]) -> Dict[str, Any]:
+    """USD prices of tokens via their most liquid path to an anchor stablecoin.
+    Args:
+        tokens: token addresses
+    Returns summary dict mapping each token to its price info (None if unreachable)
+    """
+    return {'ok': True, 'prices': {token: token_graph.price_info(token) for token in tokens}}
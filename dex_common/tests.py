@@ -0,0 +1,197 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+
+from django.test import SimpleTestCase
+from web3 import Web3
+
+from dex_common.devnode import DevNodeServer, DevNodeWebSocket, FakeChain
+from dex_common.head_watcher import HeadWatcher
+from dex_common.multicall import ERC20_META_ABI, abi_function, build_call
+from dex_common.pools import PoolIndex, Venue, fixed_fee
+from dex_common.routing import TokenGraph
+from dex_common.rpc_batch import RPCBatchError, batch_calls
+
+VENUE = Venue('test', None, fixed_fee(0.003))
+
+
+def _token(i):
+    return '0x%040x' % (i + 1)
+
+
+def _pool_index(rows):
+    index = PoolIndex([VENUE], check_interval=float('inf'))
+    index._ingest(VENUE, rows)
+    index.loaded = True
+    return index
+
+
+def _random_rows(rng, tokens, pools):
+    rows = []
+    for i in range(pools):
+        a, b = rng.sample(range(tokens), 2)
+        rows.append({
+            'pair_address': '0x%040x' % (1000 + i),
+            'token0_address': _token(a), 'token1_address': _token(b),
+            'token0_reserve': rng.randint(1, 10 ** 6) * 10 ** rng.randint(0, 20),
+            'token1_reserve': rng.randint(1, 10 ** 6) * 10 ** rng.randint(0, 20),
+            'token0_decimals': rng.choice([6, 8, 18]), 'token1_decimals': rng.choice([6, 8, 18]),
+        })
+    return rows
+
+
+class TokenGraphTests(SimpleTestCase):
+    def assert_same_tree(self, graph, rows, anchors):
+        fresh = TokenGraph(_pool_index(rows), anchors)
+        for token in graph.index.by_token:
+            self.assertEqual(graph.price_info(token), fresh.price_info(token), token)
+
+    def test_update_matches_rebuild(self):
+        for seed in range(100):
+            rng = random.Random(seed)
+            rows = _random_rows(rng, tokens=12, pools=25)
+            anchors = [_token(0), _token(1)]
+            index = _pool_index(rows)
+            graph = TokenGraph(index, anchors)
+            graph.rebuild()
+            for _ in range(10):
+                changed = rng.sample(rows, rng.randint(1, 3))
+                for row in changed:
+                    row['token0_reserve'] = max(1, int(row['token0_reserve'] * rng.uniform(0.01, 100)))
+                    row['token1_reserve'] = max(1, int(row['token1_reserve'] * rng.uniform(0.01, 100)))
+                keys = index._ingest(VENUE, changed)
+                index._notify(keys)
+                self.assert_same_tree(graph, rows, anchors)
+
+    def test_update_adds_new_pools(self):
+        rng = random.Random(7)
+        rows = _random_rows(rng, tokens=12, pools=25)
+        anchors = [_token(0), _token(20)]
+        index = _pool_index(rows[:10])
+        graph = TokenGraph(index, anchors)
+        graph.rebuild()
+        # Pools reaching new tokens and the first pool of the second anchor
+        rows.append({**rows[0], 'pair_address': '0x%040x' % 999, 'token0_address': _token(20)})
+        for start in range(10, len(rows), 4):
+            index._notify(index._ingest(VENUE, rows[start:start + 4]))
+            self.assert_same_tree(graph, rows[:start + 4], anchors)
+
+
+class BatchCallsTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.chain = FakeChain(pairs=5, tokens=40)
+
+    def run_batch(self, server, chunk_size=40):
+        w3 = Web3(Web3.HTTPProvider(server.url))
+        tokens = self.chain.token_addresses
+        # A reverting symbol() and a target without code sit between the decimals() reads
+        calls = [build_call(w3, t, abi_function(ERC20_META_ABI, 'decimals')) for t in tokens]
+        calls.insert(13, build_call(w3, tokens[13], abi_function(ERC20_META_ABI, 'symbol')))
+        calls.insert(20, build_call(w3, '0x' + '11' * 20, abi_function(ERC20_META_ABI, 'decimals')))
+        results = batch_calls(w3, calls, chunk_size)
+        expected = [(True, self.chain.tokens[t]['decimals']) for t in tokens]
+        expected.insert(13, (False, None))
+        expected.insert(20, (False, None))
+        self.assertEqual(results, expected)
+
+    def test_responses_matched_by_id(self):
+        with DevNodeServer(self.chain, shuffle_batches=True) as server:
+            self.run_batch(server)
+            self.assertEqual(server.stats()['requests'], 2)
+
+    def test_oversize_batch_is_split(self):
+        with DevNodeServer(self.chain, max_batch_size=8, shuffle_batches=True) as server:
+            with self.assertLogs('dex_common.rpc_batch', 'WARNING'):
+                self.run_batch(server)
+            self.assertGreater(server.stats()['refused_batches'], 0)
+
+    def test_unsupported_batching_falls_back_to_single_requests(self):
+        with DevNodeServer(self.chain, max_batch_size=1) as server:
+            with self.assertLogs('dex_common.rpc_batch', 'WARNING'):
+                self.run_batch(server, chunk_size=10)
+
+    def test_transport_errors_are_not_split(self):
+        with DevNodeServer(self.chain, error_rate=1.0) as server:
+            with self.assertRaises(RPCBatchError):
+                self.run_batch(server)
+            self.assertEqual(server.stats()['requests'], 1)
+
+
+class HeadWatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.chain = FakeChain(pairs=5)
+        self.server = DevNodeServer(self.chain).start()
+        self.ws = DevNodeWebSocket(self.chain).start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(self.ws.stop)
+        self.watcher = HeadWatcher(ws_url=self.ws.url, http_url=self.server.url, poll_interval=0.05,
+                                   reconnect_delay=1.0)
+
+    async def take(self, count):
+        return [await asyncio.wait_for(self.watcher.queue.get(), 10) for _ in range(count)]
+
+    @asynccontextmanager
+    async def running(self):
+        task = asyncio.create_task(self.watcher.run())
+        try:
+            # The current head, once subscribed
+            yield (await self.take(1))[0]
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def assert_chain(self, heads):
+        for parent, head in zip(heads, heads[1:]):
+            self.assertEqual(head.number, parent.number + 1)
+            self.assertEqual(head.parent_hash, parent.hash)
+        for head in heads:
+            self.assertEqual(head.hash, self.chain.block_hash(head.number))
+
+    async def test_duplicates_are_dropped(self):
+        header = self.chain.header(self.chain.block_number)
+        await self.watcher.on_header(None, header, 'ws')
+        await self.watcher.on_header(None, header, 'poll')
+        self.assertEqual(self.watcher.queue.qsize(), 1)
+        self.assertEqual(self.watcher.stats['duplicates'], 1)
+
+    async def test_missed_notifications_are_backfilled(self):
+        async with self.running() as first:
+            self.ws.muted = True
+            self.chain.mine(3)
+            self.ws.muted = False
+            self.chain.mine(1)
+            heads = await self.take(4)
+            self.assert_chain([first] + heads)
+            self.assertEqual([h.source for h in heads], ['backfill'] * 3 + ['ws'])
+
+    async def test_polls_while_disconnected_and_reconnects(self):
+        async with self.running() as first:
+            self.ws.drop_connections()
+            while not self.watcher.stats['ws_disconnects']:
+                await asyncio.sleep(0.01)
+            self.chain.mine(2)
+            heads = await self.take(2)
+            self.assertEqual([h.source for h in heads], ['backfill', 'poll'])
+            # Mine until a head arrives over the new subscription
+            while heads[-1].source != 'ws':
+                self.chain.mine(1)
+                heads += await self.take(1)
+                await asyncio.sleep(0.2)
+            self.assert_chain([first] + heads)
+
+    async def test_reorg_walks_back_to_the_fork(self):
+        async with self.running() as first:
+            self.chain.mine(3)
+            before = await self.take(3)
+            self.ws.muted = True
+            self.chain.reorg(2)
+            self.ws.muted = False
+            self.chain.mine(1)
+            with self.assertLogs('dex_common.head_watcher', 'WARNING'):
+                heads = await self.take(3)
+            self.assert_chain([first, before[0]] + heads)
+            self.assertEqual([h.number for h in heads], [before[1].number, before[2].number, before[2].number + 1])
+            self.assertEqual([h.reorg for h in heads], [True, True, False])
+            self.assertEqual(self.watcher.stats['reorgs'], 1)
@@ -0,0 +1,171 @@
+# Shared token metadata store
+# Lookup order: bounded in-process LRU -> token_meta table -> one batched RPC round.
+# Shared by Camelot_v2 and SushiSwap_v2, and warmed from the table when a worker starts.
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from celery.signals import worker_process_init
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from web3 import Web3
+
+from dex_common.models import TokenMeta
+from dex_common.multicall import DEFAULT_CHUNK_SIZE, CallExecutor, aggregate3, fetch_token_metas
+from dex_common.writer import conflict_target
+
+logger = logging.getLogger(__name__)
+
+TOKEN_META_CACHE_SIZE = getattr(settings, 'TOKEN_META_CACHE_SIZE', 10000)
+# Rows loaded into the LRU on worker start (most recently refreshed first)
+TOKEN_META_WARMUP = getattr(settings, 'TOKEN_META_WARMUP', 5000)
+# Seconds before a token whose symbol() reverted is queried again
+TOKEN_META_NEGATIVE_TTL = getattr(settings, 'TOKEN_META_NEGATIVE_TTL', 6 * 3600)
+
+
+class TokenMetaStore:
+    """Token symbol/decimals cache. Item access (``in``, ``[]``) only touches the LRU,
+    so it is safe from async code; ``get_many`` also reads/writes the DB and the chain.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_META_CACHE_SIZE, negative_ttl: float = TOKEN_META_NEGATIVE_TTL):
+        self.maxsize = maxsize
+        self.negative_ttl = negative_ttl
+        self._lru: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # address -> unix time after which a failed symbol() is retried
+        self._retry_after: Dict[str, float] = {}
+
+    # -- in-process LRU --------------------------------------------------------
+    def __contains__(self, address: str) -> bool:
+        return self._lookup(address) is not None
+
+    def __getitem__(self, address: str) -> Dict[str, Any]:
+        meta = self._lookup(address)
+        if meta is None:
+            raise KeyError(address)
+        return meta
+
+    def __setitem__(self, address: str, meta: Dict[str, Any]) -> None:
+        self._remember(address, meta, time.time())
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _lookup(self, address: str) -> Optional[Dict[str, Any]]:
+        meta = self._lru.get(address)
+        if meta is None:
+            return None
+        retry_after = self._retry_after.get(address)
+        if retry_after is not None and retry_after <= time.time():
+            # Negative entry expired: treat as unknown so it is re-queried
+            del self._lru[address]
+            del self._retry_after[address]
+            return None
+        self._lru.move_to_end(address)
+        return meta
+
+    def _remember(self, address: str, meta: Dict[str, Any], checked_at: float) -> None:
+        self._lru[address] = {'symbol': meta['symbol'], 'decimals': int(meta['decimals'])}
+        self._lru.move_to_end(address)
+        if meta.get('symbol_failed'):
+            self._retry_after[address] = checked_at + self.negative_ttl
+        else:
+            self._retry_after.pop(address, None)
+        while len(self._lru) > self.maxsize:
+            evicted, _ = self._lru.popitem(last=False)
+            self._retry_after.pop(evicted, None)
+
+    def clear(self) -> None:
+        self._lru.clear()
+        self._retry_after.clear()
+
+    # -- DB --------------------------------------------------------------------
+    def _remember_rows(self, rows: Iterable[TokenMeta]) -> None:
+        now = time.time()
+        for row in rows:
+            checked_at = row.updated_at.timestamp() if row.updated_at else now
+            if row.symbol_failed and checked_at + self.negative_ttl <= now:
+                continue  # stale negative entry, let the caller re-query it
+            self._remember(row.address, {
+                'symbol': row.symbol, 'decimals': row.decimals, 'symbol_failed': row.symbol_failed,
+            }, checked_at)
+
+    def load(self, addresses: List[str]) -> None:
+        """Pull the given addresses from token_meta into the LRU."""
+        if addresses:
+            self._remember_rows(TokenMeta.objects.filter(address__in=addresses))
+
+    def save(self, metas: Dict[str, Dict[str, Any]]) -> None:
+        if not metas:
+            return
+        now = timezone.now()
+        objs = [
+            TokenMeta(address=addr, symbol=str(meta['symbol'])[:100], decimals=int(meta['decimals']),
+                      symbol_failed=bool(meta.get('symbol_failed')), updated_at=now)
+            for addr, meta in metas.items()
+        ]
+        TokenMeta.objects.bulk_create(
+            objs, update_conflicts=True, unique_fields=conflict_target(TokenMeta, ['address']),
+            update_fields=['symbol', 'decimals', 'symbol_failed', 'updated_at'],
+        )
+
+    def warm_up(self, limit: int = TOKEN_META_WARMUP) -> int:
+        rows = list(TokenMeta.objects.order_by('-updated_at')[:limit])
+        # Insert oldest first so the most recently refreshed end up hottest in the LRU
+        self._remember_rows(reversed(rows))
+        return len(rows)
+
+    # -- bulk lookup -------------------------------------------------------------
+    def get_many(self, w3: Web3, addresses: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 executor: Optional[CallExecutor] = None) -> Dict[str, Dict[str, Any]]:
+        """Resolve metadata for all addresses: LRU, then one DB query, then one batched RPC round."""
+        wanted = list(dict.fromkeys(Web3.to_checksum_address(a) for a in addresses))
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for addr in wanted:
+            meta = self._lookup(addr)
+            if meta is None:
+                missing.append(addr)
+            else:
+                found[addr] = meta
+        if missing:
+            self.load(missing)
+            still_missing = []
+            for addr in missing:
+                meta = self._lookup(addr)
+                if meta is None:
+                    still_missing.append(addr)
+                else:
+                    found[addr] = meta
+            missing = still_missing
+        if missing:
+            fetched: Dict[str, Dict[str, Any]] = {}
+            fetch_token_metas(w3, missing, fetched, chunk_size, executor=executor or aggregate3)
+            # A failed decimals() is only a fallback for this call: caching it would keep
+            # every price of the token off by a power of ten
+            self.save({addr: meta for addr, meta in fetched.items() if not meta['decimals_failed']})
+            now = time.time()
+            for addr, meta in fetched.items():
+                if meta['decimals_failed']:
+                    logger.warning('decimals() failed for token %s, using %s without caching', addr, meta['decimals'])
+                else:
+                    self._remember(addr, meta, now)
+                found[addr] = {'symbol': meta['symbol'], 'decimals': meta['decimals']}
+        return found
+
+
+# One store per worker process, shared by every DEX app
+token_store = TokenMetaStore()
+
+
+@worker_process_init.connect
+def warm_token_cache(**kwargs: Any) -> None:
+    try:
+        loaded = token_store.warm_up()
+    except DatabaseError as e:
+        logger.warning('Token metadata warm-up skipped: %s', e)
+        return
+    logger.info('Token metadata cache warmed with %s tokens', loaded)
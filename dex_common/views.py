@@ -0,0 +1,8 @@
+from django.http import HttpResponse
+
+from dex_common.metrics import collect
+
+
+def metrics(request):
+    """Prometheus scrape endpoint: RPC, DB and Celery task metrics of every process."""
+    return HttpResponse(collect().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,93 @@
+# Batch DB writer for pair snapshots
+# One SELECT to find existing rows, then one INSERT ... ON CONFLICT DO UPDATE per
+# batch instead of a transaction + row lock per pair.
+
+import logging
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from django.db import connections, models, router
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+
+
+def _normalize(value: Any) -> Any:
+    # DecimalField values come back as Decimal; incoming rows carry int/float
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, int):
+        return Decimal(value)
+    return value
+
+
+def conflict_target(model: Type[models.Model], fields: List[str]) -> Optional[List[str]]:
+    """unique_fields for bulk_create(update_conflicts=True) on the model's database.
+
+    MySQL/MariaDB reject an explicit conflict target; they use every unique index.
+    """
+    connection = connections[router.db_for_write(model)]
+    return fields if connection.features.supports_update_conflicts_with_target else None
+
+
+def filter_changed(model: Type[models.Model], rows: Sequence[Dict[str, Any]], compare_fields: Sequence[str],
+                   key_field: str = 'pair_address') -> Dict[str, Any]:
+    """Split rows into new, changed and unchanged against what is stored.
+
+    Duplicate keys in ``rows`` collapse to the last occurrence.
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        latest[row[key_field]] = row
+    existing = {
+        r[key_field]: r
+        for r in model.objects.filter(**{f'{key_field}__in': list(latest)}).values(key_field, *compare_fields)
+    }
+    new_rows: List[Dict[str, Any]] = []
+    changed_rows: List[Dict[str, Any]] = []
+    unchanged = 0
+    for key, row in latest.items():
+        stored = existing.get(key)
+        if stored is None:
+            new_rows.append(row)
+        elif any(_normalize(stored[f]) != _normalize(row[f]) for f in compare_fields):
+            changed_rows.append(row)
+        else:
+            unchanged += 1
+    return {'new': new_rows, 'changed': changed_rows, 'unchanged': unchanged}
+
+
+def bulk_upsert_pairs(model: Type[models.Model], rows: Sequence[Dict[str, Any]], compare_fields: Sequence[str],
+                      update_fields: Sequence[str], prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                      key_field: str = 'pair_address', batch_size: int = BULK_BATCH_SIZE,
+                      prepare_many: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None,
+                      after_write: Optional[Callable[[List[Dict[str, Any]]], Any]] = None) -> Dict[str, int]:
+    """Upsert pair rows keyed by ``key_field`` and return created/updated/unchanged counts.
+
+    Rows whose ``compare_fields`` (the reserves) match the stored row are dropped before
+    the write. ``prepare`` runs only on rows that will be written, so derived fields
+    such as exchange_rate are not computed for unchanged pairs; ``prepare_many`` is the
+    same hook applied to the whole list at once (e.g. pricing.with_prices).
+    ``after_write`` receives the rows that were written (e.g. to append reserve history).
+    """
+    split = filter_changed(model, rows, compare_fields, key_field)
+    to_write = split['new'] + split['changed']
+    if to_write:
+        if prepare is not None:
+            to_write = [prepare(row) for row in to_write]
+        if prepare_many is not None:
+            to_write = prepare_many(to_write)
+        objs = [model(**row) for row in to_write]
+        model.objects.bulk_create(
+            objs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=conflict_target(model, [key_field]),
+            update_fields=list(update_fields),
+        )
+        if after_write is not None:
+            after_write(to_write)
+    return {'created': len(split['new']), 'updated': len(split['changed']), 'unchanged': split['unchanged']}